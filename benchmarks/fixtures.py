@@ -0,0 +1,86 @@
+"""
+Synthetic packets and predictions for benchmarks. They are filled in directly on the framework's ctypes structs,
+so nothing here needs the game or the RLBot framework to be running.
+"""
+
+import math
+import random
+
+from rlbot.utils.structures.ball_prediction_struct import BallPrediction
+from rlbot.utils.structures.game_data_struct import GameTickPacket, FieldInfoPacket
+
+NUM_BOOSTS = 34
+
+
+def make_field_info(seed: int = 0) -> FieldInfoPacket:
+    rng = random.Random(seed)
+    field_info = FieldInfoPacket()
+    field_info.num_boosts = NUM_BOOSTS
+    for i in range(NUM_BOOSTS):
+        pad = field_info.boost_pads[i]
+        pad.location.x = rng.uniform(-3584, 3584)
+        pad.location.y = rng.uniform(-4240, 4240)
+        pad.location.z = 70
+        pad.is_full_boost = i % 6 == 0
+    return field_info
+
+
+def make_packet(num_cars: int = 8, game_time: float = 100, seed: int = 0) -> GameTickPacket:
+    rng = random.Random(seed)
+    packet = GameTickPacket()
+    packet.num_cars = num_cars
+    packet.num_boost = NUM_BOOSTS
+    packet.game_info.seconds_elapsed = game_time
+    packet.game_info.is_round_active = True
+    for i in range(num_cars):
+        car = packet.game_cars[i]
+        car.team = i % 2
+        car.boost = rng.randint(0, 100)
+        car.has_wheel_contact = True
+        car.physics.location.x = rng.uniform(-4000, 4000)
+        car.physics.location.y = rng.uniform(-5000, 5000)
+        car.physics.location.z = 17
+        car.physics.velocity.x = rng.uniform(-1400, 1400)
+        car.physics.velocity.y = rng.uniform(-1400, 1400)
+        car.physics.rotation.yaw = rng.uniform(-math.pi, math.pi)
+        car.physics.rotation.pitch = rng.uniform(-0.1, 0.1)
+        car.physics.rotation.roll = rng.uniform(-0.1, 0.1)
+    ball = packet.game_ball.physics
+    ball.location.x = rng.uniform(-3000, 3000)
+    ball.location.y = rng.uniform(-4000, 4000)
+    ball.location.z = 93
+    ball.velocity.x = rng.uniform(-2000, 2000)
+    ball.velocity.y = rng.uniform(-2000, 2000)
+    for i in range(NUM_BOOSTS):
+        packet.game_boosts[i].is_active = rng.random() < 0.7
+    return packet
+
+
+def make_ball_prediction(game_time: float = 100, seed: int = 0, into_goal: bool = True,
+                         start_slice: int = 0) -> BallPrediction:
+    """
+    A simple bouncing trajectory. With into_goal it rolls into the orange goal near the end of the prediction.
+    With a start_slice, it's the prediction of the same ball that many slices later, like a later tick would get.
+    """
+    rng = random.Random(seed)
+    prediction = BallPrediction()
+    prediction.num_slices = 360
+    x, y, z = rng.uniform(-1000, 1000), rng.uniform(-1000, 1000), 300
+    vx, vy, vz = rng.uniform(-300, 300), 1100 if into_goal else 300, 0
+    for i in range(start_slice + 360):
+        vz -= 650 / 60
+        x, y, z = x + vx / 60, y + vy / 60, z + vz / 60
+        if z < 93:
+            z = 93
+            vz = -vz * 0.6
+        if i < start_slice:
+            continue
+        ball_slice = prediction.slices[i - start_slice]
+        ball_slice.game_seconds = game_time + i / 60
+        ball_slice.physics.location.x = x
+        ball_slice.physics.location.y = y
+        ball_slice.physics.location.z = z
+        ball_slice.physics.velocity.x = vx
+        ball_slice.physics.velocity.y = vy
+        ball_slice.physics.velocity.z = vz
+    return prediction
@@ -0,0 +1,491 @@
+"""
+Micro-benchmarks for the hot paths in src/util. Times are reported in nanoseconds per call. "alloc B" is the peak
+memory allocated during one call, which is a good indicator of how many temporary objects (Vec3s etc.) the call
+creates.
+
+benchmarks/baseline.json holds the numbers of the code as committed, so a plain run compares against it and exits
+with an error if anything got more than 25% slower. Run it in CI, or before you commit a change to src/util:
+
+    python benchmarks/run_benchmarks.py
+
+The baseline also stores how long a fixed piece of plain Python took when it was measured, and is scaled by how long
+the same takes now, so it works on other machines too. Timings still vary a few percent from run to run. When a
+change makes something slower on purpose, or adds benchmarks, save the baseline again and commit it with the change:
+
+    python benchmarks/run_benchmarks.py --save-baseline
+
+To compare two versions of the code on your own machine instead, save a baseline elsewhere on the old code with
+--save-baseline --baseline old.json, then run the new code with --baseline old.json. Benchmarks of code that the
+old version doesn't have yet are skipped.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).absolute().parent
+sys.path.insert(0, str(ROOT.parent / 'src'))
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_BASELINE = ROOT / 'baseline.json'
+DEFAULT_THRESHOLD = 0.25
+# The baseline entry that holds the calibration time instead of a benchmark.
+CALIBRATION = '(calibration)'
+
+
+# Every benchmark is registered with a setup function that does its own imports and returns the function to time.
+# Setups that fail because a module or attribute doesn't exist are skipped, so a baseline can be saved on code
+# from before the change that added them.
+_BENCHMARKS: List[Tuple[str, Callable[[], Callable[[], object]]]] = []
+
+
+def benchmark(name: str):
+    def register(setup: Callable[[], Callable[[], object]]):
+        _BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+@lru_cache(maxsize=None)
+def _packet():
+    from fixtures import make_packet
+    return make_packet()
+
+
+@lru_cache(maxsize=None)
+def _field_info():
+    from fixtures import make_field_info
+    return make_field_info()
+
+
+@lru_cache(maxsize=None)
+def _ball_prediction():
+    from fixtures import make_ball_prediction
+    return make_ball_prediction()
+
+
+@lru_cache(maxsize=None)
+def _prediction_array():
+    from util.ball_prediction_analysis import PredictionArray
+    return PredictionArray(_ball_prediction())
+
+
+@lru_cache(maxsize=None)
+def _prediction_sequence():
+    """The predictions of one second at 120 ticks per second, while the ball stays on the same path."""
+    from fixtures import make_ball_prediction
+    from util.ball_prediction_analysis import PredictionArray
+    return [PredictionArray(make_ball_prediction(start_slice=tick // 2)) for tick in range(120)]
+
+
+@lru_cache(maxsize=None)
+def _car_and_ball():
+    """Our car, and the locations of our car and the ball as Vec3s."""
+    from util.vec import Vec3
+    car = _packet().game_cars[0]
+    return car, Vec3(car.physics.location), Vec3(_packet().game_ball.physics.location)
+
+
+@lru_cache(maxsize=None)
+def _orientation():
+    from util.orientation import Orientation
+    return Orientation(_car_and_ball()[0].physics.rotation)
+
+
+@lru_cache(maxsize=None)
+def _orientations():
+    from util.orientation import OrientationCache
+    return OrientationCache()
+
+
+def _snapshot():
+    # The WorldModel's snapshot, which it has already updated with the packet before the trackers read it.
+    from util.packet_snapshot import PacketSnapshot
+    snapshot = PacketSnapshot()
+    snapshot.read(_packet())
+    return snapshot
+
+
+@benchmark('Vec3 from packet')
+def _():
+    from util.vec import Vec3
+    car, _, _ = _car_and_ball()
+    return lambda: Vec3(car.physics.location)
+
+
+@benchmark('PacketSnapshot.read')
+def _():
+    from util.packet_snapshot import PacketSnapshot
+    snapshot = PacketSnapshot()
+    packet = _packet()
+    return lambda: snapshot.read(packet)
+
+
+@benchmark('PacketSnapshot.car_location')
+def _():
+    from util.packet_snapshot import PacketSnapshot
+    snapshot = PacketSnapshot()
+    snapshot.read(_packet())
+    return lambda: snapshot.car_location(0)
+
+
+@benchmark('Vec3.__add__')
+def _():
+    _, a, b = _car_and_ball()
+    return lambda: a + b
+
+
+@benchmark('Vec3.dist')
+def _():
+    _, a, b = _car_and_ball()
+    return lambda: a.dist(b)
+
+
+@benchmark('Vec3.normalized')
+def _():
+    _, a, _ = _car_and_ball()
+    return lambda: a.normalized()
+
+
+@benchmark('Vec3.cross')
+def _():
+    _, a, b = _car_and_ball()
+    return lambda: a.cross(b)
+
+
+@benchmark('Orientation.__init__')
+def _():
+    from util.orientation import Orientation
+    rotation = _car_and_ball()[0].physics.rotation
+    return lambda: Orientation(rotation)
+
+
+@benchmark('OrientationCache.get')
+def _():
+    cache = _orientations()
+    packet = _packet()
+    return lambda: cache.get(packet, 0)
+
+
+@benchmark('relative_location')
+def _():
+    from util.orientation import relative_location
+    _, a, b = _car_and_ball()
+    orientation = _orientation()
+    return lambda: relative_location(a, orientation, b)
+
+
+@benchmark('Orientation.to_local 34 pads')
+def _():
+    from util.vec import Vec3Batch
+    info = _field_info()
+    pad_locations = Vec3Batch([pad.location for pad in info.boost_pads[:info.num_boosts]])
+    _, a, _ = _car_and_ball()
+    to_local = _orientation().to_local
+    return lambda: to_local(a, pad_locations)
+
+
+@benchmark('steer_toward_target')
+def _():
+    from util.drive import steer_toward_target
+    car, _, b = _car_and_ball()
+    return lambda: steer_toward_target(car, b)
+
+
+@benchmark('steer_toward_target cached')
+def _():
+    from util.drive import steer_toward_target
+    car, _, b = _car_and_ball()
+    cache = _orientations()
+    packet = _packet()
+    return lambda: steer_toward_target(car, b, cache.get(packet, 0))
+
+
+@benchmark('PredictionArray.update')
+def _():
+    prediction = _prediction_array()
+    ball_prediction = _ball_prediction()
+    return lambda: prediction.update(ball_prediction)
+
+
+@benchmark('PredictionArray.copy')
+def _():
+    return _prediction_array().copy
+
+
+@benchmark('find_first')
+def _():
+    from util.ball_prediction_analysis import find_first
+    prediction = _prediction_array()
+    return lambda: find_first(prediction, lambda p: p.physics.location.z < 94)
+
+
+@benchmark('find_matching_slice scalar')
+def _():
+    from util.ball_prediction_analysis import find_matching_slice
+    prediction = _prediction_array()
+    return lambda: find_matching_slice(prediction, 0, lambda s: s.physics.location.z < 94 and s.game_seconds > 0,
+                                       search_increment=20)
+
+
+@benchmark('predict_future_goal')
+def _():
+    from util.ball_prediction_analysis import predict_future_goal
+    prediction = _prediction_array()
+    return lambda: predict_future_goal(prediction)
+
+
+@benchmark('GoalPredictor.update incremental')
+def _():
+    from util.goal_prediction import GoalPredictor
+    # Consecutive predictions of a ball on one path, so after the first call every update is an incremental one.
+    predictions = itertools.cycle(_prediction_sequence())
+    update = GoalPredictor().update
+    return lambda: update(next(predictions))
+
+
+@benchmark('GoalPredictor.update full search')
+def _():
+    from util.goal_prediction import GoalPredictor
+    prediction = _prediction_array()
+    goal_predictor = GoalPredictor()
+    return lambda: (goal_predictor.reset(), goal_predictor.update(prediction))
+
+
+@benchmark('find_intercept')
+def _():
+    from util.intercept import find_intercept
+    prediction = _prediction_array()
+    car, _, _ = _car_and_ball()
+    orientation = _orientation()
+    return lambda: find_intercept(prediction, car, orientation, 100)
+
+
+@benchmark('plan_path')
+def _():
+    from util.path_planner import plan_path
+    _, a, b = _car_and_ball()
+    yaw = _orientation().yaw
+    return lambda: plan_path((a.x, a.y, yaw), (b.x, b.y, 1.0), 500)
+
+
+@benchmark('PathPlanner.steer cached')
+def _():
+    from util.path_planner import PathPlanner
+    path_planner = PathPlanner()
+    car, _, b = _car_and_ball()
+    orientation = _orientation()
+    return lambda: path_planner.steer(car, orientation, b, 1.0)
+
+
+@benchmark('PathPlanner.follow')
+def _():
+    from util.path_planner import PathPlanner, plan_path
+    path_follower = PathPlanner()
+    car, a, b = _car_and_ball()
+    planned_path = plan_path((a.x, a.y, _orientation().yaw), (b.x, b.y, 1.0), 500)
+    orientation = _orientation()
+    return lambda: path_follower.follow(car, orientation, planned_path)
+
+
+@benchmark('BallSimulator.step 32 balls')
+def _():
+    from util.ball_sim import BallSimulator, BallStates
+    prediction = _prediction_array()
+    simulator = BallSimulator()
+    candidate_balls = BallStates(prediction.location[:32], prediction.velocity[:32])
+    return lambda: simulator.step(candidate_balls)
+
+
+@benchmark('TickContext ball features')
+def _():
+    from util.tick_context import TickContext
+    context = TickContext(0, 0, _orientations())
+    packet = _packet()
+
+    def new_frame():
+        # What a bot pays per tick: the context starts over on a new frame, then the usual features are read.
+        context._frame = None
+        context.update(packet)
+        return context.ball_distance, context.goal_alignment, context.azimuth_to_ball
+    return new_frame
+
+
+@benchmark('ManeuverPlayer.tick')
+def _():
+    from util.maneuvers import SPEEDFLIP_LEFT
+    from util.sequence import ManeuverPlayer
+    maneuvers = ManeuverPlayer()
+    maneuvers.start(SPEEDFLIP_LEFT, 0)
+    return lambda: maneuvers.tick(0.5)
+
+
+@benchmark('SpikeWatcher.read_packet')
+def _():
+    from util.spikes import SpikeWatcher
+    spike_watcher = SpikeWatcher()
+    packet = _packet()
+    return lambda: spike_watcher.read_packet(packet)
+
+
+@benchmark('PossessionTracker.update 8 cars')
+def _():
+    from util.possession import PossessionTracker
+    possession = PossessionTracker()
+    packet, snapshot = _packet(), _snapshot()
+    return lambda: possession.update(packet, snapshot)
+
+
+@benchmark('ThreatMap.update 1 refresh')
+def _():
+    from util.threat_map import ThreatMap
+    threat_map = ThreatMap(refresh_interval=0, max_refreshes_per_update=1)
+    packet, snapshot = _packet(), _snapshot()
+    cache = _orientations()
+    return lambda: threat_map.update(packet, cache, snapshot)
+
+
+@benchmark('ThreatMap.goal_exposed')
+def _():
+    from util.threat_map import ThreatMap
+    threat_map = ThreatMap(refresh_interval=0, max_refreshes_per_update=1)
+    threat_map.update(_packet(), _orientations())
+    return lambda: threat_map.goal_exposed(0)
+
+
+def _boost_pad_tracker():
+    from util.boost_pad_tracker import BoostPadTracker
+    tracker = BoostPadTracker()
+    tracker.initialize_boosts(_field_info())
+    tracker.update_boost_status(_packet())
+    return tracker
+
+
+@benchmark('BoostPadTracker.update_boost_status')
+def _():
+    tracker = _boost_pad_tracker()
+    packet, snapshot = _packet(), _snapshot()
+    return lambda: tracker.update_boost_status(packet, snapshot)
+
+
+@benchmark('BoostPadTracker.get_closest_active_pad')
+def _():
+    tracker = _boost_pad_tracker()
+    get_closest_active_pad = tracker.get_closest_active_pad
+    _, a, _ = _car_and_ball()
+    return lambda: get_closest_active_pad(a)
+
+
+def make_benchmarks(name_filter: str = None) -> Tuple[List[Tuple[str, Callable[[], object]]], Dict[str, str]]:
+    """The benchmarks that exist in this version of the code, and why the others were skipped."""
+    benchmarks = []
+    skipped = {}
+    for name, setup in _BENCHMARKS:
+        if name_filter and name_filter.lower() not in name.lower():
+            continue
+        try:
+            benchmarks.append((name, setup()))
+        except (ImportError, AttributeError) as error:
+            skipped[name] = str(error)
+    return benchmarks, skipped
+
+
+def time_per_call(func: Callable[[], object], repeat: int = 5) -> float:
+    """Returns the best of `repeat` runs, in nanoseconds per call."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def bytes_per_call(func: Callable[[], object], calls: int = 50) -> float:
+    """Returns the average peak memory allocated by one call, in bytes."""
+    func()  # Warm up caches so they don't count as allocations.
+    tracemalloc.start()
+    total = 0
+    for _ in range(calls):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - before
+    tracemalloc.stop()
+    return total / calls
+
+
+def retime(name: str) -> float:
+    """Times the benchmark again, more often than the first time, in nanoseconds per call."""
+    setup = next(setup for benchmark_name, setup in _BENCHMARKS if benchmark_name == name)
+    return time_per_call(setup(), repeat=15)
+
+
+def calibration_time() -> float:
+    """Nanoseconds for a fixed mix of arithmetic, calls and allocations, to compare the speed of two machines."""
+    return time_per_call(lambda: [math.cos(i * 0.1) + i for i in range(100)], repeat=15)
+
+
+def run(name_filter: str = None) -> Tuple[Dict[str, Dict[str, float]], Dict[str, str]]:
+    benchmarks, skipped = make_benchmarks(name_filter)
+    results = {}
+    for name, func in benchmarks:
+        results[name] = {'ns': time_per_call(func), 'bytes': bytes_per_call(func)}
+    return results, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the util hot paths.')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Fail when a benchmark is this much slower than the baseline (0.25 = 25%%)')
+    parser.add_argument('--filter', help='Only run benchmarks whose name contains this')
+    args = parser.parse_args()
+    if args.save_baseline and args.filter:
+        parser.error('--save-baseline stores every benchmark, so it can\'t be combined with --filter')
+
+    results, skipped = run(args.filter)
+    calibration = calibration_time()
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists() and not args.save_baseline:
+        baseline = json.loads(baseline_path.read_text())
+    # How much slower this machine is than the one that measured the baseline.
+    scale = calibration / baseline[CALIBRATION]['ns'] if CALIBRATION in baseline else 1.0
+
+    regressions = []
+    print(f"{'benchmark':<42}{'ns/op':>12}{'alloc B':>10}{'baseline':>12}{'change':>9}")
+    for name, result in results.items():
+        baseline_ns = baseline[name]['ns'] * scale if name in baseline else None
+        if baseline_ns is not None and result['ns'] > baseline_ns * (1 + args.threshold):
+            # Something else running on the machine can slow down one measurement, so make sure.
+            result['ns'] = min(result['ns'], retime(name))
+        line = f"{name:<42}{result['ns']:>12.0f}{result['bytes']:>10.0f}"
+        if baseline_ns is not None:
+            change = result['ns'] / baseline_ns - 1
+            line += f"{baseline_ns:>12.0f}{change:>+9.0%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += '  REGRESSION'
+        print(line)
+    for name, reason in skipped.items():
+        print(f'{name:<42}skipped, {reason}')
+    if scale != 1.0:
+        print(f'Baseline times are scaled by {scale:.2f} for the speed of this machine')
+
+    if args.save_baseline:
+        results[CALIBRATION] = {'ns': calibration, 'bytes': 0}
+        baseline_path.write_text(json.dumps(results, indent=2) + '\n')
+        print(f'Saved baseline to {baseline_path}')
+    if regressions:
+        print(f'{len(regressions)} benchmark(s) are more than {args.threshold:.0%} slower than the baseline')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import hashlib
+import sys
+import time
+from pathlib import Path
+
+# Plays back a replay recorded with `record_replay_file` in src/bot.cfg, without Rocket League running.
+# Useful for checking that a change doesn't alter the bot's decisions, and for profiling:
+#   python run_replay.py my_match_0.rlbr
+# The digest printed at the end only changes if the bot produced different controls somewhere in the replay.
+
+SRC = Path(__file__).absolute().parent / 'src'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Feed a recorded replay to the bot without the game.')
+    parser.add_argument('replay', help='File recorded with record_replay_file')
+    parser.add_argument('--config', default=str(SRC / 'bot.cfg'), help='Bot config to read Bot Parameters from')
+    parser.add_argument('--team', type=int, default=None,
+                        help="Override the bots' teams. By default each bot plays for its car's team in the recording")
+    parser.add_argument('--index', type=int, default=0, help="The bot's index in packet.game_cars")
+    parser.add_argument('--bots', type=int, default=1,
+                        help='Host this many bots in one process, with indices starting at --index')
+    parser.add_argument('--repeat', type=int, default=1, help='Play the replay this many times, e.g. for profiling')
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(SRC))
+    from bot import MyBot
+    from util.replay import Replay, ReplayPlayer, controls_to_tuple
+
+    replay = Replay.load(args.replay)
+    player = ReplayPlayer(replay)
+    digest = hashlib.sha256()
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        agents = [player.create_agent(MyBot, name=f'replay{i}', team=args.team, index=args.index + i,
+                                      config_path=args.config) for i in range(args.bots)]
+        for tick_controls in player.play_all(agents):
+            for controls in tick_controls:
+                digest.update(repr(controls_to_tuple(controls)).encode())
+        for agent in agents:
+            agent.retire()
+    elapsed = time.perf_counter() - start
+
+    ticks = len(replay) * args.repeat * args.bots
+    print(f'Played {ticks} ticks in {elapsed:.2f}s ({ticks / max(elapsed, 1e-9):.0f} ticks/s, '
+          f'{elapsed / max(ticks, 1) * 1000:.3f}ms per tick)')
+    print(f'Controls digest: {digest.hexdigest()}')
@@ -1,100 +1,59 @@
-from rlbot.agents.base_agent import BaseAgent, SimpleControllerState
+from rlbot.agents.base_agent import BaseAgent, SimpleControllerState, BOT_CONFIG_AGENT_HEADER
+from rlbot.parsing.custom_config import ConfigHeader, ConfigObject
 from rlbot.messages.flat.QuickChatSelection import QuickChatSelection
-from rlbot.utils.structures.game_data_struct import GameTickPacket
+from rlbot.utils.structures.game_data_struct import GameTickPacket, PlayerInfo
 import math
-from util.ball_prediction_analysis import find_slice_at_time
-from util.boost_pad_tracker import BoostPadTracker
+from dataclasses import dataclass
+from typing import List, Optional
+from util.ball_prediction_analysis import PredictionArray
 from util.drive import steer_toward_target
-from util.sequence import Sequence, ControlStep
+from util.intercept import Intercept, find_intercept
+from util.kickoff import KickoffPlaybook
+from util.profiler import DEFAULT_RENDER_POSITION, NullProfiler, TickProfiler
+from util.render_queue import NullRenderer, RenderQueue
+from util.replay import ReplayRecorder, recording_path
+from util.maneuvers import FRONT_FLIP
+from util.orientation import Orientation
+from util.path_planner import DubinsPath, PathPlanner
+from util.planner_worker import PlannerWorker, TimedPlan
+from util.sequence import ManeuverPlayer
+from util.state_machine import State, StateMachine
+from util.tick_context import ENEMY_GOALS, TickContext, lazy
 from util.vec import Vec3
+from util.world_model import WorldModel, get_world_model
 
-#BoostPadTracker class is used to keep track of the status of all the boost pads on the field and place them in a table array.
-class BoostPadTracker:
-    def __init__(self):
-        self.boost_pads = []
+# Lining up a shot is only worth it if the path there is at most this many times as long as driving straight
+MAX_DETOUR = 1.3
+# Only draw every this many points of a planned path
+PATH_RENDER_STEP = 8
+# What to show for the team with possession of the ball
+POSSESSION_NAMES = {None: 'nobody', 0: 'blue', 1: 'orange'}
+# When defending, wait this far in front of our own goal line
+DEFENSIVE_DEPTH = 500
+# The inputs drive_to reads, for the needs of every state that drives somewhere with it
+DRIVE_TO_NEEDS = ('orientation', 'car_speed', 'azimuth_to_ball')
 
-    def initialize_boosts(self, field_info):
-        self.boost_pads = []
-        for i in range(field_info.num_boosts):
-            self.boost_pads.append(field_info.boost_pads[i])
 
-    def update_boost_status(self, packet):
-        for i in range(len(self.boost_pads)):
-            self.boost_pads[i].is_active = packet.game_boosts[i].is_active
+@dataclass
+class PlanningSnapshot:
+    """What plan_move needs, copied out of the packet so the planner worker can read it while the packet changes."""
+    game_time: float
+    car: PlayerInfo
+    ball_location: Vec3
+    prediction: PredictionArray
 
-    def get_full_boost_locations(self):
-        return [Vec3(pad.location) for pad in self.boost_pads if pad.is_full_boost]
-    
-    def get_closest_boost_pad(self, car):
-        return min(self.boost_pads, key=lambda pad: car.dist(Vec3(pad.location)))
-    
-    def get_closest_full_boost(self, car):
-
-        full_boosts = self.get_full_boost_locations()
-        if len(full_boosts) == 0:
-            return None
-        return min(full_boosts, key=lambda pad: car.dist(pad))
-    
-def get_enemy_goal_location(team):
-    if team == 0:
-        return Vec3(0, 5120, 0)
-    else:
-        return Vec3(0, -5120, 0)
-
-def calculate_azimuth_to_ball(car_location, car_rotation, ball_location):
-    """
-    Calculates the azimuth (horizontal angle) from the car to the ball in degrees.
-
-    Args:
-        car_location (Vec3): The location of the car.
-        car_rotation (Rotation): The rotation of the car (pitch, yaw, roll).
-        ball_location (Vec3): The location of the ball.
-
-    Returns:
-        float: The azimuth angle in degrees. Positive means the ball is to the right, negative means to the left.
-    """
-    # Get the direction to the ball
-    direction_to_ball = (ball_location - car_location).normalized()
 
-    # Calculate the car's forward direction based on its yaw
-    car_forward = Vec3(math.cos(car_rotation.yaw), math.sin(car_rotation.yaw), 0).normalized()
+@dataclass
+class MovePlan:
+    intercept: Optional[Intercept]
+    target: Vec3  # The intercept's location, or the ball's if there's no intercept
+    path: DubinsPath  # To the target, arriving facing their goal
 
-    # Calculate the dot product and cross product
-    dot_product = car_forward.dot(direction_to_ball)
-    cross_product = car_forward.x * direction_to_ball.y - car_forward.y * direction_to_ball.x
 
-    # Calculate the azimuth angle in radians
-    azimuth_radians = math.atan2(cross_product, dot_product)
-
-    # Convert the azimuth angle to degrees
-    azimuth_degrees = math.degrees(azimuth_radians)
-
-    return azimuth_degrees
-
-def classify_ball_location(ball_location, team):
-    
-    if team == 0:
-        # Blue team: positive Y is opponent's side, negative Y is team's side
-        if ball_location.y > 0:
-            ball_side = 1
-            return "opponent side"
-        else:
-            ball_side = 0
-            return "team side"
-    else:
-        # Orange team: negative Y is opponent's side, positive Y is team's side
-        if ball_location.y < 0:
-            ball_side = 1
-            return "opponent side"
-        else:
-            ball_side = 0
-            return "team side"
-        
 class possible_actions:
 
     def __init__(self, bot):
         self.bot = bot
-        self.active_sequence = None
         controls = SimpleControllerState()
 
         # Return the controls associated with the beginning of the sequence so we can start right away.    
@@ -108,51 +67,119 @@ class possible_actions:
         Returns:
             SimpleControllerState: The controls to perform the front flip.
         """
-        self.active_sequence = Sequence([
-            ControlStep(duration=0.05, controls=SimpleControllerState(jump=True)),
-            ControlStep(duration=0.05, controls=SimpleControllerState(jump=False)),
-            ControlStep(duration=0.2, controls=SimpleControllerState(jump=True, pitch=-1)),
-            ControlStep(duration=0.8, controls=SimpleControllerState()),
-        ])
+        return self.bot.begin_front_flip(packet)
 
-        return self.active_sequence.tick(packet)
+
+class BotInputs(TickContext):
+    """Everything the bot's states look at. Each input is computed the first time a state asks for it in a tick."""
+
+    def __init__(self, bot: 'MyBot'):
+        super().__init__(bot.index, bot.team, bot.orientations, bot.world.snapshot)
+        self.bot = bot
+
+    @lazy
+    def straight_hit(self) -> bool:
+        # If car, ball and their goal line up, driving straight into the ball should send it into their net
+        return self.goal_alignment > 0.95  # Adjust the threshold as needed
+
+    @lazy
+    def boost_pad_on_path(self) -> Optional[Vec3]:
+        return self.bot.get_boost_pad_along_path(self.car_location, self.ball_location)
+
+    @lazy
+    def goal_exposed(self) -> bool:
+        # An opponent can get in front of our goal before any of us can
+        return self.bot.world.threat_map.goal_exposed(self.team)
+
+    @lazy
+    def ball_advantage(self) -> float:
+        # How many seconds before the opponents our team can get to the ball, negative if they're first
+        return self.bot.world.threat_map.advantage_at(self.ball_location.x, self.ball_location.y, self.team)
+
+    @lazy
+    def plan(self) -> Optional[MovePlan]:
+        # The freshest plan from the planner worker, None if it's too old. Without the planning thread it's
+        # planned right here, the first time a state asks for it.
+        with self.bot.profiler.section('prediction'):
+            timed_plan: TimedPlan = self.bot.planner.latest(self.game_time, self.bot.max_plan_age)
+        return timed_plan.plan if timed_plan is not None else None
+
+    @property
+    def intercept(self) -> Optional[Intercept]:
+        # The first point on the ball's predicted path that we can get to in time. This can predict bounces,
+        # etc. It's None if we don't have an adequate ball prediction right now, like during replays,
+        # if we can't catch up with the ball at all, or if there's no fresh plan.
+        return self.plan.intercept if self.plan is not None else None
 
 
-'''
-def get_kickoff_position(car_location):
-    """
-    Determines which kickoff position the car is in based on its location.
-    
-    Args:
-        car_location (Vec3): The location of the car in XYZ coordinates.
-    
-    Returns:
-        str: The name of the kickoff position.
-    """''''''
-    # Define known kickoff positions
-    kickoff_positions = {
-        "center": [Vec3(0, 4608, 17), Vec3(0, -4608, 17)],
-        "left": [Vec3(-2048, 2560, 17), Vec3(2048, -2560, 17)],
-        "right": [Vec3(2048, 2560, 17), Vec3(-2048, -2560, 17)],
-        "back_left": [Vec3(-256, 3840, 17), Vec3(256, -3840, 17)],
-        "back_right": [Vec3(256, 3840, 17), Vec3(-256, -3840, 17)]
-    }
-    
-    # Determine which position the car is in
-    for position_name, positions in kickoff_positions.items():
-        for position_coords in positions:
-            if car_location.dist(position_coords) < 100:  # Adjust the threshold as needed
-                return position_name
-    
-    return "unknown"
-'''
 class MyBot(BaseAgent):
 
     def __init__(self, name, team, index):
         super().__init__(name, team, index)
-        self.active_sequence: Sequence = None
-        self.boost_pad_tracker = BoostPadTracker()
+        # Plays precompiled maneuvers like flips, which take over the controls until they're done
+        self.maneuvers = ManeuverPlayer()
+        # Pre-tuned kickoff routines for every spawn, from tune_kickoffs.py
+        self.kickoffs = KickoffPlaybook.load()
+        # Plans paths that reach the ball facing their goal, and keeps them between ticks. The one for moves is
+        # only used by plan_move, which may run on the planner worker's thread
+        self.path_planner = PathPlanner()
+        self.move_path_planner = PathPlanner()
+        self.planning_thread = False
+        self.max_plan_age = 0.1
+        self.planner = PlannerWorker(self.plan_move, threaded=False)
+        # Packet-derived state is shared with every other bot in this process, so it's only computed once per tick
+        self.use_world_model(get_world_model())
+        # What the bot does each tick is decided by a state machine. The states only compute the inputs they look at
+        self.state_machine = StateMachine(self.make_states())
         self.moves = possible_actions(self)  # Pass 'self' to the constructor
+        self.render_queue = RenderQueue(NullRenderer())
+        self.render_rate = 30
+        self.profiler = NullProfiler()
+        self.profiler_enabled = False
+        self.profiler_report_file = None
+        self.profiler_position = DEFAULT_RENDER_POSITION
+        self.replay_file = None
+        self.recorder: ReplayRecorder = None
+
+    def use_world_model(self, world: WorldModel):
+        """Reads the packet-derived state from this WorldModel, e.g. one per match when a process runs several."""
+        self.world = world
+        self.boost_pad_tracker = world.boost_pad_tracker
+        self.ball_prediction = world.ball_prediction
+        self.orientations = world.orientations
+        self.inputs = BotInputs(self)
+
+    @staticmethod
+    def create_agent_configurations(config: ConfigObject):
+        params = config.get_header(BOT_CONFIG_AGENT_HEADER)
+        params.add_value('render_rate', float, default=30,
+                         description='How many times per second debug drawings are sent. 0 sends every tick')
+        params.add_value('enable_profiler', bool, default=False,
+                         description='Measure how long each part of get_output takes and show it on screen')
+        params.add_value('profiler_report_file', str, default='',
+                         description='File the profiler appends its report to. Leave empty to only show it on screen')
+        params.add_value('profiler_render_x', int, default=DEFAULT_RENDER_POSITION[0],
+                         description='Pixels from the left edge of the screen where the profiler report is drawn')
+        params.add_value('profiler_render_y', int, default=DEFAULT_RENDER_POSITION[1],
+                         description='Pixels from the top edge of the screen where the profiler report is drawn')
+        params.add_value('record_replay_file', str, default='',
+                         description='Record every packet to this file, with the bot index added to the name')
+        params.add_value('planning_thread', bool, default=False,
+                         description='Search for intercepts and plan paths on a background thread')
+        params.add_value('max_plan_age', float, default=0.1,
+                         description='Seconds after which a plan from the planning thread is too old to follow')
+        params.add_value('check_state_needs', bool, default=False,
+                         description='Raise an error when a state reads an input it does not list in its needs')
+
+    def load_config(self, config_header: ConfigHeader):
+        self.render_rate = config_header.getfloat('render_rate')
+        self.profiler_enabled = config_header.getboolean('enable_profiler')
+        self.profiler_report_file = config_header.get('profiler_report_file') or None
+        self.profiler_position = (config_header.getint('profiler_render_x'), config_header.getint('profiler_render_y'))
+        self.replay_file = config_header.get('record_replay_file') or None
+        self.planning_thread = config_header.getboolean('planning_thread')
+        self.max_plan_age = config_header.getfloat('max_plan_age')
+        self.state_machine.check_needs = config_header.getboolean('check_state_needs')
     
     def begin_front_flip(self, packet):
         """
@@ -164,27 +191,39 @@ class MyBot(BaseAgent):
         Returns:
             SimpleControllerState: The controls to perform the front flip.
         """
-        self.active_sequence = Sequence([
-            ControlStep(duration=0.05, controls=SimpleControllerState(jump=True)),
-            ControlStep(duration=0.05, controls=SimpleControllerState(jump=False)),
-            ControlStep(duration=0.2, controls=SimpleControllerState(jump=True, pitch=-1)),
-            ControlStep(duration=0.8, controls=SimpleControllerState()),
-        ])
-        return self.active_sequence.tick(packet)
+        game_time = packet.game_info.seconds_elapsed
+        self.maneuvers.start(FRONT_FLIP, game_time)
+        return self.maneuvers.tick(game_time)
 
     def initialize_agent(self):
         # Set up information about the boost pads now that the game is active and the info is available
-        self.boost_pad_tracker.initialize_boosts(self.get_field_info())
-
-    def slow_down_if_ball_is_high(self, car_location, ball_location, car_velocity, stop_threshold=300, height_threshold=100):
+        self.world.initialize(self.get_field_info())
+        # Debug drawing goes through a queue that only sends changed frames, at most render_rate times per second
+        match_settings = self.get_match_settings()
+        rendering_enabled = match_settings is None or match_settings.EnableRendering()
+        self.render_queue = RenderQueue(self.renderer, enabled=rendering_enabled, max_rate=self.render_rate)
+        if self.profiler_enabled:
+            self.profiler = TickProfiler(renderer=self.render_queue, report_file=self.profiler_report_file,
+                                         render_position=self.profiler_position)
+        if self.replay_file:
+            self.recorder = ReplayRecorder(recording_path(self.replay_file, self.index))
+            self.recorder.record_field_info(self.get_field_info())
+        if self.planning_thread:
+            self.planner = PlannerWorker(self.plan_move, threaded=True, name=f'planner {self.name}')
+
+    def retire(self):
+        self.planner.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def slow_down_if_ball_is_high(self, inputs: TickContext, stop_threshold=300, height_threshold=100):
 
         controls = SimpleControllerState()
 
         # Check if the ball is close in x and y
-        xy_distance = math.sqrt((ball_location.x - car_location.x) ** 2 + (ball_location.y - car_location.y) ** 2)
-        if xy_distance < stop_threshold and ball_location.z > height_threshold:
+        if inputs.ball_xy_distance < stop_threshold and inputs.ball_location.z > height_threshold:
             # Ball is close in x and y, but high in z
-            controls.throttle = -1.0 if car_velocity.length() > 100 else 0.0  # Reverse if moving, stop otherwise
+            controls.throttle = -1.0 if inputs.car_speed > 100 else 0.0  # Reverse if moving, stop otherwise
             controls.boost = False  # Disable boost
             
         else:
@@ -194,187 +233,191 @@ class MyBot(BaseAgent):
 
         return controls
     
-    def is_point_near_line(self, point, line_start, line_end, threshold):
-    
-        line_direction = (line_end - line_start).normalized()
-        point_direction = (point - line_start)
-        projection_length = point_direction.dot(line_direction)
-        closest_point = line_start + line_direction * projection_length
-        distance_to_line = (point - closest_point).length()
-        return distance_to_line <= threshold
-
     def get_boost_pad_along_path(self, car_location, ball_location):
 
-        boost_pads = self.boost_pad_tracker.boost_pads
         closest_boost = None
         closest_distance = float('inf')
 
-        for pad in boost_pads:
-            if not pad.is_active:  # Skip inactive boost pads
-                continue
-
-            pad_location = Vec3(pad.location)
-            # Check if the boost pad is near the line between the car and the ball
-            if self.is_point_near_line(pad_location, car_location, ball_location, threshold=200):
-                distance = car_location.dist(pad_location)
-                if distance < closest_distance:
-                    closest_boost = pad_location
-                    closest_distance = distance
+        # Only active pads near the segment between the car and the ball come back from the tracker
+        for pad in self.boost_pad_tracker.get_active_pads_near_path(car_location, ball_location, distance=200):
+            pad_location = pad.location
+            distance = car_location.dist(pad_location)
+            if distance < closest_distance:
+                closest_boost = pad_location
+                closest_distance = distance
 
         return closest_boost
     
-    def predict_straight_hit_goal(self, car_location, ball_location, team):
+    def get_output(self, packet: GameTickPacket) -> SimpleControllerState:
         """
-        Predicts if driving straight into the ball will send it into the opponent's net.
+        This function will be called by the framework many times per second. This is where you can
+        see the motion of the ball, etc. and return controls to drive your car.
+        """
+        if self.recorder is not None:
+            self.recorder.record_tick(packet, self.get_ball_prediction_struct())
+
+        # The profiler is a NullProfiler unless enable_profiler is set in bot.cfg
+        self.profiler.begin_tick()
+        try:
+            return self.choose_controls(packet)
+        finally:
+            with self.profiler.section('rendering'):
+                self.render_queue.flush()
+            self.profiler.end_tick()
+
+    def choose_controls(self, packet: GameTickPacket) -> SimpleControllerState:
+        # Keep our boost pad info, ball prediction etc. updated. If another bot in this process already
+        # did it for this frame, this returns right away.
+        with self.profiler.section('tracker'):
+            self.world.update(packet, self.get_ball_prediction_struct)
+
+        self.inputs.update(packet)
+        # Only copies the packet and the prediction if the plan will be made from them
+        self.planner.offer(self.inputs.game_time, lambda: self.planning_snapshot(packet))
+        controls = self.state_machine.tick(self.inputs, packet.game_info.seconds_elapsed)
+
+        with self.profiler.section('rendering'):
+            #add a debug string to show data about the game
+            self.render_queue.draw_string_2d(20, 20, 2, 2, "Boost: {}", self.render_queue.white(),
+                                             packet.game_cars[self.index].boost)
+            self.render_queue.draw_string_2d(20, 60, 2, 2, "Ball Y: {}", self.render_queue.white(),
+                                             packet.game_ball.physics.location.y)
+
+            #add debug strings to show what the bot decided, and what it looked at to decide it
+            self.render_queue.draw_string_2d(20, 100, 2, 2, "State: {}", self.render_queue.white(),
+                                             self.state_machine.state.name)
+            self.render_queue.draw_string_2d(20, 140, 2, 2, "Active Maneuver: {}", self.render_queue.white(),
+                                             self.maneuvers.maneuver)
+            self.render_queue.draw_string_2d(20, 180, 2, 2, "Possession: {}", self.render_queue.white(),
+                                             POSSESSION_NAMES[self.world.possession.possessing_team])
+            threat = self.world.goal_predictor.threat
+            if threat is not None:
+                self.render_queue.draw_string_2d(20, 220, 2, 2, "Goal for {} in {:.1f}s ({:.0%} sure)",
+                                                 self.render_queue.white(), POSSESSION_NAMES[1 - threat.team],
+                                                 threat.time_to_goal, threat.confidence)
+            if self.render_queue.enabled:
+                self.render_queue.draw_string_2d(20, 260, 1, 1, "Inputs: {}", self.render_queue.white(),
+                                                 ', '.join(sorted(self.inputs.computed())))
 
-        Args:
-            car_location (Vec3): The location of the car.
-            ball_location (Vec3): The location of the ball.
-            team (int): The team of the car (0 for blue, 1 for orange).
+        return controls
 
-        Returns:
-            bool: True if the ball will go into the opponent's net, False otherwise.
-        """
-        # Get the opponent's goal location
-        opponent_goal = get_enemy_goal_location(team)
+    def make_states(self) -> List[State]:
+        """The bot's states, most important first. The first one that applies chooses the controls."""
+        return [
+            State('maneuver', when=lambda i: self.maneuvers.active, act=self.continue_maneuver),
+            State('kickoff', when=lambda i: i.packet.game_info.is_kickoff_pause, act=self.kickoff,
+                  needs=('orientation',)),
+            State('wait', when=self.ball_is_high_overhead, act=self.wait_under_ball,
+                  needs=('ball_distance', 'ball_xy_distance', 'car_speed')),
+            State('attack', when=lambda i: i.straight_hit, act=self.attack,
+                  needs=('straight_hit', 'orientation', 'ball_distance')),
+            State('defend', when=lambda i: i.goal_exposed and i.ball_advantage < 0, act=self.defend,
+                  needs=('goal_exposed', 'ball_advantage', *DRIVE_TO_NEEDS)),
+            State('intercept', when=lambda i: i.ball_speed > 500 and i.intercept is not None, act=self.go_to_intercept,
+                  needs=('ball_speed', 'plan', *DRIVE_TO_NEEDS)),
+            State('recover boost', when=lambda i: i.car.boost < 70 and i.boost_pad_on_path is not None,
+                  act=lambda i: self.drive_to(i, i.boost_pad_on_path), needs=('boost_pad_on_path', *DRIVE_TO_NEEDS)),
+            State('chase', when=None, act=self.chase, needs=('plan', *DRIVE_TO_NEEDS)),
+        ]
+
+    def continue_maneuver(self, inputs: 'BotInputs') -> Optional[SimpleControllerState]:
+        # This will be None on the tick the maneuver ends, and the next state takes over.
+        return self.maneuvers.tick(inputs.packet.game_info.seconds_elapsed)
+
+    def ball_is_high_overhead(self, inputs: 'BotInputs') -> bool:
+        # We're (almost) standing still right under a ball that's in the air.
+        return (inputs.ball_distance < 1500 and inputs.ball_xy_distance < 300 and inputs.ball_location.z > 100
+                and inputs.car_speed <= 100)
+
+    def wait_under_ball(self, inputs: 'BotInputs') -> SimpleControllerState:
+        return self.slow_down_if_ball_is_high(inputs)
+
+    def attack(self, inputs: 'BotInputs') -> SimpleControllerState:
+        # Driving straight into the ball should send it into their goal, so go for it at full speed
+        controls = SimpleControllerState(throttle=1.0, boost=True)
+        with self.profiler.section('steering'):
+            controls.steer = steer_toward_target(inputs.car, inputs.ball_location, inputs.orientation)
+        if inputs.ball_distance < 300:
+            self.begin_front_flip(inputs.packet)  # Call the front flip sequence
+        return controls
 
-        # Calculate the direction from the ball to the opponent's goal
-        direction_to_goal = (opponent_goal - ball_location).normalized()
+    def defend(self, inputs: 'BotInputs') -> SimpleControllerState:
+        # They'll get to the ball first and could get to our goal first too, so get back in front of it
+        own_goal = ENEMY_GOALS[1 - self.team]
+        position = Vec3(0, own_goal.y - math.copysign(DEFENSIVE_DEPTH, own_goal.y), 0)
+        return self.drive_to(inputs, position, self.shot_heading(position))
+
+    def kickoff(self, inputs: 'BotInputs') -> SimpleControllerState:
+        if inputs.packet.game_info.is_round_active:
+            # On the first tick we can move, start the tuned routine for our spawn. Once we've left the spawn there's
+            # no routine any more, so it never starts twice.
+            routine = self.kickoffs.routine_for(inputs.car.physics.location, self.team)
+            if routine is not None:
+                self.maneuvers.start(routine, inputs.game_time, priority=1)
+                return self.maneuvers.tick(inputs.game_time)
+        # Otherwise, let's just drive straight towards the ball
+        controls = SimpleControllerState(throttle=1.0, boost=True)
+        with self.profiler.section('steering'):
+            controls.steer = steer_toward_target(inputs.car, inputs.ball_location, inputs.orientation)
+        return controls
 
-        # Calculate the direction from the car to the ball
-        direction_to_ball = (ball_location - car_location).normalized()
+    def go_to_intercept(self, inputs: 'BotInputs') -> SimpleControllerState:
+        self.render_queue.draw_line_3d(inputs.ball_location, inputs.intercept.location, self.render_queue.cyan())
+        return self.drive_to(inputs, inputs.plan.target, path=inputs.plan.path)
 
-        # Check if the car's direction to the ball aligns with the ball's direction to the goal
-        alignment = direction_to_ball.dot(direction_to_goal)
+    def chase(self, inputs: 'BotInputs') -> SimpleControllerState:
+        if inputs.plan is None:
+            # No fresh plan from the planning thread, so just head for the ball
+            return self.drive_to(inputs, inputs.ball_location)
+        return self.drive_to(inputs, inputs.plan.target, path=inputs.plan.path)
 
-        # If the alignment is close to 1, the ball is likely to go into the goal
-        return alignment > 0.95  # Adjust the threshold as needed
+    def planning_snapshot(self, packet: GameTickPacket) -> PlanningSnapshot:
+        snapshot = self.world.snapshot
+        return PlanningSnapshot(snapshot.game_time, PlayerInfo.from_buffer_copy(packet.game_cars[self.index]),
+                                snapshot.ball_location(), self.ball_prediction.copy())
 
-    def get_output(self, packet: GameTickPacket) -> SimpleControllerState:
-        controls = SimpleControllerState()
+    def plan_move(self, snapshot: PlanningSnapshot) -> MovePlan:
         """
-        This function will be called by the framework many times per second. This is where you can
-        see the motion of the ball, etc. and return controls to drive your car.
+        The expensive part of going for the ball: the intercept search and a path there that arrives facing their
+        goal. This may run on the planner worker's thread, so it only looks at the snapshot.
         """
-        
-
-        # Keep our boost pad info updated with which pads are currently active
-        self.boost_pad_tracker.update_boost_status(packet)
-
-        # This is good to keep at the beginning of get_output. It will allow you to continue
-        # any sequences that you may have started during a previous call to get_output.
-        if self.active_sequence is not None and not self.active_sequence.done:
-            controls = self.active_sequence.tick(packet)
-            if controls is not None:
-                return controls
-
-        # Gather some information about our car and the ball
-        my_car = packet.game_cars[self.index]
-        car_location = Vec3(my_car.physics.location)
-        car_rotation = my_car.physics.rotation
-        car_velocity = Vec3(my_car.physics.velocity)
-        ball_location = Vec3(packet.game_ball.physics.location)  # Ensure ball_location is defined here
-        ball_speed = Vec3(packet.game_ball.physics.velocity).length()
-
-             
-
-        azimuth_to_ball = calculate_azimuth_to_ball(car_location, car_rotation, ball_location)
-        self.renderer.draw_string_2d(20, 190, 2, 2, f"Azimuth to Ball: {azimuth_to_ball:.2f}", self.renderer.white())
-
-
-        # Classify the ball location
-        ball_side = classify_ball_location(ball_location, self.team)
-
-        # By default we will chase the ball, but target_location can be changed later
-        target_location = ball_location
-
-        if my_car.boost < 50 and car_location.dist(ball_location) > 2500:
-            # If we're low on boost, let's grab some pads
-            target_location = self.boost_pad_tracker.get_closest_boost_pad(car_location).location
-        elif my_car.boost < 20 and car_location.dist(ball_location) > 2500:
-            # If we're really low on boost, let's just go back to the nearest big boost
-            target_location = self.boost_pad_tracker.get_closest_full_boost(car_location)
-                       
-
-        # By default we will chase the ball, but target_location can be changed later
-        target_location = ball_location
-
-        if my_car.boost < 70:
-        # Find the closest boost pad along the path to the ball
-            closest_boost_pad = self.get_boost_pad_along_path(car_location, ball_location)
-            if closest_boost_pad is not None:
-                target_location = closest_boost_pad
-
-        if car_location.dist(ball_location) < 1500:  # Only check when the car is close to the ball
-            controls = self.slow_down_if_ball_is_high(car_location, ball_location, car_velocity)
-            if controls.throttle == 0.0:  # If the car is stopping, return the controls
-                return controls
-                
-
-
-        if car_location.dist(ball_location):
-            # We're far away from the ball, let's try to lead it a little bit
-            ball_prediction = self.get_ball_prediction_struct()  # This can predict bounces, etc
-            if ball_speed > 500:
-                ball_in_future = find_slice_at_time(ball_prediction, packet.game_info.seconds_elapsed)
-            if ball_speed > 1000:
-                ball_in_future = find_slice_at_time(ball_prediction, packet.game_info.seconds_elapsed + 0.3)
-            if ball_speed > 1500:
-                ball_in_future = find_slice_at_time(ball_prediction, packet.game_info.seconds_elapsed + 0.5)  
-
-            # ball_in_future might be None if we don't have an adequate ball prediction right now, like during
-            # replays, so check it to avoid errors.
-                if ball_in_future is not None:
-                    target_location = Vec3(ball_in_future.physics.location)
-                    self.renderer.draw_line_3d(ball_location, target_location, self.renderer.cyan())
-
-        # Draw some things to help understand what the bot is thinking
-        self.renderer.draw_line_3d(car_location, target_location, self.renderer.white())
-        self.renderer.draw_string_3d(car_location, 1, 1, f'Speed: {car_velocity.length():.1f}', self.renderer.white())
-        self.renderer.draw_rect_3d(target_location, 8, 8, True, self.renderer.cyan(), centered=True)
-
-        #add a debug string to show data about the game
-        self.renderer.draw_string_2d(20, 20, 2, 2, f"Boost: {my_car.boost}", self.renderer.white())
-        self.renderer.draw_string_2d(20, 60, 2, 2, f"Ball Y: {ball_location.y}", self.renderer.white())
-        
-        #add a debug string to show what the active sequence is
-        self.renderer.draw_string_2d(20, 100, 2, 2, f"Active Sequence: {self.active_sequence}", self.renderer.white())
-
-        if self.predict_straight_hit_goal(car_location, ball_location, self.team):
-            self.renderer.draw_string_2d(20, 260, 2, 2, "Straight Hit: Goal Likely!", self.renderer.green())
-            target_location = ball_location
-            controls.throttle = 1.0
-            controls.steer = steer_toward_target(my_car, target_location)
-            controls.boost = True
-            if  car_location.dist(ball_location) < 300:
-                self.begin_front_flip(packet)  # Call the front flip sequence
-            return controls
-        else:
-            self.renderer.draw_string_2d(20, 260, 2, 2, "Straight Hit: Goal Unlikely", self.renderer.red())
-            
-        if packet.game_info.is_kickoff_pause:
-            # If it's a kickoff, let's just drive straight towards the ball
-            controls.throttle = 1.0
-            controls.boost = True
-            controls.steer = steer_toward_target(my_car, ball_location)
-            return controls
-
-        controls.steer = steer_toward_target(my_car, target_location)
-        controls.throttle = 1.0
-
-        if car_velocity.length() > 1000 and my_car.boost > 20 and -120 < azimuth_to_ball < 120:
+        orientation = Orientation(snapshot.car.physics.rotation)
+        intercept = find_intercept(snapshot.prediction, snapshot.car, orientation, snapshot.game_time)
+        target = intercept.location if intercept is not None else snapshot.ball_location
+        path = self.move_path_planner.plan(snapshot.car, orientation, target, self.shot_heading(target))
+        return MovePlan(intercept, target, path)
+
+    def shot_heading(self, target_location: Vec3) -> float:
+        """The heading (yaw) to reach the target with, so that we hit the ball there towards their goal."""
+        goal = ENEMY_GOALS[self.team]
+        return math.atan2(goal.y - target_location.y, goal.x - target_location.x)
+
+    def drive_to(self, inputs: 'BotInputs', target_location: Vec3, arrival_heading: Optional[float] = None,
+                 path: Optional[DubinsPath] = None) -> SimpleControllerState:
+        """
+        Drives to the target. With an arrival heading, along a planned path that gets there facing that way, or along
+        the given path that was planned already.
+        """
+        controls = SimpleControllerState(throttle=1.0)
+        with self.profiler.section('steering'):
+            if path is not None:
+                controls.steer = self.path_planner.follow(inputs.car, inputs.orientation, path, MAX_DETOUR)
+            elif arrival_heading is None:
+                controls.steer = steer_toward_target(inputs.car, target_location, inputs.orientation)
+            else:
+                controls.steer = self.path_planner.steer(inputs.car, inputs.orientation, target_location,
+                                                         arrival_heading, MAX_DETOUR)
+        # Cheapest checks first, the azimuth is only computed when we're fast and have boost to spend
+        if inputs.car.boost > 20 and inputs.car_speed > 1000 and -120 < inputs.azimuth_to_ball < 120:
             controls.boost = True
-            return controls
-        
-    
-
-        # Add a debug string to show the current field side of the ball
-        ball_side = classify_ball_location(ball_location, self.team)  # Call the function to get the ball side
-        if ball_side == "team side":
-            self.renderer.draw_string_2d(20, 80, 2, 2, "Ball Side: Teamside", self.renderer.white())
-        elif ball_side == "opponent side":
-            self.renderer.draw_string_2d(20, 80, 2, 2, "Ball Side: Opponentside", self.renderer.white())
 
+        with self.profiler.section('rendering'):
+            # Draw some things to help understand what the bot is thinking
+            if (arrival_heading is None and path is None) or not self.path_planner.following:
+                self.render_queue.draw_line_3d(inputs.car_location, target_location, self.render_queue.white())
+            elif self.render_queue.enabled:
+                points = self.path_planner.path.points[::PATH_RENDER_STEP]
+                for start, end in zip(points, points[1:]):
+                    self.render_queue.draw_line_3d((*start, 20), (*end, 20), self.render_queue.white())
+            self.render_queue.draw_rect_3d(target_location, 8, 8, True, self.render_queue.cyan(), centered=True)
         return controls
-
-
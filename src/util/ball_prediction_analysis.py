@@ -1,6 +1,7 @@
-from typing import Callable
+from typing import Callable, Optional, Union
 
-from rlbot.utils.structures.ball_prediction_struct import BallPrediction, Slice
+import numpy as np
+from rlbot.utils.structures.ball_prediction_struct import BallPrediction, Slice, MAX_SLICES
 
 # field length(5120) + ball radius(93) = 5213 however that results in false positives
 GOAL_THRESHOLD = 5235
@@ -10,12 +11,160 @@ GOAL_THRESHOLD = 5235
 # time span. Unit is the number of frames in the ball prediction, and the prediction is at 60 frames per second.
 GOAL_SEARCH_INCREMENT = 20
 
+# A Slice is made of 13 floats: location(3), rotation(3), velocity(3), angular velocity(3) and game_seconds.
+_FLOATS_PER_SLICE = 13
 
-def find_slice_at_time(ball_prediction: BallPrediction, game_time: float):
+
+class _Vec3Columns:
+    """
+    Holds the x, y and z columns of an (N, 3) array so that code written for a single Slice, like
+    `s.physics.location.y`, reads a whole column of the prediction at once.
+    """
+    __slots__ = ['x', 'y', 'z']
+
+    def __init__(self, array: np.ndarray):
+        self.x = array[:, 0]
+        self.y = array[:, 1]
+        self.z = array[:, 2]
+
+
+class _PhysicsColumns:
+    __slots__ = ['location', 'velocity', 'angular_velocity']
+
+    def __init__(self, prediction: 'PredictionArray'):
+        self.location = _Vec3Columns(prediction.location)
+        self.velocity = _Vec3Columns(prediction.velocity)
+        self.angular_velocity = _Vec3Columns(prediction.angular_velocity)
+
+
+class PredictionArray:
+    """
+    A copy of the ball prediction held in contiguous NumPy arrays, so questions like "when does the ball
+    enter a goal" can be answered with one vectorized comparison instead of a Python loop over up to 360 slices.
+
+    Build it once per tick and pass it around wherever a BallPrediction is accepted:
+    `prediction = PredictionArray(self.get_ball_prediction_struct())`.
+    Call update() with the next tick's prediction to reuse the same buffers.
+
+    The view also mimics the attribute layout of a Slice (`physics.location.y`, `game_seconds`, ...), with every
+    attribute being a column of the prediction. This lets the same lambda work both on a Slice and on the whole array.
+
+    For a single query on a prediction you won't keep, PredictionArray.view() reads the struct's memory directly
+    instead of copying it.
+    """
+
+    def __init__(self, ball_prediction: BallPrediction = None):
+        self._buffer = np.zeros((MAX_SLICES, _FLOATS_PER_SLICE), dtype=np.float32)
+        self._is_view = False
+        self.ball_prediction: Optional[BallPrediction] = None
+        self.num_slices = 0
+        self.physics: Optional[_PhysicsColumns] = None
+        self._set_views(0)
+        if ball_prediction is not None:
+            self.update(ball_prediction)
+
+    @classmethod
+    def view(cls, ball_prediction: BallPrediction) -> 'PredictionArray':
+        """
+        Read-only arrays over the prediction's own memory, so nothing is allocated or copied. They change when the
+        framework overwrites the prediction, so use them right away. update() moves the view to another prediction.
+        """
+        prediction = cls.__new__(cls)
+        prediction._is_view = True
+        prediction.num_slices = 0
+        prediction.physics = None
+        prediction.update(ball_prediction)
+        return prediction
+
+    def update(self, ball_prediction: BallPrediction):
+        """Copies a new ball prediction into the arrays. Call this once per tick."""
+        self.ball_prediction = ball_prediction
+        n = ball_prediction.num_slices
+        raw = np.frombuffer(ball_prediction.slices, dtype=np.float32).reshape(MAX_SLICES, _FLOATS_PER_SLICE)
+        if self._is_view:
+            raw.flags.writeable = False
+            self._buffer = raw
+            self.physics = None  # The views have to be made again on the new memory
+        else:
+            self._buffer[:n] = raw[:n]
+        self._set_views(n)
+
+    def assign(self, other: 'PredictionArray'):
+        """
+        Copies the arrays of another PredictionArray into this one's buffers, e.g. to remember last tick's prediction.
+        Cheaper than copy(), but there's no Slice struct behind the copy, so slice() doesn't work on it.
+        """
+        self.ball_prediction = None
+        n = other.num_slices
+        self._buffer[:n] = other._buffer[:n]
+        self._set_views(n)
+
+    def _set_views(self, n: int):
+        # The views only depend on the number of slices, which hardly ever changes.
+        if n == self.num_slices and self.physics is not None:
+            return
+        self.num_slices = n
+        self.game_seconds = self._buffer[:n, 12]
+        self.location = self._buffer[:n, 0:3]
+        self.velocity = self._buffer[:n, 6:9]
+        self.angular_velocity = self._buffer[:n, 9:12]
+        self.physics = _PhysicsColumns(self)
+
+    def copy(self) -> 'PredictionArray':
+        """A copy that stays the same when the framework overwrites the prediction, e.g. to hand to another thread."""
+        if self.ball_prediction is None:
+            return PredictionArray()
+        return PredictionArray(BallPrediction.from_buffer_copy(self.ball_prediction))
+
+    def __len__(self):
+        return self.num_slices
+
+    def slice(self, index: int) -> Slice:
+        """Returns the original Slice struct at the given index."""
+        return self.ball_prediction.slices[index]
+
+    def index_at_time(self, game_time: float) -> Optional[int]:
+        """Returns the index of the slice at the given game time, or None if it is outside of the prediction."""
+        if self.num_slices == 0:
+            return None
+        approx_index = int((game_time - self.game_seconds[0]) * 60)  # We know that there are 60 slices per second.
+        if 0 <= approx_index < self.num_slices:
+            return approx_index
+        return None
+
+    def first_index(self, mask: np.ndarray, start_index: int = 0) -> Optional[int]:
+        """Returns the index of the first True value in the mask at or after start_index, or None."""
+        mask = mask[start_index:]
+        if mask.size == 0:
+            return None
+        index = int(np.argmax(mask))
+        if not mask[index]:
+            return None
+        return start_index + index
+
+    def first_index_below_height(self, height: float, start_index: int = 0) -> Optional[int]:
+        return self.first_index(self.location[:, 2] < height, start_index)
+
+    def first_index_in_goal(self, goal_threshold: float = GOAL_THRESHOLD, start_index: int = 0) -> Optional[int]:
+        return self.first_index(np.abs(self.location[:, 1]) >= goal_threshold, start_index)
+
+
+def as_prediction_array(ball_prediction: Union[BallPrediction, PredictionArray]) -> PredictionArray:
+    """The PredictionArray itself, or a view of the BallPrediction for a query right away. See PredictionArray.view."""
+    if isinstance(ball_prediction, PredictionArray):
+        return ball_prediction
+    return PredictionArray.view(ball_prediction)
+
+
+def find_slice_at_time(ball_prediction: Union[BallPrediction, PredictionArray], game_time: float):
     """
     This will find the future position of the ball at the specified time. The returned
     Slice object will also include the ball's velocity, etc.
     """
+    if isinstance(ball_prediction, PredictionArray):
+        index = ball_prediction.index_at_time(game_time)
+        return ball_prediction.slice(index) if index is not None else None
+    # A single lookup doesn't need the whole prediction copied.
     start_time = ball_prediction.slices[0].game_seconds
     approx_index = int((game_time - start_time) * 60)  # We know that there are 60 slices per second.
     if 0 <= approx_index < ball_prediction.num_slices:
@@ -23,26 +172,53 @@ def find_slice_at_time(ball_prediction: BallPrediction, game_time: float):
     return None
 
 
-def predict_future_goal(ball_prediction: BallPrediction):
+def predict_future_goal(ball_prediction: Union[BallPrediction, PredictionArray]):
     """
     Analyzes the ball prediction to see if the ball will enter one of the goals. Only works on standard arenas.
     Will return the first ball slice which appears to be inside the goal, or None if it does not enter a goal.
     """
-    return find_matching_slice(ball_prediction, 0, lambda s: abs(s.physics.location.y) >= GOAL_THRESHOLD,
-                               search_increment=20)
+    prediction = as_prediction_array(ball_prediction)
+    index = prediction.first_index_in_goal()
+    return prediction.slice(index) if index is not None else None
 
 
-def find_matching_slice(ball_prediction: BallPrediction, start_index: int, predicate: Callable[[Slice], bool],
-                        search_increment=1):
+def find_matching_slice(ball_prediction: Union[BallPrediction, PredictionArray], start_index: int,
+                        predicate: Callable[[Slice], bool], search_increment=1):
     """
     Tries to find the first slice in the ball prediction which satisfies the given predicate. For example,
     you could find the first slice below a certain height. Will skip ahead through the packet by search_increment
     for better efficiency, then backtrack to find the exact first slice.
+
+    The predicate is called with one Slice at a time. Predicates made of simple comparisons are much faster with
+    find_first, which checks every slice at once.
     """
+    if isinstance(ball_prediction, PredictionArray):
+        slices = ball_prediction.ball_prediction.slices
+    else:
+        slices = ball_prediction.slices
     for coarse_index in range(start_index, ball_prediction.num_slices, search_increment):
-        if predicate(ball_prediction.slices[coarse_index]):
-            for j in range(max(start_index, coarse_index - search_increment), coarse_index):
-                ball_slice = ball_prediction.slices[j]
+        if predicate(slices[coarse_index]):
+            # The coarse slice matches, so the first match is in the window that ends with it.
+            for j in range(max(start_index, coarse_index - search_increment + 1), coarse_index + 1):
+                ball_slice = slices[j]
                 if predicate(ball_slice):
                     return ball_slice
     return None
+
+
+MaskFunction = Callable[[PredictionArray], np.ndarray]
+
+
+def find_first(ball_prediction: Union[BallPrediction, PredictionArray], mask_function: MaskFunction,
+               start_index: int = 0) -> Optional[Slice]:
+    """
+    Like find_matching_slice, but mask_function gets the whole PredictionArray and returns a boolean array with
+    a value for every slice, e.g. `lambda p: p.physics.location.z < 100`. Returns the first slice at or after
+    start_index where it's True, or None.
+    """
+    prediction = as_prediction_array(ball_prediction)
+    mask = np.asarray(mask_function(prediction), dtype=bool)
+    if mask.shape != (prediction.num_slices,):
+        raise ValueError(f'mask_function returned shape {mask.shape}, expected ({prediction.num_slices},)')
+    index = prediction.first_index(mask, start_index)
+    return prediction.slice(index) if index is not None else None
@@ -0,0 +1,198 @@
+"""
+A simple ball simulator that can step many balls at once. It's nowhere near as accurate as the framework's
+ball prediction, but it works for any start state, so you can ask "what if I hit it here?", and it can go
+beyond the end of the framework's prediction.
+
+Not modelled: the curved ramps between the floor, walls and ceiling, and collisions with cars.
+The bounce model follows the one described in chip's notes on Rocket League ball physics.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from util.ball_prediction_analysis import PredictionArray
+from util.vec import Vec3
+
+GRAVITY = -650
+BALL_RADIUS = 92.75
+MAX_SPEED = 6000
+MAX_ANGULAR_SPEED = 6
+# Fraction of the velocity lost per second to air drag.
+DRAG = 0.0305
+RESTITUTION = 0.6
+FRICTION = 0.285
+# How strongly spin and sliding affect each other during a bounce.
+SPIN_COUPLING = 0.0003
+SLIDING_FACTOR = 2.0
+
+# The framework's prediction has 60 slices per second.
+SLICE_DT = 1 / 60
+
+
+@dataclass
+class Arena:
+    """The dimensions of a box shaped soccar arena with a goal at each end. All distances in unreal units."""
+    half_width: float = 4096  # Side walls at x = ±half_width
+    half_length: float = 5120  # Back walls, and the goal lines, at y = ±half_length
+    height: float = 2044
+    corner: float = 8064  # The 45 degree corner walls are at |x| + |y| = corner
+    goal_half_width: float = 892.755
+    goal_height: float = 642.775
+    # How far the goals reach behind the goal lines. The simulator stops a ball as soon as it's over the line, so
+    # this is only for the goal volumes in goal_prediction and the simulated backend's walls.
+    goal_depth: float = 880
+
+
+STANDARD_ARENA = Arena()
+
+
+class BallStates:
+    """The state of N balls, one row per ball. scored is 0 while in play, or ±1 for the side of the goal it went in."""
+
+    def __init__(self, location, velocity, angular_velocity=None):
+        self.location = np.array(location, dtype=float).reshape(-1, 3)
+        self.velocity = np.array(velocity, dtype=float).reshape(-1, 3)
+        if angular_velocity is None:
+            angular_velocity = np.zeros_like(self.location)
+        self.angular_velocity = np.array(angular_velocity, dtype=float).reshape(-1, 3)
+        self.scored = np.zeros(len(self.location), dtype=int)
+
+    def __len__(self):
+        return len(self.location)
+
+    @staticmethod
+    def from_prediction(prediction: PredictionArray, index: int = 0) -> 'BallStates':
+        """The ball state at one slice of a prediction."""
+        return BallStates(prediction.location[index], prediction.velocity[index],
+                          prediction.angular_velocity[index])
+
+
+class BallSimulator:
+    """
+    Steps BallStates forward in time. Every step handles all the balls with a few array operations, so simulating
+    dozens of candidate balls costs little more than simulating one.
+    """
+
+    def __init__(self, arena: Arena = STANDARD_ARENA, dt: float = 1 / 120):
+        self.arena = arena
+        self.dt = dt
+        # Walls as (inward normal, offset): a point p is inside when dot(p, normal) >= offset.
+        diagonal = 1 / np.sqrt(2)
+        walls = [
+            ((0, 0, 1), 0),
+            ((0, 0, -1), -arena.height),
+            ((1, 0, 0), -arena.half_width),
+            ((-1, 0, 0), -arena.half_width),
+            ((0, 1, 0), -arena.half_length),
+            ((0, -1, 0), -arena.half_length),
+            ((diagonal, diagonal, 0), -arena.corner * diagonal),
+            ((-diagonal, diagonal, 0), -arena.corner * diagonal),
+            ((diagonal, -diagonal, 0), -arena.corner * diagonal),
+            ((-diagonal, -diagonal, 0), -arena.corner * diagonal),
+        ]
+        self._normals = np.array([n for n, _ in walls], dtype=float)
+        self._offsets = np.array([d for _, d in walls], dtype=float)
+        self._back_walls = np.array([False, False, False, False, True, True, False, False, False, False])
+
+    def step(self, balls: BallStates, dt: float = None):
+        """Moves all balls forward by dt seconds, in place."""
+        dt = self.dt if dt is None else dt
+        active = balls.scored == 0
+        velocity = balls.velocity
+        velocity[:, 2] += GRAVITY * dt
+        velocity *= 1 - DRAG * dt
+        _clamp_length(velocity, MAX_SPEED)
+        balls.location += velocity * dt * active[:, np.newaxis]
+        self._bounce(balls, active)
+        _clamp_length(balls.angular_velocity, MAX_ANGULAR_SPEED)
+        self._check_goals(balls)
+        velocity[~active] = 0
+
+    def _bounce(self, balls: BallStates, active: np.ndarray):
+        location = balls.location
+        # Distance from every ball to every wall, shape (N, walls).
+        distance = location @ self._normals.T - self._offsets
+        # The back walls have a hole where the goal is.
+        in_goal_mouth = ((np.abs(location[:, 0]) < self.arena.goal_half_width - BALL_RADIUS)
+                         & (location[:, 2] < self.arena.goal_height - BALL_RADIUS))
+        distance[in_goal_mouth[:, np.newaxis] & self._back_walls] = np.inf
+        penetration = BALL_RADIUS - distance
+        wall = np.argmax(penetration, axis=1)
+        depth = penetration[np.arange(len(location)), wall]
+        normal = self._normals[wall]
+        approaching = np.einsum('ij,ij->i', balls.velocity, normal) < 0
+        hit = (depth > 0) & approaching & active
+        if not hit.any():
+            return
+
+        n = normal[hit]
+        v = balls.velocity[hit]
+        w = balls.angular_velocity[hit]
+        v_perp = np.einsum('ij,ij->i', v, n)[:, np.newaxis] * n
+        v_para = v - v_perp
+        slip = v_para + BALL_RADIUS * np.cross(n, w)
+        slip_speed = np.linalg.norm(slip, axis=1)
+        ratio = np.linalg.norm(v_perp, axis=1) / np.maximum(slip_speed, 1e-6)
+        delta_perp = -(1 + RESTITUTION) * v_perp
+        delta_para = -np.minimum(1, SLIDING_FACTOR * ratio)[:, np.newaxis] * FRICTION * slip
+        balls.velocity[hit] = v + delta_perp + delta_para
+        balls.angular_velocity[hit] = w + SPIN_COUPLING * BALL_RADIUS * np.cross(delta_para, n)
+        # Push the ball back out of the wall.
+        balls.location[hit] += n * depth[hit][:, np.newaxis]
+
+    def _check_goals(self, balls: BallStates):
+        y = balls.location[:, 1]
+        crossed = (np.abs(y) > self.arena.half_length + BALL_RADIUS) & (balls.scored == 0)
+        balls.scored[crossed] = np.sign(y[crossed]).astype(int)
+
+    def simulate(self, balls: BallStates, duration: float, record_dt: float = SLICE_DT) -> np.ndarray:
+        """
+        Simulates all balls for the given duration and returns their locations every record_dt seconds,
+        as an array of shape (steps, N, 3). The balls are moved in place.
+        """
+        steps_per_record = max(1, int(round(record_dt / self.dt)))
+        records = int(duration / record_dt)
+        trajectory = np.empty((records, len(balls), 3))
+        for i in range(records):
+            for _ in range(steps_per_record):
+                self.step(balls)
+            trajectory[i] = balls.location
+        return trajectory
+
+    def validate(self, prediction: PredictionArray, start_index: int = 0) -> np.ndarray:
+        """
+        Simulates the ball from one slice of the framework's prediction and returns the distance between our
+        location and the framework's for every following slice. Use it to check how far our simulation can be trusted.
+        """
+        balls = BallStates.from_prediction(prediction, start_index)
+        remaining = prediction.num_slices - start_index - 1
+        trajectory = self.simulate(balls, remaining * SLICE_DT)
+        expected = prediction.location[start_index + 1:start_index + 1 + len(trajectory)]
+        return np.linalg.norm(trajectory[:, 0] - expected, axis=1)
+
+    def location_at_time(self, prediction: PredictionArray, game_time: float) -> Vec3:
+        """
+        Like find_slice_at_time, but for times after the end of the prediction the ball is simulated onwards from
+        the last slice instead of giving up. Returns None if there is no prediction at all.
+        """
+        index = prediction.index_at_time(game_time)
+        if index is not None:
+            return Vec3(*prediction.location[index])
+        if prediction.num_slices == 0 or game_time < prediction.game_seconds[0]:
+            return None
+        last = prediction.num_slices - 1
+        balls = BallStates.from_prediction(prediction, last)
+        remaining = game_time - prediction.game_seconds[last]
+        while remaining > 1e-6:
+            dt = min(self.dt, remaining)
+            self.step(balls, dt)
+            remaining -= dt
+        return Vec3(*balls.location[0])
+
+
+def _clamp_length(vectors: np.ndarray, max_length: float):
+    lengths = np.linalg.norm(vectors, axis=1)
+    too_long = lengths > max_length
+    if too_long.any():
+        vectors[too_long] *= (max_length / lengths[too_long])[:, np.newaxis]
@@ -0,0 +1,155 @@
+import heapq
+from typing import List, Optional, Sequence
+
+from util.vec import Vec3
+
+
+class _Node:
+    __slots__ = ['index', 'point', 'axis', 'left', 'right', 'mask', 'center', 'radius']
+
+    def __init__(self, index: int, point: tuple, axis: int):
+        self.index = index
+        self.point = point
+        self.axis = axis
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+        # Bitmask of every pad in this subtree, so whole branches without a wanted pad can be skipped.
+        self.mask = 0
+        # Bounding sphere of the subtree, used to prune segment queries.
+        self.center = point
+        self.radius = 0.0
+
+
+class BoostPadIndex:
+    """
+    A k-d tree over the boost pad locations. Pads never move, so build it once in initialize_boosts and
+    then query it every tick.
+
+    Pads are referred to by their index in the field info, and sets of pads are passed around as bitmasks
+    where bit i is pad i. To only consider active pads, pass the mask of active pads as `mask`, e.g. the
+    `active_mask` kept by BoostPadTracker. Works for any number of pads, so non-standard maps are fine.
+    """
+
+    def __init__(self, locations: Sequence[Vec3], is_full_boost: Sequence[bool]):
+        self.points = [(float(loc.x), float(loc.y), float(loc.z)) for loc in locations]
+        self.all_mask = (1 << len(self.points)) - 1
+        self.full_boost_mask = 0
+        for i, full in enumerate(is_full_boost):
+            if full:
+                self.full_boost_mask |= 1 << i
+        self._root = self._build(list(range(len(self.points))), 0)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self, indices: List[int], depth: int) -> Optional[_Node]:
+        if not indices:
+            return None
+        # Pads lie almost flat on the ground, so only split on x and y.
+        axis = depth % 2
+        indices.sort(key=lambda i: self.points[i][axis])
+        median = len(indices) // 2
+        node = _Node(indices[median], self.points[indices[median]], axis)
+        node.left = self._build(indices[:median], depth + 1)
+        node.right = self._build(indices[median + 1:], depth + 1)
+
+        for i in indices:
+            node.mask |= 1 << i
+        n = len(indices)
+        node.center = tuple(sum(self.points[i][k] for i in indices) / n for k in range(3))
+        node.radius = max(_dist_sq(node.center, self.points[i]) for i in indices) ** 0.5
+        return node
+
+    def nearest(self, point: Vec3, mask: int = None) -> Optional[int]:
+        """Returns the index of the pad closest to the point, considering only pads in the mask."""
+        result = self.k_nearest(point, 1, mask)
+        return result[0] if result else None
+
+    def nearest_full_boost(self, point: Vec3, mask: int = None) -> Optional[int]:
+        """Returns the index of the closest full boost pad in the mask."""
+        if mask is None:
+            mask = self.all_mask
+        return self.nearest(point, mask & self.full_boost_mask)
+
+    def k_nearest(self, point: Vec3, k: int, mask: int = None) -> List[int]:
+        """Returns the indices of up to k pads in the mask, closest first."""
+        if mask is None:
+            mask = self.all_mask
+        if k <= 0:
+            return []
+        target = (float(point.x), float(point.y), float(point.z))
+        # Max-heap of (-distance squared, index) holding the best k so far.
+        best = []
+        self._k_nearest(self._root, target, k, mask, best)
+        return [i for _, i in sorted(best, reverse=True)]
+
+    def _k_nearest(self, node: Optional[_Node], target: tuple, k: int, mask: int, best: list):
+        if node is None or not node.mask & mask:
+            return
+        if mask >> node.index & 1:
+            d = _dist_sq(node.point, target)
+            if len(best) < k:
+                heapq.heappush(best, (-d, node.index))
+            elif d < -best[0][0]:
+                heapq.heapreplace(best, (-d, node.index))
+
+        diff = target[node.axis] - node.point[node.axis]
+        near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+        self._k_nearest(near, target, k, mask, best)
+        if len(best) < k or diff * diff < -best[0][0]:
+            self._k_nearest(far, target, k, mask, best)
+
+    def within_distance_of_segment(self, start: Vec3, end: Vec3, distance: float, mask: int = None) -> List[int]:
+        """
+        Returns the indices of pads in the mask that are within the given distance of the line segment
+        from start to end, e.g. the pads we would drive over on the way to the ball. Order is unspecified.
+        """
+        if mask is None:
+            mask = self.all_mask
+        segment = _Segment(start, end)
+        result = []
+        self._within_distance_of_segment(self._root, segment, distance, mask, result)
+        return result
+
+    def _within_distance_of_segment(self, node: Optional[_Node], segment: '_Segment', distance: float,
+                                    mask: int, result: List[int]):
+        if node is None or not node.mask & mask:
+            return
+        if segment.dist_sq(node.center) > (node.radius + distance) ** 2:
+            return
+        if mask >> node.index & 1 and segment.dist_sq(node.point) <= distance * distance:
+            result.append(node.index)
+        self._within_distance_of_segment(node.left, segment, distance, mask, result)
+        self._within_distance_of_segment(node.right, segment, distance, mask, result)
+
+
+class _Segment:
+    __slots__ = ['start', 'direction', 'length_sq']
+
+    def __init__(self, start: Vec3, end: Vec3):
+        self.start = (float(start.x), float(start.y), float(start.z))
+        self.direction = (end.x - start.x, end.y - start.y, end.z - start.z)
+        self.length_sq = _dot(self.direction, self.direction)
+
+    def dist_sq(self, point: tuple) -> float:
+        sx, sy, sz = self.start
+        dx, dy, dz = self.direction
+        px, py, pz = point[0] - sx, point[1] - sy, point[2] - sz
+        t = 0.0
+        if self.length_sq > 0:
+            t = min(max((px * dx + py * dy + pz * dz) / self.length_sq, 0.0), 1.0)
+        px -= t * dx
+        py -= t * dy
+        pz -= t * dz
+        return px * px + py * py + pz * pz
+
+
+def _dot(a: tuple, b: tuple) -> float:
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _dist_sq(a: tuple, b: tuple) -> float:
+    dx = a[0] - b[0]
+    dy = a[1] - b[1]
+    dz = a[2] - b[2]
+    return dx * dx + dy * dy + dz * dz
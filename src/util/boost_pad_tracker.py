@@ -1,9 +1,24 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
 
+import numpy as np
 from rlbot.utils.structures.game_data_struct import GameTickPacket, FieldInfoPacket
 
-from util.vec import Vec3
+from util.boost_pad_index import BoostPadIndex
+from util.packet_snapshot import PacketSnapshot
+from util.vec import Vec3, Vec3Batch
+
+# Seconds it takes for a pad to become active again after it was picked up.
+FULL_BOOST_RESPAWN_TIME = 10
+SMALL_BOOST_RESPAWN_TIME = 4
+
+
+class _GameClock:
+    """The game time of the tracker's latest update, shared by all its pads so it's set once per update."""
+    __slots__ = ['game_time']
+
+    def __init__(self):
+        self.game_time = 0.0
 
 
 @dataclass
@@ -11,7 +26,24 @@ class BoostPad:
     location: Vec3
     is_full_boost: bool
     is_active: bool  # Active means it's available to be picked up
-    timer: float  # Counts the number of seconds that the pad has been *inactive*
+    respawn_time: float  # The game time at which an inactive pad becomes active again
+    _clock: _GameClock = field(default_factory=_GameClock, repr=False, compare=False)
+
+    @property
+    def timer(self) -> float:
+        """Counts the number of seconds that the pad has been *inactive*, as of the tracker's latest update."""
+        if self.is_active:
+            return 0.0
+        duration = FULL_BOOST_RESPAWN_TIME if self.is_full_boost else SMALL_BOOST_RESPAWN_TIME
+        return max(duration - (self.respawn_time - self._clock.game_time), 0.0)
+
+
+@dataclass
+class BoostPadEvent:
+    index: int
+    pad: BoostPad
+    picked_up: bool  # True when the pad was just picked up, False when it just respawned
+    game_time: float
 
 
 class BoostPadTracker:
@@ -19,25 +51,119 @@ class BoostPadTracker:
     This class merges together the boost pad location info with the is_active info so you can access it
     in one convenient list. For it to function correctly, you need to call initialize_boosts once when the
     game has started, and then update_boost_status every frame so that it knows which pads are active.
+
+    Pad state is also kept in arrays (locations, is_full_boost, is_active, respawn_times), indexed like boost_pads.
+    Each update only compares the packet against the previous one and touches the pads that changed, so most
+    frames do almost no work. If you care about pickups and respawns, use subscribe() instead of rescanning
+    the pads yourself.
     """
 
     def __init__(self):
         self.boost_pads: List[BoostPad] = []
         self._full_boosts_only: List[BoostPad] = []
+        self.index = BoostPadIndex([], [])
+        # Bit i is set when boost_pads[i] is active. Pass it to the index to only find active pads.
+        self.active_mask = 0
+        self.locations = Vec3Batch(np.zeros((0, 3)))
+        self.is_full_boost = np.zeros(0, dtype=bool)
+        self.is_active = np.zeros(0, dtype=bool)
+        self.respawn_times = np.zeros(0)
+        # The pickups and respawns seen during the latest update.
+        self.events: List[BoostPadEvent] = []
+        self._listeners: List[Callable[[BoostPadEvent], None]] = []
+        self._initialized = False
+        self._clock = _GameClock()
+        self._snapshot = PacketSnapshot()
 
     def initialize_boosts(self, game_info: FieldInfoPacket):
         raw_boosts = [game_info.boost_pads[i] for i in range(game_info.num_boosts)]
-        self.boost_pads: List[BoostPad] = [BoostPad(Vec3(rb.location), rb.is_full_boost, False, 0) for rb in raw_boosts]
+        self.boost_pads: List[BoostPad] = [BoostPad(Vec3(rb.location), rb.is_full_boost, False, 0, self._clock)
+                                           for rb in raw_boosts]
         # Cache the list of full boosts since they're commonly requested.
         # They reference the same objects in the boost_pads list.
         self._full_boosts_only: List[BoostPad] = [bp for bp in self.boost_pads if bp.is_full_boost]
+        self.index = BoostPadIndex([bp.location for bp in self.boost_pads],
+                                   [bp.is_full_boost for bp in self.boost_pads])
+        self.active_mask = 0
+        self.locations = Vec3Batch(np.array([(bp.location.x, bp.location.y, bp.location.z)
+                                             for bp in self.boost_pads]).reshape(-1, 3))
+        self.is_full_boost = np.array([bp.is_full_boost for bp in self.boost_pads], dtype=bool)
+        self.is_active = np.zeros(len(self.boost_pads), dtype=bool)
+        self.respawn_times = np.zeros(len(self.boost_pads))
+        self.events = []
+        self._initialized = False
+
+    def subscribe(self, listener: Callable[[BoostPadEvent], None]):
+        """Calls the listener with a BoostPadEvent whenever a pad is picked up or respawns."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[BoostPadEvent], None]):
+        self._listeners.remove(listener)
+
+    def update_boost_status(self, packet: GameTickPacket, snapshot: Optional[PacketSnapshot] = None):
+        """
+        Pass the WorldModel's snapshot, already updated with the packet, to read the pads from it. Without one the
+        packet is copied into the tracker's own.
+        """
+        if snapshot is None:
+            snapshot = self._snapshot
+            snapshot.read(packet)
+        count = min(snapshot.num_boost, len(self.boost_pads))
+        boosts = snapshot.boosts[:count]
+        packet_active = boosts['is_active']
+        game_time = self._clock.game_time = snapshot.game_time
+        # The first packet just tells us the current state, nothing was actually picked up or respawned.
+        notify = self._initialized
+        if notify:
+            changed = np.flatnonzero(packet_active != self.is_active[:count])
+        else:
+            changed = np.arange(count)
+            self.active_mask = 0
+            self.is_active[:] = False
+            self._initialized = True
+        self.events = []
+        for i in changed.tolist():
+            pad = self.boost_pads[i]
+            active = bool(packet_active[i])
+            pad.is_active = active
+            self.is_active[i] = active
+            if active:
+                self.active_mask |= 1 << i
+            else:
+                self.active_mask &= ~(1 << i)
+            if active:
+                respawn_time = 0
+            else:
+                # The packet timer counts how long the pad has already been inactive.
+                duration = FULL_BOOST_RESPAWN_TIME if pad.is_full_boost else SMALL_BOOST_RESPAWN_TIME
+                respawn_time = game_time + duration - float(boosts[i]['timer'])
+            pad.respawn_time = respawn_time
+            self.respawn_times[i] = respawn_time
+            if notify:
+                self.events.append(BoostPadEvent(i, pad, not active, game_time))
 
-    def update_boost_status(self, packet: GameTickPacket):
-        for i in range(packet.num_boost):
-            our_pad = self.boost_pads[i]
-            packet_pad = packet.game_boosts[i]
-            our_pad.is_active = packet_pad.is_active
-            our_pad.timer = packet_pad.timer
+        for event in self.events:
+            for listener in self._listeners:
+                listener(event)
+
+    def time_until_respawn(self, index: int, game_time: float) -> float:
+        """Seconds until the pad is active again, or 0 if it is active right now."""
+        if self.is_active[index]:
+            return 0
+        return max(self.respawn_times[index] - game_time, 0)
 
     def get_full_boosts(self) -> List[BoostPad]:
         return self._full_boosts_only
+
+    def get_closest_active_pad(self, location: Vec3) -> Optional[BoostPad]:
+        index = self.index.nearest(location, self.active_mask)
+        return self.boost_pads[index] if index is not None else None
+
+    def get_closest_active_full_boost(self, location: Vec3) -> Optional[BoostPad]:
+        index = self.index.nearest_full_boost(location, self.active_mask)
+        return self.boost_pads[index] if index is not None else None
+
+    def get_active_pads_near_path(self, start: Vec3, end: Vec3, distance: float) -> List[BoostPad]:
+        """Returns the active pads within the given distance of the straight path from start to end."""
+        return [self.boost_pads[i] for i in self.index.within_distance_of_segment(start, end, distance,
+                                                                                  self.active_mask)]
@@ -19,7 +19,12 @@ def limit_to_safe_range(value: float) -> float:
     return value
 
 
-def steer_toward_target(car: PlayerInfo, target: Vec3) -> float:
-    relative = relative_location(Vec3(car.physics.location), Orientation(car.physics.rotation), target)
+def steer_toward_target(car: PlayerInfo, target: Vec3, orientation: Orientation = None) -> float:
+    """
+    Pass the car's orientation from an OrientationCache if you have one, otherwise it's calculated from the car.
+    """
+    if orientation is None:
+        orientation = Orientation(car.physics.rotation)
+    relative = relative_location(car.physics.location, orientation, target)
     angle = math.atan2(relative.y, relative.x)
     return limit_to_safe_range(angle * 5)
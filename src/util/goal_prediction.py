@@ -0,0 +1,214 @@
+"""
+Watches the ball prediction from tick to tick and tells whether, when and into which goal the ball is going.
+
+Consecutive predictions overlap almost entirely, so the whole prediction isn't searched every tick. After a full
+search the prediction is kept as the reference, and every following prediction only has a few anchor slices
+compared with where the reference had the ball at the same time. If they agree, the ball follows the same path as
+before: a goal found before is still coming, and where there wasn't one, only the slices added at the end of the
+prediction need a look. Only when the path changed, e.g. because someone touched the ball, or when the reference is
+mostly in the past, is the whole prediction searched again. So most ticks cost a handful of slice reads, whatever
+the length of the prediction.
+
+Goals are boxes the ball's center has to be in, so arenas of other sizes work with their own GoalVolumes:
+
+    predictor = GoalPredictor(goal_volumes(Arena(half_length=6000)))
+    threat = predictor.update(prediction, game_time)    # A GoalThreat, or None if no goal is predicted
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from util.ball_prediction_analysis import GOAL_THRESHOLD, PredictionArray
+from util.ball_sim import STANDARD_ARENA, Arena
+from util.vec import Vec3
+
+# How far past the goal line the ball's center has to be. The ball radius would be just enough, but predictions
+# of balls rolling along the line then give false positives.
+GOAL_LINE_MARGIN = GOAL_THRESHOLD - STANDARD_ARENA.half_length
+
+# The new prediction counts as the same path if it's within this many uu of the reference at the first, the middle
+# and the last slice they share.
+DIVERGENCE_TOLERANCE = 30
+# Search the whole prediction again once less than this fraction of the reference is still ahead.
+MIN_REFERENCE_OVERLAP = 0.5
+# Searches of at most this many slices, like the few added at the end since the last tick, are done in plain Python.
+SMALL_SEARCH = 4
+
+# Confidence grows over this many updates that agree about the goal, and falls off with the time to the goal,
+# because the further ahead, the more likely something gets in the way.
+STABLE_UPDATES = 10
+CONFIDENCE_TIME_SCALE = 4
+# Updates agree about the goal if it's the same goal within this many seconds of each other.
+AGREEMENT_SECONDS = 0.1
+
+
+@dataclass
+class GoalVolume:
+    team: int  # The team that defends this goal
+    low: Tuple[float, float, float]  # Corners of the box the ball's center is in when it's a goal
+    high: Tuple[float, float, float]
+
+
+def goal_volumes(arena: Arena = STANDARD_ARENA, margin: float = GOAL_LINE_MARGIN) -> Tuple[GoalVolume, GoalVolume]:
+    """The goals of a box shaped arena: the space behind each goal line, blue's at negative y."""
+    near = arena.half_length + margin
+    far = arena.half_length + arena.goal_depth
+    width = arena.goal_half_width
+    return (GoalVolume(0, (-width, -far, 0), (width, -near, arena.goal_height)),
+            GoalVolume(1, (-width, near, 0), (width, far, arena.goal_height)))
+
+
+@dataclass
+class GoalThreat:
+    team: int  # The team whose goal the ball goes into
+    game_time: float  # When it gets there
+    time_to_goal: float
+    location: Vec3
+    confidence: float  # From 0 to 1, see the constants above
+
+
+class GoalPredictor:
+    """Call update() with every new prediction, e.g. through the WorldModel. threat is the latest result."""
+
+    def __init__(self, volumes: Sequence[GoalVolume] = None, tolerance: float = DIVERGENCE_TOLERANCE):
+        self.volumes = tuple(volumes) if volumes is not None else goal_volumes()
+        self.tolerance = tolerance
+        self._low = np.array([volume.low for volume in self.volumes], dtype=np.float32)
+        self._high = np.array([volume.high for volume in self.volumes], dtype=np.float32)
+        self._boxes = list(enumerate(zip(self._low.tolist(), self._high.tolist())))  # (volume index, (low, high))
+        # No goal is closer to the center line than this, so slices with a smaller |y| can be skipped right away.
+        self._reach = min(0.0 if low[1] <= 0 <= high[1] else min(abs(low[1]), abs(high[1]))
+                          for _, (low, high) in self._boxes)
+        self.threat: Optional[GoalThreat] = None
+        self.full_searches = 0
+        self.slices_examined = 0
+        # A copy of the prediction of the last full search, since the prediction itself may be a view that changes.
+        self._reference_times = np.zeros(0, dtype=np.float32)
+        self._reference_states = np.zeros((0, 6), dtype=np.float32)  # Location and velocity of every slice
+        self._reference_start = 0.0
+        self._slice_seconds = 1.0
+        self._max_shift = -1  # No prediction can be compared with the reference when it's negative
+        # Slices are numbered like the reference's from here on: slice i of a prediction that starts `shift` slices
+        # later is slice shift + i of the reference.
+        self._searched = 0  # Every slice before this one was searched
+        # The goal found on the current path: slice, volume index, game time and location of the ball.
+        self._goal: Optional[Tuple[int, int, float, Vec3]] = None
+        self._agreeing_updates = 0
+
+    def reset(self):
+        """Forgets the reference prediction, so the next update searches the whole prediction."""
+        self._max_shift = -1
+        self._goal = None
+        self._agreeing_updates = 0
+        self.threat = None
+
+    def update(self, prediction: PredictionArray, game_time: Optional[float] = None) -> Optional[GoalThreat]:
+        """The predicted goal, if any. game_time is now; it defaults to the time of the prediction's first slice."""
+        num_slices = prediction.num_slices
+        if num_slices == 0:
+            self.reset()
+            return None
+        start_time = float(prediction.game_seconds[0])
+        if game_time is None:
+            game_time = start_time
+
+        # How many slices later the prediction starts than the reference.
+        shift = round((start_time - self._reference_start) / self._slice_seconds) if self._max_shift >= 0 else -1
+        if (not 0 <= shift <= self._max_shift or (self._goal is not None and self._goal[0] < shift)
+                or self._diverged(prediction, start_time, shift)):
+            self._goal = self._found(prediction, self._search(prediction, 0), 0)
+            self._set_reference(prediction)
+            self.full_searches += 1
+            shift = 0
+        elif self._goal is None:
+            # Only the slices added at the end since the last update are new.
+            self._goal = self._found(prediction, self._search(prediction, max(self._searched - shift, 0)), shift)
+        # Otherwise the ball is on the same path, so the goal found before is still coming at the same time.
+        self._searched = shift + num_slices
+        self._remember(game_time)
+        return self.threat
+
+    def _diverged(self, prediction: PredictionArray, start_time: float, shift: int) -> bool:
+        last = min(len(self._reference_times) - shift, prediction.num_slices) - 1
+        # The new slices' times can be a fraction of a slice off from the reference's, so move its ball along.
+        dt = start_time - float(self._reference_times[shift])
+        max_distance_sq = self.tolerance ** 2
+        step = max(last // 2, 1)
+        # The anchors come out of both arrays with a single strided read each. Comparing the three of them is
+        # faster in plain Python than in NumPy, like in _check.
+        anchors = prediction.location[0:last + 1:step].tolist()
+        states = self._reference_states[shift:shift + last + 1:step].tolist()
+        self.slices_examined += len(anchors)
+        for (x, y, z), (old_x, old_y, old_z, vx, vy, vz) in zip(anchors, states):
+            dx, dy, dz = x - old_x - vx * dt, y - old_y - vy * dt, z - old_z - vz * dt
+            if dx * dx + dy * dy + dz * dz > max_distance_sq:
+                return True
+        return False
+
+    def _set_reference(self, prediction: PredictionArray):
+        self._reference_times = prediction.game_seconds.copy()
+        self._reference_states = np.hstack((prediction.location, prediction.velocity))
+        times = self._reference_times
+        if len(times) < 2:
+            self._max_shift = -1
+            return
+        self._reference_start = float(times[0])
+        self._slice_seconds = float(times[1]) - self._reference_start
+        self._max_shift = int(len(times) * (1 - MIN_REFERENCE_OVERLAP))
+
+    def _search(self, prediction: PredictionArray, start: int, end: int = None) -> Optional[Tuple[int, int]]:
+        """The first slice from start on (up to end) that is in a goal, and the goal's index in volumes."""
+        end = prediction.num_slices if end is None else min(end, prediction.num_slices)
+        if end - start <= SMALL_SEARCH:
+            return self._check(prediction, start, end)
+        y = prediction.location[start:end, 1]
+        self.slices_examined += len(y)
+        candidates = np.flatnonzero(np.abs(y) >= self._reach)
+        if len(candidates) == 0:
+            return None
+        locations = prediction.location[start + candidates, np.newaxis, :]
+        inside = ((locations >= self._low) & (locations <= self._high)).all(axis=2)
+        hits = inside.any(axis=1)
+        index = int(np.argmax(hits))
+        if not hits[index]:
+            return None
+        return start + int(candidates[index]), int(np.argmax(inside[index]))
+
+    def _check(self, prediction: PredictionArray, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """Like _search, for a few slices. Plain Python is faster than NumPy on so few."""
+        locations = prediction.location[start:end].tolist()
+        self.slices_examined += len(locations)
+        for index, (x, y, z) in enumerate(locations, start):
+            for volume, (low, high) in self._boxes:
+                if low[0] <= x <= high[0] and low[1] <= y <= high[1] and low[2] <= z <= high[2]:
+                    return index, volume
+        return None
+
+    @staticmethod
+    def _found(prediction: PredictionArray, goal: Optional[Tuple[int, int]],
+               shift: int) -> Optional[Tuple[int, int, float, Vec3]]:
+        if goal is None:
+            return None
+        index, volume = goal
+        return (shift + index, volume, float(prediction.game_seconds[index]),
+                Vec3(*prediction.location[index].tolist()))
+
+    def _remember(self, game_time: float):
+        if self._goal is None:
+            self._agreeing_updates = 0
+            self.threat = None
+            return
+        _, volume, goal_time, location = self._goal
+        team = self.volumes[volume].team
+        previous = self.threat
+        if previous is not None and previous.team == team and abs(previous.game_time - goal_time) < AGREEMENT_SECONDS:
+            self._agreeing_updates += 1
+        else:
+            self._agreeing_updates = 1
+        time_to_goal = max(goal_time - game_time, 0.0)
+        stability = min(self._agreeing_updates / STABLE_UPDATES, 1.0)
+        confidence = stability * math.exp(-time_to_goal / CONFIDENCE_TIME_SCALE)
+        self.threat = GoalThreat(team, goal_time, time_to_goal, location, confidence)
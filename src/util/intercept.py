@@ -0,0 +1,182 @@
+"""
+Finds the earliest moment in the ball prediction at which our car could get to the ball.
+
+Instead of checking slices one by one, every slice is tested at once against a simple model of what the car can
+reach: it turns towards the ball on its current turning circle, then drives straight, accelerating with throttle
+and whatever boost it has. The first slice whose distance is within reach is the intercept.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from rlbot.utils.structures.game_data_struct import PlayerInfo
+
+from util.ball_prediction_analysis import PredictionArray
+from util.orientation import Orientation
+from util.vec import Vec3
+
+MAX_CAR_SPEED = 2300
+MAX_THROTTLE_SPEED = 1410
+BOOST_ACCELERATION = 991.667
+BOOST_PER_SECOND = 33.3
+
+# Throttle acceleration at a given forward speed. It falls off linearly, then almost nothing is left near 1410.
+_THROTTLE_SPEEDS = np.array([0, 1400, MAX_THROTTLE_SPEED])
+_THROTTLE_ACCELERATIONS = np.array([1600, 160, 0])
+
+# Tightest turn the car can make at a given speed, as curvature (1 / turn radius).
+CURVATURE_SPEEDS = np.array([0, 500, 1000, 1500, 1750, 2300])
+CURVATURES = np.array([0.0069, 0.00398, 0.00235, 0.001375, 0.0011, 0.00088])
+
+# The car doesn't need to touch the ball's center. Roughly the ball radius plus half a car.
+CONTACT_DISTANCE = 92.75 + 60
+# Without jumping, the car can't reach a ball whose center is higher than this.
+MAX_REACH_HEIGHT = 200
+
+_TABLE_DT = 1 / 120
+_TABLE_DURATION = 10
+
+
+def turn_radius(speed: float) -> float:
+    """Radius of the tightest turn the car can make at the given forward speed."""
+    return 1 / np.interp(abs(speed), CURVATURE_SPEEDS, CURVATURES)
+
+
+def throttle_acceleration(speed: float) -> float:
+    """Acceleration from full throttle at the given forward speed, without boost."""
+    return float(np.interp(speed, _THROTTLE_SPEEDS, _THROTTLE_ACCELERATIONS))
+
+
+def _acceleration_table(boost: bool):
+    """
+    Speed and distance travelled over time while driving straight from standstill, with or without boost.
+    Acceleration only depends on speed, so the curve for any other starting speed is the tail of this one.
+    """
+    steps = int(_TABLE_DURATION / _TABLE_DT) + 1
+    speeds = np.empty(steps)
+    distances = np.empty(steps)
+    speed = distance = 0.0
+    max_speed = MAX_CAR_SPEED if boost else MAX_THROTTLE_SPEED
+    for i in range(steps):
+        speeds[i] = speed
+        distances[i] = distance
+        acceleration = throttle_acceleration(speed)
+        if boost:
+            acceleration += BOOST_ACCELERATION
+        new_speed = speed + acceleration * _TABLE_DT
+        if new_speed > max_speed - 1:
+            # Throttle alone only creeps up to its top speed, close enough is good enough.
+            new_speed = max_speed
+        distance += (speed + new_speed) / 2 * _TABLE_DT
+        speed = new_speed
+    return speeds, distances, max_speed
+
+
+_BOOST_TABLE = _acceleration_table(boost=True)
+_THROTTLE_TABLE = _acceleration_table(boost=False)
+
+
+def _time_on_curve(table, speed: float) -> float:
+    """Where on the table's curve a car at the given speed is. Speeds only increase along it until max_speed."""
+    speeds, _, max_speed = table
+    top = int(np.searchsorted(speeds, max_speed))
+    return float(np.interp(speed, speeds[:top + 1], np.arange(top + 1))) * _TABLE_DT
+
+
+def _distance_driven(table, start_speed: float, durations: np.ndarray) -> np.ndarray:
+    """How far the car gets in each of the durations, starting at start_speed and following the table's curve."""
+    speeds, distances, max_speed = table
+    if start_speed >= max_speed:
+        # No more acceleration from here on. Without boost a fast car slowly loses speed, which we ignore.
+        return start_speed * durations
+    start = _time_on_curve(table, start_speed)
+    times = start + durations
+    table_times = np.arange(len(speeds)) * _TABLE_DT
+    distance = np.interp(times, table_times, distances) - np.interp(start, table_times, distances)
+    # Past the end of the table the car is at max_speed.
+    beyond = np.maximum(times - table_times[-1], 0)
+    return distance + beyond * speeds[-1]
+
+
+def _speed_after(table, start_speed: float, duration: float) -> float:
+    speeds, _, max_speed = table
+    if start_speed >= max_speed:
+        return start_speed
+    table_times = np.arange(len(speeds)) * _TABLE_DT
+    return float(np.interp(_time_on_curve(table, start_speed) + duration, table_times, speeds))
+
+
+def reachable_distances(start_speed: float, boost: float, durations: np.ndarray) -> np.ndarray:
+    """
+    The furthest the car can drive in a straight line in each of the durations, boosting until it runs out of boost
+    and using throttle after that.
+    """
+    start_speed = max(start_speed, 0)
+    durations = np.maximum(durations, 0)
+    boost_time = boost / BOOST_PER_SECOND
+    boosting = np.minimum(durations, boost_time)
+    distance = _distance_driven(_BOOST_TABLE, start_speed, boosting)
+    remaining = durations - boosting
+    if not remaining.any():
+        return distance
+    # Continue on throttle from whatever speed the boost got us to.
+    speed_after_boost = _speed_after(_BOOST_TABLE, start_speed, boost_time)
+    return distance + _distance_driven(_THROTTLE_TABLE, speed_after_boost, remaining)
+
+
+def path_lengths(local_x: np.ndarray, local_y: np.ndarray, radius: float) -> np.ndarray:
+    """
+    Length of the path that turns on a circle of the given radius until the car faces the target, then drives
+    straight to it. Targets are relative to the car, x forward and y to the side. Targets inside the turning circle
+    can't be reached like that; for those the length is underestimated as the turn plus the distance to the circle.
+    """
+    # Turning towards either side is symmetrical, so put every target on the left of the car and turn left.
+    y = np.abs(local_y)
+    # Offset from the center of the turning circle, which is at (0, radius).
+    cx = local_x
+    cy = y - radius
+    center_distance = np.hypot(cx, cy)
+    ratio = np.minimum(radius / np.maximum(center_distance, 1e-6), 1)
+    straight = np.sqrt(np.maximum(center_distance ** 2 - radius ** 2, 0))
+    # The car starts at angle -pi/2 on the circle and leaves it at the tangent point towards the target.
+    tangent_angle = np.arctan2(cy, cx) - np.arccos(ratio)
+    turn = np.mod(tangent_angle + np.pi / 2, 2 * np.pi)
+    # Targets straight ahead come out a hair below zero and would wrap around to a full circle.
+    turn[turn > 2 * np.pi - 1e-6] = 0
+    arc = turn * radius
+    inside = np.maximum(radius - center_distance, 0)
+    return arc + straight + inside
+
+
+@dataclass
+class Intercept:
+    index: int  # Index of the slice in the prediction
+    game_time: float
+    location: Vec3
+    path_length: float  # How far the car has to drive to get there
+
+
+def find_intercept(prediction: PredictionArray, car: PlayerInfo, orientation: Orientation, game_time: float,
+                   max_height: float = MAX_REACH_HEIGHT) -> Optional[Intercept]:
+    """
+    Returns the earliest slice of the prediction that the car can get to in time, or None if it can't reach
+    the ball anywhere in the prediction.
+    """
+    if prediction.num_slices == 0:
+        return None
+    car_location = car.physics.location
+    velocity = car.physics.velocity
+    forward = orientation.forward
+    forward_speed = velocity.x * forward.x + velocity.y * forward.y + velocity.z * forward.z
+
+    local = orientation.to_local(car_location, prediction.location)
+    lengths = path_lengths(local.x, local.y, turn_radius(forward_speed)) - CONTACT_DISTANCE
+    reach = reachable_distances(forward_speed, car.boost, prediction.game_seconds - game_time)
+    reachable = (lengths <= reach) & (prediction.location[:, 2] <= max_height)
+
+    index = prediction.first_index(reachable)
+    if index is None:
+        return None
+    return Intercept(index, float(prediction.game_seconds[index]), Vec3(*prediction.location[index]),
+                     float(lengths[index]))
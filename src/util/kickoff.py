@@ -0,0 +1,110 @@
+"""
+Kickoff routines: a fixed, pre-tuned series of controls for every kickoff spawn, played from the first tick the car
+can move. Which spawn the car is on is a dictionary lookup on its location rounded to a grid.
+
+The routines are tuned offline by tune_kickoffs.py, which writes them to src/kickoffs.json:
+
+    playbook = KickoffPlaybook.load()
+    routine = playbook.routine_for(car.physics.location, team)    # None if the car isn't on a spawn
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from rlbot.agents.base_agent import SimpleControllerState
+
+from util.sequence import Maneuver
+
+# Blue's spawns. Orange's are the same ones rotated half a turn around the center, x and y negated.
+SPAWNS: Dict[str, Tuple[float, float]] = {
+    'center': (0, -4608),
+    'left': (2048, -2560),
+    'right': (-2048, -2560),
+    'back_left': (256, -3840),
+    'back_right': (-256, -3840),
+}
+# The direction each of blue's spawns faces, as yaw.
+SPAWN_YAWS: Dict[str, float] = {
+    'center': math.pi / 2,
+    'left': 3 * math.pi / 4,
+    'right': math.pi / 4,
+    'back_left': math.pi / 2,
+    'back_right': math.pi / 2,
+}
+# Spawns on the other side of the field's center line, whose routines are each other's mirror images.
+MIRRORED_SPAWNS = {'left': 'right', 'right': 'left', 'back_left': 'back_right', 'back_right': 'back_left'}
+
+CELL_SIZE = 100
+# How far the car may be from a spawn and still be recognized. The grid is coarse, so this is only approximate.
+SPAWN_TOLERANCE = 50
+
+DEFAULT_PLAYBOOK = Path(__file__).absolute().parent.parent / 'kickoffs.json'
+
+_CONTROL_NAMES = ['throttle', 'steer', 'pitch', 'yaw', 'roll', 'jump', 'boost', 'handbrake']
+
+
+def _cell(x: float, y: float) -> Tuple[int, int]:
+    return int(x // CELL_SIZE), int(y // CELL_SIZE)
+
+
+def _build_spawn_cells() -> Dict[Tuple[int, int], str]:
+    # Every cell within SPAWN_TOLERANCE of a spawn points to it, so a car a hair across a cell border still matches.
+    cells = {}
+    for name, (x, y) in SPAWNS.items():
+        low_x, low_y = _cell(x - SPAWN_TOLERANCE, y - SPAWN_TOLERANCE)
+        high_x, high_y = _cell(x + SPAWN_TOLERANCE, y + SPAWN_TOLERANCE)
+        for cell_x in range(low_x, high_x + 1):
+            for cell_y in range(low_y, high_y + 1):
+                cells[cell_x, cell_y] = name
+    return cells
+
+
+_SPAWN_CELLS = _build_spawn_cells()
+
+
+def identify_spawn(location, team: int) -> Optional[str]:
+    """The name of the kickoff spawn at the location (anything with x and y), or None if it isn't one."""
+    if team == 0:
+        return _SPAWN_CELLS.get(_cell(location.x, location.y))
+    return _SPAWN_CELLS.get(_cell(-location.x, -location.y))
+
+
+def controls_to_dict(controls: SimpleControllerState) -> dict:
+    """The controls that differ from the defaults, for storing them as JSON."""
+    default = SimpleControllerState()
+    return {name: getattr(controls, name) for name in _CONTROL_NAMES
+            if getattr(controls, name) != getattr(default, name)}
+
+
+class KickoffPlaybook:
+    """One routine per spawn name. Spawns without a routine fall back to whatever the bot does otherwise."""
+
+    def __init__(self, routines: Dict[str, Maneuver]):
+        self.routines = routines
+
+    @staticmethod
+    def load(path: Union[str, Path] = DEFAULT_PLAYBOOK) -> 'KickoffPlaybook':
+        """Loads the routines that tune_kickoffs.py saved. A missing file gives an empty playbook."""
+        path = Path(path)
+        if not path.exists():
+            return KickoffPlaybook({})
+        data = json.loads(path.read_text())
+        return KickoffPlaybook({
+            name: Maneuver(f'kickoff {name}', [(duration, SimpleControllerState(**controls))
+                                               for duration, controls in steps])
+            for name, steps in data['routines'].items()
+        })
+
+    def save(self, path: Union[str, Path] = DEFAULT_PLAYBOOK, **metadata):
+        """Writes the routines as JSON, together with anything in metadata, e.g. how they were tuned."""
+        routines: Dict[str, List] = {
+            name: [[round(duration, 4), controls_to_dict(controls)] for duration, controls in routine.steps()]
+            for name, routine in self.routines.items()
+        }
+        Path(path).write_text(json.dumps({**metadata, 'routines': routines}, indent=1) + '\n')
+
+    def routine_for(self, location, team: int) -> Optional[Maneuver]:
+        spawn = identify_spawn(location, team)
+        return self.routines.get(spawn) if spawn is not None else None
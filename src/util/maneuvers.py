@@ -0,0 +1,60 @@
+"""
+Maneuvers that are just a fixed series of button presses, compiled once. Play them with a ManeuverPlayer:
+
+    self.maneuvers.start(FRONT_FLIP, packet.game_info.seconds_elapsed)
+
+The durations are tuned for a car that starts on the ground. Maneuvers that go to one side come as a left and a
+right version, mirrored from the same steps.
+"""
+
+from rlbot.agents.base_agent import SimpleControllerState
+
+from util.sequence import Maneuver
+
+
+def mirrored_controls(c: SimpleControllerState) -> SimpleControllerState:
+    return SimpleControllerState(steer=-c.steer, throttle=c.throttle, pitch=c.pitch, yaw=-c.yaw, roll=-c.roll,
+                                 jump=c.jump, boost=c.boost, handbrake=c.handbrake, use_item=c.use_item)
+
+
+def _mirrored(name: str, maneuver: Maneuver) -> Maneuver:
+    """The same maneuver towards the other side: steer, yaw and roll are flipped."""
+    return Maneuver(name, [(duration, mirrored_controls(c)) for duration, c in maneuver.steps()])
+
+
+FRONT_FLIP = Maneuver('front flip', [
+    (0.05, SimpleControllerState(jump=True)),
+    (0.05, SimpleControllerState(jump=False)),
+    (0.2, SimpleControllerState(jump=True, pitch=-1)),
+    (0.8, SimpleControllerState()),
+])
+
+# Start it while driving backwards: a backflip, cancelled halfway so the car ends up upside down facing the other
+# way, then rolled back onto its wheels.
+HALF_FLIP = Maneuver('half flip', [
+    (0.1, SimpleControllerState(throttle=-1, jump=True)),
+    (0.05, SimpleControllerState(throttle=-1)),
+    (0.1, SimpleControllerState(throttle=-1, jump=True, pitch=1)),
+    (0.25, SimpleControllerState(throttle=-1, pitch=-1)),
+    (0.4, SimpleControllerState(throttle=1, pitch=-1, roll=1)),
+    (0.3, SimpleControllerState(throttle=1)),
+])
+
+# A small jump with the nose tilted up, and a forward dodge just as the wheels touch down again.
+WAVEDASH = Maneuver('wavedash', [
+    (0.08, SimpleControllerState(throttle=1, jump=True)),
+    (0.47, SimpleControllerState(throttle=1, pitch=0.3)),
+    (0.05, SimpleControllerState(throttle=1, jump=True, pitch=-1)),
+    (0.3, SimpleControllerState(throttle=1)),
+])
+
+# Boosting diagonal flip with the flip cancelled, so the car gets the dodge's speed without tumbling.
+SPEEDFLIP_LEFT = Maneuver('speedflip left', [
+    (0.1, SimpleControllerState(throttle=1, boost=True, steer=-1)),
+    (0.08, SimpleControllerState(throttle=1, boost=True, jump=True)),
+    (0.02, SimpleControllerState(throttle=1, boost=True)),
+    (0.05, SimpleControllerState(throttle=1, boost=True, jump=True, pitch=-1, yaw=-1)),
+    (0.55, SimpleControllerState(throttle=1, boost=True, pitch=1, yaw=-1, roll=-1)),
+    (0.2, SimpleControllerState(throttle=1, boost=True)),
+])
+SPEEDFLIP_RIGHT = _mirrored('speedflip right', SPEEDFLIP_LEFT)
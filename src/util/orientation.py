@@ -1,6 +1,23 @@
 import math
+from functools import cached_property
+from typing import Dict, Union
 
-from util.vec import Vec3
+import numpy as np
+
+from util.packet_snapshot import PacketSnapshot
+from util.vec import Vec3, Vec3Batch
+
+
+_new_vec3 = Vec3.__new__
+
+
+def _vec3(x: float, y: float, z: float) -> Vec3:
+    # Like Vec3(x, y, z), minus the float() of every component. math.cos and friends give floats already.
+    vec = _new_vec3(Vec3)
+    vec.x = x
+    vec.y = y
+    vec.z = z
+    return vec
 
 
 # This is a helper class for calculating directions relative to your car. You can extend it or delete if you want.
@@ -12,20 +29,77 @@ class Orientation:
     """
 
     def __init__(self, rotation):
-        self.yaw = float(rotation.yaw)
-        self.roll = float(rotation.roll)
-        self.pitch = float(rotation.pitch)
+        self.yaw = yaw = rotation.yaw
+        self.roll = roll = rotation.roll
+        self.pitch = pitch = rotation.pitch
+
+        cr = math.cos(roll)
+        sr = math.sin(roll)
+        cp = math.cos(pitch)
+        sp = math.sin(pitch)
+        cy = math.cos(yaw)
+        sy = math.sin(yaw)
+
+        self.forward = _vec3(cp * cy, cp * sy, sp)
+        self.right = _vec3(cy*sp*sr-cr*sy, sy*sp*sr+cr*cy, -cp*sr)
+        self.up = _vec3(-cr*cy*sp-sr*sy, -cr*sy*sp+sr*cy, cp*cr)
+
+    @cached_property
+    def matrix(self) -> np.ndarray:
+        """The 3×3 rotation matrix whose rows are forward, right and up. Multiplying a world offset by it
+        gives the offset relative to the car. Only built if you ask for it."""
+        f, r, u = self.forward, self.right, self.up
+        return np.array(((f.x, f.y, f.z), (r.x, r.y, r.z), (u.x, u.y, u.z)))
+
+    def to_local(self, center, targets: Union[Vec3Batch, np.ndarray]) -> Vec3Batch:
+        """Same as relative_location, but for many targets at once."""
+        offsets = Vec3Batch(targets) - center
+        return Vec3Batch(offsets.data @ self.matrix.T)
 
-        cr = math.cos(self.roll)
-        sr = math.sin(self.roll)
-        cp = math.cos(self.pitch)
-        sp = math.sin(self.pitch)
-        cy = math.cos(self.yaw)
-        sy = math.sin(self.yaw)
 
-        self.forward = Vec3(cp * cy, cp * sy, sp)
-        self.right = Vec3(cy*sp*sr-cr*sy, sy*sp*sr+cr*cy, -cp*sr)
-        self.up = Vec3(-cr*cy*sp-sr*sy, -cr*sy*sp+sr*cy, cp*cr)
+class OrientationCache:
+    """
+    Keeps one Orientation per car for the current frame, so every helper that needs a car's orientation during a
+    tick shares the same one instead of doing the trigonometry again. Everything is thrown away as soon as a packet
+    from a different frame comes in.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._orientations: Dict[int, Orientation] = {}
+
+    def reset(self):
+        """Forgets the orientations, e.g. when a new match reuses the same packet and frame numbers."""
+        self._frame = None
+        self._orientations.clear()
+
+    def get(self, packet, index: int) -> Orientation:
+        """Returns the orientation of packet.game_cars[index]. packet can also be a PacketSnapshot."""
+        snapshot = isinstance(packet, PacketSnapshot)
+        frame = packet.frame if snapshot else (packet.game_info.frame_num, packet.game_info.seconds_elapsed)
+        if frame != self._frame:
+            self._frame = frame
+            self._orientations.clear()
+        orientation = self._orientations.get(index)
+        if orientation is None:
+            rotation = packet.car_rotation(index) if snapshot else packet.game_cars[index].physics.rotation
+            orientation = self._orientations[index] = Orientation(rotation)
+        return orientation
+
+
+def rotation_matrices(pitch: np.ndarray, yaw: np.ndarray, roll: np.ndarray) -> np.ndarray:
+    """
+    Builds the rotation matrices (rows forward, right, up, like Orientation.matrix) for many rotations at once.
+    Returns an array of shape (N, 3, 3).
+    """
+    cr, sr = np.cos(roll), np.sin(roll)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    matrices = np.empty((len(pitch), 3, 3))
+    matrices[:, 0] = np.stack((cp * cy, cp * sy, sp), axis=-1)
+    matrices[:, 1] = np.stack((cy*sp*sr-cr*sy, sy*sp*sr+cr*cy, -cp*sr), axis=-1)
+    matrices[:, 2] = np.stack((-cr*cy*sp-sr*sy, -cr*sy*sp+sr*cy, cp*cr), axis=-1)
+    return matrices
 
 
 # Sometimes things are easier, when everything is seen from your point of view.
@@ -36,11 +110,10 @@ def relative_location(center, ori, target):
     """
     Converts a world-space location into a location relative to a car's orientation.
     """
-    # Ensure both center and target are Vec3 instances
-    center = Vec3(center)
-    target = Vec3(target)
+    # center and target can be Vec3 or the packet's Vector3, which has no arithmetic.
+    offset = Vec3(target.x - center.x, target.y - center.y, target.z - center.z)
 
-    x = (target - center).dot(ori.forward)
-    y = (target - center).dot(ori.right)
-    z = (target - center).dot(ori.up)
+    x = offset.dot(ori.forward)
+    y = offset.dot(ori.right)
+    z = offset.dot(ori.up)
     return Vec3(x, y, z)
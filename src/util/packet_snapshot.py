@@ -0,0 +1,148 @@
+"""
+Copies the GameTickPacket into one preallocated buffer, once per frame, with a single memmove. Typed NumPy views
+into the buffer lay out the parts the bot reads, so everything is read from plain arrays instead of going through
+ctypes field by field:
+
+    snapshot = PacketSnapshot()
+    snapshot.update(packet)
+    locations = snapshot.cars['location'][:snapshot.num_cars]    # (cars, 3) view, no copy
+    ball = snapshot.ball_location()                                # Vec3
+    active_pads = snapshot.boosts['is_active'][:snapshot.num_boost]
+
+The arrays are views into the same buffer, which is overwritten on the next frame. Copy anything that has to outlive
+the frame. Arrays keep the packet's float32 precision; the Vec3s and scalars handed out are Python floats.
+
+The WorldModel owns one snapshot and hands it to everything it updates, so the trackers read the same copy of the
+frame. Used on their own, they copy the packet into a snapshot of their own instead.
+"""
+
+import ctypes
+from typing import NamedTuple, Tuple
+
+import numpy as np
+from rlbot.utils.structures.game_data_struct import (BoostPadState, GameTickPacket, PlayerInfo, TeamInfo, MAX_BOOSTS,
+                                                     MAX_PLAYERS)
+
+from util.vec import Vec3
+
+
+def field_offset(struct_type, path: str) -> int:
+    """Byte offset of a dotted field path like 'game_info.seconds_elapsed' inside a ctypes struct."""
+    offset = 0
+    for name in path.split('.'):
+        offset += getattr(struct_type, name).offset
+        struct_type = dict(struct_type._fields_)[name]
+    return offset
+
+
+def struct_dtype(struct_type, fields: dict) -> np.dtype:
+    """
+    A NumPy dtype that reads only the given fields of a ctypes struct, in place. fields maps each name to the dotted
+    path of the field in the struct and its NumPy format.
+    """
+    return np.dtype({'names': list(fields), 'formats': [fmt for _, fmt in fields.values()],
+                     'offsets': [field_offset(struct_type, path) for path, _ in fields.values()],
+                     'itemsize': ctypes.sizeof(struct_type)})
+
+
+_CAR_DTYPE = struct_dtype(PlayerInfo, {
+    'location': ('physics.location', ('<f4', 3)),
+    'rotation': ('physics.rotation', ('<f4', 3)),  # Pitch, yaw, roll
+    'velocity': ('physics.velocity', ('<f4', 3)),
+    'angular_velocity': ('physics.angular_velocity', ('<f4', 3)),
+    'is_demolished': ('is_demolished', '?'),
+    'has_wheel_contact': ('has_wheel_contact', '?'),
+    'is_super_sonic': ('is_super_sonic', '?'),
+    'jumped': ('jumped', '?'),
+    'double_jumped': ('double_jumped', '?'),
+    'team': ('team', 'u1'),
+    'boost': ('boost', '<i4'),
+})
+_BOOST_DTYPE = struct_dtype(BoostPadState, {'is_active': ('is_active', '?'), 'timer': ('timer', '<f4')})
+_TEAM_DTYPE = struct_dtype(TeamInfo, {'score': ('score', '<i4')})
+_PACKET_DTYPE = struct_dtype(GameTickPacket, {
+    'cars': ('game_cars', (_CAR_DTYPE, MAX_PLAYERS)),
+    'num_cars': ('num_cars', '<i4'),
+    'boosts': ('game_boosts', (_BOOST_DTYPE, MAX_BOOSTS)),
+    'num_boost': ('num_boost', '<i4'),
+    'ball_location': ('game_ball.physics.location', ('<f4', 3)),
+    'ball_rotation': ('game_ball.physics.rotation', ('<f4', 3)),
+    'ball_velocity': ('game_ball.physics.velocity', ('<f4', 3)),
+    'ball_angular_velocity': ('game_ball.physics.angular_velocity', ('<f4', 3)),
+    'touch_time': ('game_ball.latest_touch.time_seconds', '<f4'),
+    'touch_index': ('game_ball.latest_touch.player_index', '<i4'),
+    'touch_team': ('game_ball.latest_touch.team', '<i4'),
+    'seconds_elapsed': ('game_info.seconds_elapsed', '<f4'),
+    'game_time_remaining': ('game_info.game_time_remaining', '<f4'),
+    'is_overtime': ('game_info.is_overtime', '?'),
+    'is_round_active': ('game_info.is_round_active', '?'),
+    'is_kickoff_pause': ('game_info.is_kickoff_pause', '?'),
+    'is_match_ended': ('game_info.is_match_ended', '?'),
+    'world_gravity_z': ('game_info.world_gravity_z', '<f4'),
+    'game_speed': ('game_info.game_speed', '<f4'),
+    'frame_num': ('game_info.frame_num', '<i4'),
+    'teams': ('teams', (_TEAM_DTYPE, 2)),
+})
+_PACKET_SIZE = ctypes.sizeof(GameTickPacket)
+
+
+class Rotation(NamedTuple):
+    """Like the packet's Rotator, so it works wherever one is expected, e.g. Orientation(rotation)."""
+    pitch: float
+    yaw: float
+    roll: float
+
+
+class PacketSnapshot:
+    """See the module docstring. Call update() with every packet; it only copies once per frame."""
+
+    def __init__(self):
+        self.buffer = np.zeros(_PACKET_SIZE, dtype=np.uint8)
+        # Typed views into the buffer. They stay valid for the snapshot's lifetime, so keep them around.
+        self.record = self.buffer.view(_PACKET_DTYPE).reshape(())
+        self.cars = self.record['cars']
+        self.car_locations = self.cars['location']
+        self.car_velocities = self.cars['velocity']
+        self.car_rotations = self.cars['rotation']
+        self.boosts = self.record['boosts']
+        self.scores = self.record['teams']['score']
+        self._address = self.buffer.ctypes.data
+        self.num_cars = 0
+        self.num_boost = 0
+        self.game_time = 0.0
+        self.frame: Tuple[int, float] = None
+
+    def update(self, packet: GameTickPacket) -> bool:
+        """Copies the packet if it's a new frame. Returns False if this frame was copied already."""
+        frame = (packet.game_info.frame_num, packet.game_info.seconds_elapsed)
+        if frame == self.frame:
+            return False
+        self.read(packet)
+        return True
+
+    def read(self, packet: GameTickPacket):
+        """Copies the packet, even if it's the same frame as last time."""
+        ctypes.memmove(self._address, ctypes.addressof(packet), _PACKET_SIZE)
+        self.num_cars = int(self.record['num_cars'])
+        self.num_boost = int(self.record['num_boost'])
+        self.game_time = float(self.record['seconds_elapsed'])
+        self.frame = (int(self.record['frame_num']), self.game_time)
+
+    def __getitem__(self, name: str):
+        """Any other field of the record, e.g. snapshot['is_kickoff_pause'], as a plain Python value."""
+        return self.record[name].item()
+
+    def car_location(self, index: int) -> Vec3:
+        return Vec3(*self.car_locations[index].tolist())
+
+    def car_velocity(self, index: int) -> Vec3:
+        return Vec3(*self.car_velocities[index].tolist())
+
+    def car_rotation(self, index: int) -> Rotation:
+        return Rotation(*self.car_rotations[index].tolist())
+
+    def ball_location(self) -> Vec3:
+        return Vec3(*self.record['ball_location'].tolist())
+
+    def ball_velocity(self) -> Vec3:
+        return Vec3(*self.record['ball_velocity'].tolist())
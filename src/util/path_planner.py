@@ -0,0 +1,236 @@
+"""
+Plans drivable paths on the ground to a target that the car has to reach facing a given direction, e.g. the ball
+with its nose towards the enemy goal. A path is an arc on the car's turning circle, a straight line, and an arc
+onto the target's turning circle (a Dubins path), with the turning radius looked up from the car's speed.
+
+A plan is kept between ticks and only thrown away when the target or its heading moved too far, the car's speed
+changed its turning radius too much, or the car drifted off the path. Steering follows a point a little ahead on
+the path:
+
+    planner = PathPlanner()
+    controls.steer = planner.steer(car, orientation, target, arrival_heading)
+
+A path planned somewhere else, e.g. on a PlannerWorker, is followed with planner.follow(car, orientation, path).
+
+Headings are yaw angles, and turns are +1 when the yaw increases (a right turn in Rocket League) or -1.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+from rlbot.utils.structures.game_data_struct import PlayerInfo
+
+from util.drive import steer_toward_target
+from util.intercept import CURVATURE_SPEEDS, CURVATURES, MAX_CAR_SPEED
+from util.orientation import Orientation
+from util.vec import Vec3
+
+# Turning radius for every RADIUS_SPEED_STEP uu/s of forward speed, so a lookup is an array index.
+RADIUS_SPEED_STEP = 10
+RADIUS_TABLE = 1 / np.interp(np.arange(0, MAX_CAR_SPEED + RADIUS_SPEED_STEP, RADIUS_SPEED_STEP),
+                             CURVATURE_SPEEDS, CURVATURES)
+
+SAMPLE_SPACING = 25  # Distance between the points of a path that steering follows
+
+# Keep the current plan unless one of these is exceeded.
+TARGET_TOLERANCE = 100
+HEADING_TOLERANCE = 0.2
+RADIUS_TOLERANCE = 0.2  # Relative change of the turning radius
+DEVIATION_TOLERANCE = 150
+
+# Steering aims at the point this far ahead on the path.
+MIN_LOOKAHEAD = 150
+LOOKAHEAD_SECONDS = 0.25
+
+TWO_PI = 2 * math.pi
+
+
+def turning_radius(speed: float) -> float:
+    """Radius of the tightest turn at the given forward speed, from the lookup table."""
+    index = min(int(abs(speed)) // RADIUS_SPEED_STEP, len(RADIUS_TABLE) - 1)
+    return float(RADIUS_TABLE[index])
+
+
+def _left_normal(heading: float) -> Tuple[float, float]:
+    return -math.sin(heading), math.cos(heading)
+
+
+def _circle_center(x: float, y: float, heading: float, turn: int, radius: float) -> Tuple[float, float]:
+    nx, ny = _left_normal(heading)
+    return x + turn * radius * nx, y + turn * radius * ny
+
+
+@dataclass
+class DubinsPath:
+    start: Tuple[float, float, float]  # x, y, heading
+    end: Tuple[float, float, float]
+    radius: float
+    turns: Tuple[int, int]  # Direction of the first and the last arc
+    arcs: Tuple[float, float]  # Angles turned on the first and the last arc, in radians
+    straight: float  # Length of the straight part
+    points: np.ndarray  # (N, 2) points along the path, SAMPLE_SPACING apart
+
+    @property
+    def length(self) -> float:
+        return (self.arcs[0] + self.arcs[1]) * self.radius + self.straight
+
+
+def _solve(start: Tuple[float, float, float], end: Tuple[float, float, float], radius: float,
+           first_turn: int, last_turn: int) -> Optional[Tuple[float, float, float, float]]:
+    """Returns (first arc, straight length, last arc, straight heading) for the given turns, or None if impossible."""
+    c1x, c1y = _circle_center(*start, first_turn, radius)
+    c2x, c2y = _circle_center(*end, last_turn, radius)
+    dx, dy = c2x - c1x, c2y - c1y
+    distance = math.hypot(dx, dy)
+    # The straight part leaves circle 1 and joins circle 2 at the points where both have the same tangent heading.
+    offset = (last_turn - first_turn) * radius
+    if abs(offset) > distance:
+        return None
+    heading = math.atan2(dy, dx) - (math.asin(offset / distance) if offset else 0.0)
+    straight = math.sqrt(max(distance ** 2 - offset ** 2, 0))
+    first_arc = (first_turn * (heading - start[2])) % TWO_PI
+    last_arc = (last_turn * (end[2] - heading)) % TWO_PI
+    # A hair below a full circle is really no turn at all.
+    if first_arc > TWO_PI - 1e-6:
+        first_arc = 0.0
+    if last_arc > TWO_PI - 1e-6:
+        last_arc = 0.0
+    return first_arc, straight, last_arc, heading
+
+
+def _sample_arc(x: float, y: float, heading: float, turn: int, radius: float, angle: float) -> np.ndarray:
+    cx, cy = _circle_center(x, y, heading, turn, radius)
+    steps = max(math.ceil(angle * radius / SAMPLE_SPACING), 1)
+    headings = heading + turn * angle * np.arange(1, steps + 1) / steps
+    # The point on the circle where the car faces `heading` is the center minus turn * radius * left normal.
+    return np.stack((cx + turn * radius * np.sin(headings), cy - turn * radius * np.cos(headings)), axis=-1)
+
+
+def plan_path(start: Tuple[float, float, float], end: Tuple[float, float, float], radius: float) -> DubinsPath:
+    """The shortest arc-line-arc path from start to end, both (x, y, heading), turning with the given radius."""
+    best = None
+    # Turning the same way twice always works, so there's always a solution.
+    for turns in ((1, 1), (-1, -1), (1, -1), (-1, 1)):
+        solution = _solve(start, end, radius, *turns)
+        if solution is None:
+            continue
+        first_arc, straight, last_arc, _ = solution
+        length = (first_arc + last_arc) * radius + straight
+        if best is None or length < best[0]:
+            best = (length, turns, solution)
+    _, turns, (first_arc, straight, last_arc, heading) = best
+    first = _sample_arc(*start, turns[0], radius, first_arc) if first_arc else np.array([start[:2]])
+    line_steps = max(math.ceil(straight / SAMPLE_SPACING), 1)
+    line = first[-1] + np.outer(np.arange(1, line_steps + 1) / line_steps * straight,
+                                (math.cos(heading), math.sin(heading)))
+    last = _sample_arc(*line[-1], heading, turns[1], radius, last_arc) if last_arc else line[-1:]
+    points = np.concatenate((first, line, last))
+    return DubinsPath(start, end, radius, turns, (first_arc, last_arc), straight, points)
+
+
+class PathPlanner:
+    """Keeps one car's current plan and decides when it needs a new one. See the module docstring."""
+
+    def __init__(self):
+        self.path: Optional[DubinsPath] = None
+        self.plans_computed = 0
+        self.plans_reused = 0
+        self.following = False  # Whether the last steer() followed the path
+        self._progress = 0  # Index of the path point closest to the car
+
+    def update(self, x: float, y: float, heading: float, speed: float,
+               target: Tuple[float, float, float]) -> DubinsPath:
+        """Returns a path from the car to the target (x, y, heading), reusing the last one if it's still good."""
+        radius = turning_radius(speed)
+        if self.path is not None and self._still_valid(x, y, radius, target):
+            self.plans_reused += 1
+            return self.path
+        self.path = plan_path((x, y, heading), target, radius)
+        self.plans_computed += 1
+        self._progress = 0
+        return self.path
+
+    def _still_valid(self, x: float, y: float, radius: float, target: Tuple[float, float, float]) -> bool:
+        path = self.path
+        end_x, end_y, end_heading = path.end
+        if math.hypot(target[0] - end_x, target[1] - end_y) > TARGET_TOLERANCE:
+            return False
+        if abs((target[2] - end_heading + math.pi) % TWO_PI - math.pi) > HEADING_TOLERANCE:
+            return False
+        if abs(radius - path.radius) > RADIUS_TOLERANCE * path.radius:
+            return False
+        return self._advance(x, y)
+
+    def _advance(self, x: float, y: float) -> bool:
+        """Moves the progress to the path point closest to the car. False if the car is too far off the path."""
+        # The car only moves forward along the path, so only look at the points from the last closest one on.
+        offsets = self.path.points[self._progress:] - (x, y)
+        distances = np.einsum('ij,ij->i', offsets, offsets)
+        if len(distances) == 0:
+            return False
+        closest = int(np.argmin(distances))
+        if distances[closest] > DEVIATION_TOLERANCE ** 2:
+            return False
+        self._progress += closest
+        return True
+
+    def lookahead_point(self, speed: float) -> Tuple[float, float]:
+        """The point on the path a little ahead of the car. Past the end, it continues in the arrival direction."""
+        path = self.path
+        ahead = int((MIN_LOOKAHEAD + LOOKAHEAD_SECONDS * abs(speed)) / SAMPLE_SPACING)
+        index = self._progress + ahead
+        if index < len(path.points):
+            return float(path.points[index, 0]), float(path.points[index, 1])
+        beyond = (index - len(path.points) + 1) * SAMPLE_SPACING
+        end_x, end_y, end_heading = path.end
+        return end_x + beyond * math.cos(end_heading), end_y + beyond * math.sin(end_heading)
+
+    def plan(self, car: PlayerInfo, orientation: Orientation, target: Vec3, arrival_heading: float) -> DubinsPath:
+        """Returns a path from the car to the target that arrives with the given heading (yaw), like update()."""
+        location = car.physics.location
+        return self.update(location.x, location.y, orientation.yaw, _forward_speed(car, orientation),
+                           (target.x, target.y, arrival_heading))
+
+    def steer(self, car: PlayerInfo, orientation: Orientation, target: Vec3, arrival_heading: float,
+              max_detour: Optional[float] = None) -> float:
+        """
+        Steering to follow a path to the target that arrives with the given heading (yaw). If the path is more than
+        max_detour times as long as the straight line to the target, it steers straight at the target instead;
+        following tells which one it did.
+        """
+        path = self.plan(car, orientation, target, arrival_heading)
+        return self._track(car, orientation, path, target, max_detour)
+
+    def follow(self, car: PlayerInfo, orientation: Orientation, path: DubinsPath,
+               max_detour: Optional[float] = None) -> float:
+        """
+        Steering along a path that was planned somewhere else, e.g. on a PlannerWorker, without planning anything.
+        Like steer(), but it also steers straight at the end of the path if the car drifted off it.
+        """
+        location = car.physics.location
+        if path is not self.path:
+            self.path = path
+            self._progress = 0
+        target = Vec3(path.end[0], path.end[1], location.z)
+        if not self._advance(location.x, location.y):
+            self.following = False
+            return steer_toward_target(car, target, orientation)
+        return self._track(car, orientation, path, target, max_detour)
+
+    def _track(self, car: PlayerInfo, orientation: Orientation, path: DubinsPath, target: Vec3,
+               max_detour: Optional[float]) -> float:
+        location = car.physics.location
+        direct = math.hypot(target.x - location.x, target.y - location.y)
+        self.following = max_detour is None or path.length <= max_detour * direct
+        if not self.following:
+            return steer_toward_target(car, target, orientation)
+        x, y = self.lookahead_point(_forward_speed(car, orientation))
+        return steer_toward_target(car, Vec3(x, y, location.z), orientation)
+
+
+def _forward_speed(car: PlayerInfo, orientation: Orientation) -> float:
+    velocity = car.physics.velocity
+    forward = orientation.forward
+    return velocity.x * forward.x + velocity.y * forward.y + velocity.z * forward.z
@@ -0,0 +1,131 @@
+"""
+Runs expensive planning, like the intercept search and path planning, on a background thread so that it doesn't
+delay the controls. Every tick the bot offers the worker a way to snapshot what the planner needs, copied out of
+the packet, and reads back the freshest plan:
+
+    worker = PlannerWorker(make_plan)
+    worker.offer(game_time, lambda: make_snapshot(packet))
+    timed_plan = worker.latest(game_time, max_age=0.1)    # None if there's no plan that recent
+
+Copying the packet and the ball prediction isn't free, so the snapshot is only made when it will be planned: right
+away if the thread is idle, and not at all while it's busy. The worker only ever plans the newest snapshot; older
+ones that it didn't get to are dropped. Plans carry the game time of their snapshot, so the bot can tell how old
+they are and fall back to something simpler when they're stale.
+
+With threaded=False nothing runs in the background: latest() makes the newest snapshot and plans it itself, right
+when it's asked for, and ticks that never ask don't snapshot anything. That's deterministic, which is what replays
+and training exercises want.
+"""
+
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+
+S = TypeVar('S')
+P = TypeVar('P')
+
+
+@dataclass
+class TimedPlan(Generic[P]):
+    game_time: float  # Game time of the snapshot the plan was made from
+    plan: P
+    seconds: float  # How long planning took
+
+
+class PlannerWorker(Generic[S, P]):
+    def __init__(self, make_plan: Callable[[S], P], threaded: bool = True, name: str = 'planner'):
+        self.make_plan = make_plan
+        self.threaded = threaded
+        self.plans_made = 0
+        self.snapshots_dropped = 0  # Replaced by a newer snapshot before they were planned
+        self.offers_skipped = 0  # Offered while the thread was busy, so never snapshotted
+        self.stale_reads = 0
+        self.error: Optional[Exception] = None  # The last exception make_plan raised on the thread
+        self._latest: Optional[TimedPlan[P]] = None
+        # The game time and snapshot maker of the newest snapshot that hasn't been planned yet
+        self._pending: Optional[Tuple[float, Callable[[], S]]] = None
+        self._busy = False  # The thread is planning
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        if threaded:
+            self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+            self._thread.start()
+
+    def submit(self, game_time: float, snapshot: S):
+        """Hands the worker a new snapshot. It must not change afterwards, so copy anything from the packet."""
+        self._set_pending(game_time, lambda: snapshot)
+
+    def offer(self, game_time: float, make_snapshot: Callable[[], S]) -> bool:
+        """
+        Like submit, but make_snapshot is only called if the snapshot is going to be planned. With the thread that's
+        right now, unless it's still busy with an earlier snapshot, in which case the offer is skipped. Without the
+        thread it's called by the next latest(), so it has to keep working until then. Returns whether the offer
+        was taken.
+        """
+        if not self.threaded:
+            self._set_pending(game_time, make_snapshot)
+            return True
+        if self._busy or self._pending is not None:
+            self.offers_skipped += 1
+            return False
+        self.submit(game_time, make_snapshot())
+        return True
+
+    def latest(self, game_time: float, max_age: float) -> Optional[TimedPlan[P]]:
+        """
+        The newest plan, if its snapshot is at most max_age seconds older than game_time. Plans from the future,
+        e.g. from before the game clock was reset, are stale too.
+        """
+        if not self.threaded:
+            self._plan_pending()
+        latest = self._latest
+        if latest is None or not 0 <= game_time - latest.game_time <= max_age:
+            self.stale_reads += 1
+            return None
+        return latest
+
+    def stop(self):
+        """Stops the thread after the plan it's working on. Call this when the bot retires."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _set_pending(self, game_time: float, make_snapshot: Callable[[], S]):
+        with self._condition:
+            if self._pending is not None:
+                self.snapshots_dropped += 1
+            self._pending = (game_time, make_snapshot)
+            self._condition.notify()
+
+    def _plan_pending(self):
+        with self._condition:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        game_time, make_snapshot = pending
+        start = time.perf_counter()
+        plan = self.make_plan(make_snapshot())
+        self._latest = TimedPlan(game_time, plan, time.perf_counter() - start)
+        self.plans_made += 1
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                self._busy = True
+            try:
+                self._plan_pending()
+            except Exception as error:
+                # Keep going, the bot falls back to simpler steering until a plan works out again.
+                self.error = error
+                traceback.print_exc()
+            finally:
+                self._busy = False
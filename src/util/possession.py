@@ -0,0 +1,214 @@
+"""
+Keeps track of who has the ball: which car is closest to it, which one has it stuck to its spikes, who is dribbling
+it on their roof and who touched it last. Every tick the distances of all cars to the ball come from one array
+operation on the PacketSnapshot, and a few seconds of history are kept in ring buffers.
+
+The current state and the times of the last touches are kept up to date as the packets come in, so questions like
+"who has possession" or "how long since orange touched the ball" are answered without looking at the history.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+from rlbot.utils.structures.game_data_struct import GameTickPacket, MAX_PLAYERS
+
+from util.packet_snapshot import PacketSnapshot
+
+# When the ball is attached to a car's spikes, the distance will vary a bit depending on whether the ball is
+# on the front bumper, the roof, etc. It tends to be most far away when the ball is on one of the front corners
+# and that distance is a little under 200. We want to be sure that it's never over 200, otherwise bots will
+# suffer from bad bugs when they don't think the ball is spiked to them but it actually is; they'll probably
+# drive in circles. The opposite problem, where they think it's spiked before it really is, is not so bad because
+# they usually spike it for real a split second later.
+MAX_DISTANCE_WHEN_SPIKED = 200
+
+# The car closest to the ball has possession if it's at most this far from it.
+POSSESSION_DISTANCE = 400
+
+# A car is dribbling when the ball is right above it: this close horizontally, and this much higher than the car.
+DRIBBLE_RADIUS = 120
+DRIBBLE_MIN_HEIGHT = 90
+DRIBBLE_MAX_HEIGHT = 250
+_MAX_DRIBBLE_DISTANCE = (DRIBBLE_RADIUS ** 2 + DRIBBLE_MAX_HEIGHT ** 2) ** 0.5
+
+# How many ticks of history to keep. At 120 ticks per second this is the last 5 seconds.
+DEFAULT_HISTORY = 600
+MAX_TOUCHES = 64
+
+
+@dataclass
+class TouchRecord:
+    time: float
+    index: int  # Index of the car in packet.game_cars
+    team: int
+
+
+class PossessionTracker:
+    """Call update() once per frame, e.g. through the WorldModel. Car indices are indices into packet.game_cars."""
+
+    def __init__(self, history: int = DEFAULT_HISTORY, max_cars: int = MAX_PLAYERS):
+        self.distances = np.empty(max_cars)  # From every car's center to the ball's center
+        self.teams = np.empty(max_cars, dtype=np.uint8)
+        self._offsets = np.zeros((max_cars, 3))  # From the ball to every car
+        self.dribbling = np.empty(max_cars, dtype=bool)
+        self.dribble_start = np.empty(max_cars)
+        self.last_touch_by_team = np.empty(2)
+        self.last_touch_by_car = np.empty(max_cars)
+        # Ring buffers, one row per tick. Row (self._next - 1) % history is the latest.
+        self.times = np.empty(history)
+        self.possession_history = np.empty(history, dtype=np.int16)  # Car with possession, -1 for nobody
+        self.dribble_history = np.empty((history, max_cars), dtype=bool)
+        self.touch_times = np.empty(MAX_TOUCHES)
+        self.touch_cars = np.empty(MAX_TOUCHES, dtype=np.int16)
+        # The team of the car at the time of the touch, which needn't be its team now.
+        self.touch_teams = np.empty(MAX_TOUCHES, dtype=np.int8)
+        self._snapshot = PacketSnapshot()
+        self.reset()
+
+    def reset(self):
+        """Forgets everything, e.g. when a new match starts."""
+        self.game_time = 0.0
+        self.num_cars = 0
+        self.distances[:] = np.inf
+        self.teams[:] = 0
+
+        # The current state
+        self.possessing_car: Optional[int] = None
+        self.possession_start = 0.0
+        self.carrying_car: Optional[int] = None  # The car the ball is spiked to
+        self.carry_start = 0.0
+        self.dribbling[:] = False
+        self.dribble_start[:] = 0
+        self._any_dribbling = False
+        self.last_touch: Optional[TouchRecord] = None
+        self.last_touch_by_team[:] = -np.inf
+        self.last_touch_by_car[:] = -np.inf
+
+        self.times[:] = 0
+        self.possession_history[:] = -1
+        self.dribble_history[:] = False
+        self._next = 0
+        self._count = 0
+
+        self.touch_times[:] = 0
+        self.touch_cars[:] = 0
+        self.touch_teams[:] = 0
+        self._next_touch = 0
+        self._touch_count = 0
+
+    def update(self, packet: GameTickPacket, snapshot: Optional[PacketSnapshot] = None):
+        """
+        Pass the WorldModel's snapshot, already updated with the packet, to read the cars and the ball from it.
+        Without one the packet is copied into the tracker's own.
+        """
+        if snapshot is None:
+            snapshot = self._snapshot
+            snapshot.read(packet)
+        time = self.game_time = snapshot.game_time
+        count = self.num_cars = snapshot.num_cars
+        # Read every tick: a new match can put the same cars on other teams.
+        self.teams[:count] = snapshot.cars['team'][:count]
+        offsets = np.subtract(snapshot.car_locations[:count], snapshot.record['ball_location'],
+                              out=self._offsets[:count])
+        distances = self.distances[:count]
+        np.einsum('ij,ij->i', offsets, offsets, out=distances)
+        np.sqrt(distances, out=distances)
+        self.distances[count:] = np.inf
+
+        closest = int(np.argmin(distances)) if count else -1
+        closest_distance = distances[closest] if count else np.inf
+        possessing_car = closest if closest_distance < POSSESSION_DISTANCE else None
+        if possessing_car != self.possessing_car:
+            self.possessing_car = possessing_car
+            self.possession_start = time
+        carrying_car = closest if closest_distance < MAX_DISTANCE_WHEN_SPIKED else None
+        if carrying_car != self.carrying_car:
+            self.carrying_car = carrying_car
+            self.carry_start = time
+
+        if closest_distance < _MAX_DRIBBLE_DISTANCE:
+            # The ball is above the car when the offset from the ball to the car points down.
+            height = -offsets[:, 2]
+            dribbling = ((offsets[:, 0] ** 2 + offsets[:, 1] ** 2 < DRIBBLE_RADIUS ** 2)
+                         & (height > DRIBBLE_MIN_HEIGHT) & (height < DRIBBLE_MAX_HEIGHT))
+            self.dribble_start[:count][dribbling & ~self.dribbling[:count]] = time
+            self.dribbling[:count] = dribbling
+            self.dribbling[count:] = False
+        elif self._any_dribbling:
+            self.dribbling[:] = False
+        self._any_dribbling = closest_distance < _MAX_DRIBBLE_DISTANCE and bool(self.dribbling.any())
+
+        touch_time = snapshot['touch_time']
+        if touch_time > 0 and (self.last_touch is None or touch_time != self.last_touch.time):
+            self._record_touch(touch_time, snapshot['touch_index'], snapshot['touch_team'])
+
+        row = self._next
+        self.times[row] = time
+        self.possession_history[row] = -1 if possessing_car is None else possessing_car
+        self.dribble_history[row] = self.dribbling
+        self._next = (row + 1) % len(self.times)
+        self._count = min(self._count + 1, len(self.times))
+
+    def _record_touch(self, time: float, index: int, team: int):
+        self.last_touch = TouchRecord(time, index, team)
+        if 0 <= team < 2:
+            self.last_touch_by_team[team] = time
+        if 0 <= index < len(self.last_touch_by_car):
+            self.last_touch_by_car[index] = time
+        self.touch_times[self._next_touch] = time
+        self.touch_cars[self._next_touch] = index
+        self.touch_teams[self._next_touch] = team
+        self._next_touch = (self._next_touch + 1) % MAX_TOUCHES
+        self._touch_count = min(self._touch_count + 1, MAX_TOUCHES)
+
+    @property
+    def possessing_team(self) -> Optional[int]:
+        return None if self.possessing_car is None else int(self.teams[self.possessing_car])
+
+    @property
+    def possession_duration(self) -> float:
+        """How long the car with possession has had it, 0 if nobody has it."""
+        return 0.0 if self.possessing_car is None else self.game_time - self.possession_start
+
+    @property
+    def carry_duration(self) -> float:
+        """How long the ball has been spiked to the carrying car, 0 if it isn't spiked."""
+        return 0.0 if self.carrying_car is None else self.game_time - self.carry_start
+
+    def is_dribbling(self, index: int) -> bool:
+        return bool(self.dribbling[index])
+
+    def dribble_duration(self, index: int) -> float:
+        return self.game_time - self.dribble_start[index] if self.dribbling[index] else 0.0
+
+    def time_since_touch(self, team: Optional[int] = None, index: Optional[int] = None) -> float:
+        """Seconds since the ball was last touched by anyone, by the team, or by the car. inf if it never was."""
+        if index is not None:
+            return self.game_time - self.last_touch_by_car[index]
+        if team is not None:
+            return self.game_time - self.last_touch_by_team[team]
+        return self.game_time - self.last_touch.time if self.last_touch is not None else np.inf
+
+    def _recent_rows(self, seconds: float) -> np.ndarray:
+        rows = np.arange(self._next - self._count, self._next) % len(self.times)
+        return rows[self.times[rows] > self.game_time - seconds]
+
+    def possession_share(self, team: int, seconds: float = 5) -> float:
+        """The fraction of ticks in the last `seconds` in which the team had possession."""
+        rows = self._recent_rows(seconds)
+        if len(rows) == 0:
+            return 0.0
+        cars = self.possession_history[rows]
+        return float(np.mean((cars >= 0) & (self.teams[cars] == team)))
+
+    def dribble_share(self, index: int, seconds: float = 5) -> float:
+        """The fraction of ticks in the last `seconds` in which the car was dribbling."""
+        rows = self._recent_rows(seconds)
+        return float(self.dribble_history[rows, index].mean()) if len(rows) else 0.0
+
+    def recent_touches(self) -> List[TouchRecord]:
+        """The last MAX_TOUCHES touches, oldest first."""
+        rows = np.arange(self._next_touch - self._touch_count, self._next_touch) % MAX_TOUCHES
+        return [TouchRecord(float(self.touch_times[row]), int(self.touch_cars[row]), int(self.touch_teams[row]))
+                for row in rows]
@@ -0,0 +1,158 @@
+import time
+from contextlib import nullcontext
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# How many ticks of history each section keeps. At 120 ticks per second this is the last 5 seconds.
+DEFAULT_HISTORY = 600
+# Where the report is drawn on screen, in pixels from the top left corner: the top right of a 1920 wide screen.
+DEFAULT_RENDER_POSITION = (1200, 20)
+RENDER_LINE_HEIGHT = 20
+
+
+class _RingBuffer:
+    __slots__ = ['values', 'index', 'count']
+
+    def __init__(self, size: int):
+        self.values = np.zeros(size)
+        self.index = 0
+        self.count = 0
+
+    def append(self, value: float):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        if self.count < len(self.values):
+            self.count += 1
+
+    def percentiles(self, *q: float):
+        if self.count == 0:
+            return [0.0] * len(q)
+        return np.percentile(self.values[:self.count], q).tolist()
+
+
+class _Section:
+    """
+    Times `with` blocks and adds up their time over the tick. end_tick() puts the total into the ring buffer, so a
+    section entered several times in a tick gives one sample. A block nested in another block of the same section
+    isn't counted twice.
+    """
+    __slots__ = ['buffer', 'total', 'entered', 'starts']
+
+    def __init__(self, buffer: _RingBuffer):
+        self.buffer = buffer
+        self.total = 0.0
+        self.entered = False
+        self.starts = []
+
+    def __enter__(self):
+        self.starts.append(time.perf_counter())
+        self.entered = True
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        start = self.starts.pop()
+        if not self.starts:
+            self.total += time.perf_counter() - start
+
+    def end_tick(self):
+        """Records the tick's total, if the section was entered during the tick."""
+        if self.entered:
+            self.buffer.append(self.total)
+            self.total = 0.0
+            self.entered = False
+
+
+class TickProfiler:
+    """
+    Measures how long each part of get_output takes. Wrap a tick in begin_tick() / end_tick() and the parts you
+    care about in `with profiler.section('steering'):`. A section's samples are its total time per tick, however
+    often it was entered. The last `history` samples of every section are kept, and report() gives you the p50 and
+    p99 in milliseconds, plus how many ticks went over the budget.
+
+    If you give it a renderer, end_tick will draw the report on screen at render_position, updated every
+    `report_interval` seconds, and if you give it a report_file, the same report is appended to that file.
+    """
+
+    def __init__(self, budget: float = 1 / 120, history: int = DEFAULT_HISTORY, renderer=None,
+                 report_file: Optional[str] = None, report_interval: float = 1.0,
+                 render_position: Tuple[int, int] = DEFAULT_RENDER_POSITION):
+        self.budget = budget
+        self.history = history
+        self.renderer = renderer
+        self.render_position = render_position
+        self.report_file = report_file
+        self.report_interval = report_interval
+        self.ticks = _RingBuffer(history)
+        self.missed_deadlines = 0
+        self.tick_count = 0
+        self._sections: Dict[str, _Section] = {}
+        self._tick_start = 0.0
+        self._last_report = 0.0
+        self._report_lines = []
+
+    def section(self, name: str) -> _Section:
+        section = self._sections.get(name)
+        if section is None:
+            section = self._sections[name] = _Section(_RingBuffer(self.history))
+        return section
+
+    def begin_tick(self):
+        self._tick_start = time.perf_counter()
+
+    def end_tick(self):
+        now = time.perf_counter()
+        elapsed = now - self._tick_start
+        self.ticks.append(elapsed)
+        self.tick_count += 1
+        if elapsed > self.budget:
+            self.missed_deadlines += 1
+        for section in self._sections.values():
+            section.end_tick()
+
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            self._report_lines = self.format_report()
+            if self.report_file:
+                with open(self.report_file, 'a') as f:
+                    f.write(f"[{time.strftime('%H:%M:%S')}] " + ' | '.join(self._report_lines) + '\n')
+        if self.renderer is not None:
+            self.render()
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Returns p50 and p99 in milliseconds for the whole tick and for every section."""
+        result = {}
+        for name, buffer in [('tick', self.ticks)] + [(n, s.buffer) for n, s in self._sections.items()]:
+            p50, p99 = buffer.percentiles(50, 99)
+            result[name] = {'p50': p50 * 1000, 'p99': p99 * 1000}
+        return result
+
+    def format_report(self):
+        lines = [f"{name}: p50 {stats['p50']:.3f}ms p99 {stats['p99']:.3f}ms" for name, stats in self.report().items()]
+        lines.append(f"missed {self.missed_deadlines}/{self.tick_count} ({self.budget * 1000:.1f}ms budget)")
+        return lines
+
+    def render(self):
+        # The renderer is the bot's RenderQueue. get_output flushes it before end_tick, so these lines go out with
+        # the next tick's drawing. They only change once per report_interval, so they don't make frames resend.
+        x, y = self.render_position
+        for i, line in enumerate(self._report_lines):
+            self.renderer.draw_string_2d(x, y + RENDER_LINE_HEIGHT * i, 1, 1, line, self.renderer.white())
+
+
+class NullProfiler:
+    """Has the same interface as TickProfiler but does nothing, so leaving the calls in costs next to nothing."""
+
+    _section = nullcontext()
+
+    def section(self, name: str):
+        return self._section
+
+    def begin_tick(self):
+        pass
+
+    def end_tick(self):
+        pass
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {}
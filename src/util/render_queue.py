@@ -0,0 +1,228 @@
+import time
+from typing import List, Optional
+
+
+class NullRenderer:
+    """
+    A renderer that draws nothing. Use it for headless runs and benchmarks where there is no game to draw in.
+    It has the methods of the framework's RenderingManager, so a misspelled one fails here too.
+    """
+
+    def begin_rendering(self, group_id: str = 'default'):
+        pass
+
+    def end_rendering(self):
+        pass
+
+    def clear_screen(self, group_id: str = 'default'):
+        pass
+
+    def clear_all_touched_render_groups(self):
+        pass
+
+    def is_rendering(self):
+        return False
+
+    def draw_line_2d(self, x1, y1, x2, y2, color):
+        return self
+
+    def draw_polyline_2d(self, vectors, color):
+        return self
+
+    def draw_line_3d(self, vec1, vec2, color):
+        return self
+
+    def draw_polyline_3d(self, vectors, color):
+        return self
+
+    def draw_line_2d_3d(self, x, y, vec, color):
+        return self
+
+    def draw_rect_2d(self, x, y, width, height, filled, color):
+        return self
+
+    def draw_rect_3d(self, vec, width, height, filled, color, centered=False):
+        return self
+
+    def draw_string_2d(self, x, y, scale_x, scale_y, text, color):
+        return self
+
+    def draw_string_3d(self, vec, scale_x, scale_y, text, color):
+        return self
+
+    def create_color(self, alpha, red, green, blue):
+        return None
+
+    def team_color(self, team=None, alt_color=False):
+        return None
+
+    def black(self):
+        return None
+
+    def white(self):
+        return None
+
+    def gray(self):
+        return None
+
+    def grey(self):
+        return None
+
+    def blue(self):
+        return None
+
+    def red(self):
+        return None
+
+    def green(self):
+        return None
+
+    def lime(self):
+        return None
+
+    def yellow(self):
+        return None
+
+    def orange(self):
+        return None
+
+    def cyan(self):
+        return None
+
+    def pink(self):
+        return None
+
+    def purple(self):
+        return None
+
+    def teal(self):
+        return None
+
+
+def _point(vec) -> tuple:
+    # Accepts Vec3, the packet's Vector3 and plain sequences, and gives a tuple that can be compared between frames.
+    if hasattr(vec, 'x'):
+        return float(vec.x), float(vec.y), float(vec.z)
+    return float(vec[0]), float(vec[1]), float(vec[2])
+
+
+class RenderQueue:
+    """
+    Collects draw calls during a tick and sends them to the real renderer in one go when flush() is called.
+    It has the same draw_* methods as the renderer, with a few differences that make debug drawing cheap:
+
+    - Strings can be given as a format string plus arguments, e.g.
+      `draw_string_2d(20, 20, 2, 2, "Boost: {}", queue.white(), my_car.boost)`.
+      The string is only formatted if the frame actually gets sent.
+    - Colors are names ('white', 'cyan', ...), which is what queue.white() etc. return.
+    - A frame identical to the previous one isn't sent again, since the game keeps showing the last one.
+    - At most max_rate frames per second are sent. Set it to 0 to send every changed frame.
+    - When enabled is False (rendering turned off in rlbot.cfg, or a NullRenderer for headless runs), draw calls
+      return immediately without storing anything.
+    """
+
+    def __init__(self, renderer, enabled: bool = True, max_rate: float = 30, group_id: str = 'debug'):
+        self.renderer = renderer
+        self.enabled = enabled and renderer is not None and not isinstance(renderer, NullRenderer)
+        self.max_rate = max_rate
+        self.group_id = group_id
+        self.frames_sent = 0
+        self._commands: List[tuple] = []
+        self._last_sent: Optional[List[tuple]] = None
+        self._last_flush_time = -float('inf')
+
+    def white(self):
+        return 'white'
+
+    def black(self):
+        return 'black'
+
+    def red(self):
+        return 'red'
+
+    def green(self):
+        return 'green'
+
+    def blue(self):
+        return 'blue'
+
+    def yellow(self):
+        return 'yellow'
+
+    def orange(self):
+        return 'orange'
+
+    def cyan(self):
+        return 'cyan'
+
+    def pink(self):
+        return 'pink'
+
+    def purple(self):
+        return 'purple'
+
+    def teal(self):
+        return 'teal'
+
+    def draw_line_3d(self, vec1, vec2, color):
+        if self.enabled:
+            self._commands.append(('line_3d', _point(vec1), _point(vec2), color))
+        return self
+
+    def draw_rect_3d(self, vec, width, height, filled, color, centered=False):
+        if self.enabled:
+            self._commands.append(('rect_3d', _point(vec), width, height, filled, color, centered))
+        return self
+
+    def draw_string_2d(self, x, y, scale_x, scale_y, text, color, *format_args):
+        if self.enabled:
+            self._commands.append(('string_2d', x, y, scale_x, scale_y, text, color, format_args))
+        return self
+
+    def draw_string_3d(self, vec, scale_x, scale_y, text, color, *format_args):
+        if self.enabled:
+            self._commands.append(('string_3d', _point(vec), scale_x, scale_y, text, color, format_args))
+        return self
+
+    def flush(self):
+        """Sends the queued commands if the frame changed and the rate limit allows it, then clears the queue."""
+        if not self.enabled:
+            return
+        commands = self._commands
+        self._commands = []
+        if commands == self._last_sent:
+            return
+        now = time.perf_counter()
+        if self.max_rate > 0 and now - self._last_flush_time < 1 / self.max_rate:
+            return
+        self._last_flush_time = now
+        self._last_sent = commands
+        self.frames_sent += 1
+
+        renderer = self.renderer
+        renderer.begin_rendering(self.group_id)
+        for command in commands:
+            kind = command[0]
+            if kind == 'line_3d':
+                renderer.draw_line_3d(command[1], command[2], self._color(command[3]))
+            elif kind == 'rect_3d':
+                renderer.draw_rect_3d(command[1], command[2], command[3], command[4], self._color(command[5]),
+                                      centered=command[6])
+            elif kind == 'string_2d':
+                renderer.draw_string_2d(command[1], command[2], command[3], command[4],
+                                        _format(command[5], command[7]), self._color(command[6]))
+            elif kind == 'string_3d':
+                renderer.draw_string_3d(command[1], command[2], command[3], _format(command[4], command[6]),
+                                        self._color(command[5]))
+        renderer.end_rendering()
+
+    def _color(self, color):
+        if isinstance(color, str):
+            return getattr(self.renderer, color)()
+        return color
+
+
+def _format(text: str, format_args: tuple) -> str:
+    if format_args:
+        return text.format(*format_args)
+    return text
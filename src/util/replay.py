@@ -0,0 +1,191 @@
+import ctypes
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+from rlbot.agents.base_agent import BaseAgent, SimpleControllerState, BOT_CONFIG_AGENT_HEADER
+from rlbot.utils.structures.ball_prediction_struct import BallPrediction
+from rlbot.utils.structures.game_data_struct import GameTickPacket, FieldInfoPacket
+
+from util.render_queue import NullRenderer
+from util.world_model import WorldModel
+
+# A replay file starts with the magic bytes, a format version and the sizes of the structs it contains, so we can
+# refuse to read files recorded with a different version of the framework's structs.
+MAGIC = b'RLBR'
+VERSION = 1
+_HEADER = struct.Struct('<4sHIII')
+# Every record is a kind byte and the length of the zlib compressed payload that follows it.
+_RECORD = struct.Struct('<BI')
+_FIELD_INFO = 0
+_TICK = 1
+
+# Fast compression is plenty, most of a packet is zeros for the cars and pads that don't exist.
+_COMPRESSION_LEVEL = 1
+
+
+def _struct_sizes() -> Tuple[int, int, int]:
+    return ctypes.sizeof(GameTickPacket), ctypes.sizeof(FieldInfoPacket), ctypes.sizeof(BallPrediction)
+
+
+def recording_path(path: Union[str, Path], index: int) -> Path:
+    """
+    The file the bot with the given index records to when record_replay_file is path: the index goes at the end of
+    the name, e.g. my_match_0.rlbr. Bots sharing a config then don't write over each other's recordings.
+    """
+    path = Path(path)
+    return path.with_name(f'{path.stem}_{index}{path.suffix}')
+
+
+class ReplayRecorder:
+    """
+    Writes the field info, and every packet together with its ball prediction, to a compact binary file.
+    Call record_field_info once from initialize_agent and record_tick from get_output, then close() at the end.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.file: BinaryIO = open(path, 'wb')
+        self.file.write(_HEADER.pack(MAGIC, VERSION, *_struct_sizes()))
+        self.ticks_recorded = 0
+
+    def record_field_info(self, field_info: FieldInfoPacket):
+        self._write(_FIELD_INFO, bytes(field_info))
+
+    def record_tick(self, packet: GameTickPacket, ball_prediction: Optional[BallPrediction] = None):
+        if ball_prediction is None:
+            ball_prediction = BallPrediction()
+        self._write(_TICK, bytes(packet) + bytes(ball_prediction))
+        self.ticks_recorded += 1
+
+    def _write(self, kind: int, payload: bytes):
+        compressed = zlib.compress(payload, _COMPRESSION_LEVEL)
+        self.file.write(_RECORD.pack(kind, len(compressed)))
+        self.file.write(compressed)
+
+    def close(self):
+        self.file.close()
+
+
+class Replay:
+    """A recorded replay file, loaded into memory."""
+
+    def __init__(self, field_info: FieldInfoPacket, ticks: List[Tuple[GameTickPacket, BallPrediction]]):
+        self.field_info = field_info
+        self.ticks = ticks
+
+    @staticmethod
+    def load(path: Union[str, Path]) -> 'Replay':
+        field_info = FieldInfoPacket()
+        ticks = []
+        for kind, payload in _read_records(path):
+            if kind == _FIELD_INFO:
+                field_info = FieldInfoPacket.from_buffer_copy(payload)
+            elif kind == _TICK:
+                packet_size = ctypes.sizeof(GameTickPacket)
+                packet = GameTickPacket.from_buffer_copy(payload[:packet_size])
+                ball_prediction = BallPrediction.from_buffer_copy(payload[packet_size:])
+                ticks.append((packet, ball_prediction))
+        return Replay(field_info, ticks)
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def team_of(self, index: int) -> int:
+        """The team of packet.game_cars[index] in the first recorded packet."""
+        if not self.ticks:
+            raise ValueError('The replay has no ticks')
+        packet = self.ticks[0][0]
+        if not 0 <= index < packet.num_cars:
+            raise ValueError(f'There is no car {index} in the replay, it has {packet.num_cars} cars')
+        return packet.game_cars[index].team
+
+
+def _read_records(path: Union[str, Path]) -> Iterator[Tuple[int, bytes]]:
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        magic, version, *sizes = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay file")
+        if tuple(sizes) != _struct_sizes():
+            raise ValueError(f"{path} was recorded with a different version of the rlbot structs")
+        while True:
+            record = f.read(_RECORD.size)
+            if len(record) < _RECORD.size:
+                return
+            kind, length = _RECORD.unpack(record)
+            yield kind, zlib.decompress(f.read(length))
+
+
+class ReplayPlayer:
+    """
+    Feeds a recorded replay to a bot without the game running. The bot gets the recorded field info and ball
+    predictions, a NullRenderer, and no match settings, and every packet is handed to get_output back to back,
+    as fast as the bot can process them.
+    """
+
+    def __init__(self, replay: Replay):
+        self.replay = replay
+        self._ball_prediction = BallPrediction()
+
+    def create_agent(self, agent_class, name: str = 'replay', team: Optional[int] = None, index: int = 0,
+                     config_path: Union[str, Path] = None) -> BaseAgent:
+        """
+        Creates the bot and hooks it up to the replay the same way the framework would, including
+        loading its Bot Parameters from config_path if given. team defaults to the car's team in the recording.
+        """
+        if team is None:
+            team = self.replay.team_of(index)
+        return create_headless_agent(agent_class, name, team, index, lambda: self.replay.field_info,
+                                     lambda: self._ball_prediction, config_path)
+
+    def play(self, agent: BaseAgent) -> List[SimpleControllerState]:
+        """Runs every recorded tick through the bot and returns the controls it produced."""
+        return [controls for controls, in self.play_all([agent])]
+
+    def play_all(self, agents: List[BaseAgent]) -> List[List[SimpleControllerState]]:
+        """
+        Runs every recorded tick through all the bots, like a team hosted in one process.
+        Returns the controls of every bot for every tick.
+        """
+        outputs = []
+        for packet, ball_prediction in self.replay.ticks:
+            self._ball_prediction = ball_prediction
+            outputs.append([agent.get_output(packet) for agent in agents])
+        return outputs
+
+
+def create_headless_agent(agent_class, name: str, team: int, index: int,
+                          get_field_info: Callable[[], FieldInfoPacket],
+                          get_ball_prediction: Callable[[], BallPrediction],
+                          config_path: Union[str, Path] = None, world_model: WorldModel = None) -> BaseAgent:
+    """
+    Creates a bot outside of the framework, the way the bot manager would: it reads field info and ball predictions
+    from the given functions, draws into a NullRenderer and gets no match settings. Its Bot Parameters are loaded from
+    config_path if given, then initialize_agent is called. A headless bot never records, even if the config sets
+    record_replay_file: that's usually the recording being played. Pass a world_model to have the bot use it instead
+    of the process wide one; the agent class needs a use_world_model method for that, like MyBot.
+    """
+    agent = agent_class(name, team, index)
+    if world_model is not None:
+        agent.use_world_model(world_model)
+    agent._register_field_info(get_field_info)
+    agent._register_ball_prediction_struct(get_ball_prediction)
+    agent._register_match_settings_func(lambda: None)
+    agent._set_renderer(NullRenderer())
+    config = agent_class.base_create_agent_configurations()
+    if config_path is not None:
+        config.parse_file(config_path)
+    agent.load_config(config.get_header(BOT_CONFIG_AGENT_HEADER))
+    if hasattr(agent, 'replay_file'):
+        agent.replay_file = None
+    agent.initialize_agent()
+    return agent
+
+
+def controls_to_tuple(controls: Optional[SimpleControllerState]) -> tuple:
+    """Turns controls into a plain tuple, handy for comparing two runs of the same replay."""
+    if controls is None:
+        return ()
+    return (controls.throttle, controls.steer, controls.pitch, controls.yaw, controls.roll,
+            controls.jump, controls.boost, controls.handbrake, controls.use_item)
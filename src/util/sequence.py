@@ -1,5 +1,7 @@
+from bisect import bisect_left
+from collections import deque
 from dataclasses import dataclass
-from typing import List
+from typing import Deque, List, Optional, Tuple
 
 from rlbot.agents.base_agent import SimpleControllerState
 from rlbot.utils.structures.game_data_struct import GameTickPacket
@@ -31,12 +33,15 @@ class ControlStep(Step):
         self.duration = duration
         self.controls = controls
         self.start_time: float = None
+        # The result only ever takes these two values, so there's no need for a new one every tick.
+        self._running = StepResult(controls=controls, done=False)
+        self._done = StepResult(controls=controls, done=True)
 
     def tick(self, packet: GameTickPacket) -> StepResult:
         if self.start_time is None:
             self.start_time = packet.game_info.seconds_elapsed
         elapsed_time = packet.game_info.seconds_elapsed - self.start_time
-        return StepResult(controls=self.controls, done=elapsed_time > self.duration)
+        return self._done if elapsed_time > self.duration else self._running
 
 
 class Sequence:
@@ -61,3 +66,101 @@ class Sequence:
         # If we reach here, we ran out of steps to attempt.
         self.done = True
         return None
+
+
+class Maneuver:
+    """
+    A fixed series of controls over time, like a ControlStep sequence, compiled into a table once and never changed
+    afterwards. Looking up the controls for a moment is a bisect over the step end times, and the controls objects
+    in the table are handed out as they are, so don't modify the controls you get back.
+    Build maneuvers once at import time and reuse them; see util/maneuvers.py.
+    """
+    __slots__ = ['name', 'end_times', 'controls', 'duration']
+
+    def __init__(self, name: str, steps: List[Tuple[float, SimpleControllerState]]):
+        """steps is a list of (duration, controls), in order."""
+        self.name = name
+        end_times = []
+        elapsed = 0.0
+        for duration, _ in steps:
+            elapsed += duration
+            end_times.append(elapsed)
+        self.end_times: Tuple[float, ...] = tuple(end_times)
+        self.controls: Tuple[SimpleControllerState, ...] = tuple(controls for _, controls in steps)
+        self.duration = elapsed
+
+    @staticmethod
+    def from_steps(name: str, steps: List[ControlStep]) -> 'Maneuver':
+        return Maneuver(name, [(step.duration, step.controls) for step in steps])
+
+    def steps(self) -> List[Tuple[float, SimpleControllerState]]:
+        """The (duration, controls) the maneuver was built from."""
+        starts = (0.0,) + self.end_times[:-1]
+        return [(end - start, controls) for start, end, controls in zip(starts, self.end_times, self.controls)]
+
+    def controls_at(self, elapsed: float) -> Optional[SimpleControllerState]:
+        """The controls at the given time since the maneuver started, or None once it's over."""
+        index = bisect_left(self.end_times, elapsed)
+        if index < len(self.controls):
+            return self.controls[index]
+        return None
+
+    def __repr__(self):
+        return self.name
+
+
+class ManeuverPlayer:
+    """
+    Plays maneuvers one after another. start() begins a maneuver right away, replacing the current one unless that one
+    has a higher priority; chain() queues a maneuver to start the moment the current one ends. Ticking never creates
+    objects: it's a bisect into the current maneuver's table.
+    """
+
+    def __init__(self):
+        self.maneuver: Optional[Maneuver] = None
+        self.start_time = 0.0
+        self.priority = 0
+        self._queue: Deque[Maneuver] = deque()
+
+    @property
+    def active(self) -> bool:
+        return self.maneuver is not None
+
+    def start(self, maneuver: Maneuver, game_time: float, priority: int = 0) -> bool:
+        """
+        Starts the maneuver now and forgets anything chained to the old one. Returns False, and does nothing, if
+        the maneuver in progress has a higher priority.
+        """
+        if self.maneuver is not None and priority < self.priority:
+            return False
+        self.maneuver = maneuver
+        self.start_time = game_time
+        self.priority = priority
+        self._queue.clear()
+        return True
+
+    def chain(self, maneuver: Maneuver):
+        """Plays the maneuver after the current one and anything already chained, with the same priority."""
+        if self.maneuver is None:
+            raise ValueError('Nothing to chain to, start() a maneuver first')
+        self._queue.append(maneuver)
+
+    def cancel(self):
+        self.maneuver = None
+        self.priority = 0
+        self._queue.clear()
+
+    def tick(self, game_time: float) -> Optional[SimpleControllerState]:
+        """The controls for this moment, or None if no maneuver is playing any more."""
+        while self.maneuver is not None:
+            controls = self.maneuver.controls_at(game_time - self.start_time)
+            if controls is not None:
+                return controls
+            # The next maneuver starts exactly where this one ended, not at this tick, so timing errors don't add up.
+            self.start_time += self.maneuver.duration
+            self.maneuver = self._queue.popleft() if self._queue else None
+        self.priority = 0
+        return None
+
+    def __str__(self):
+        return str(self.maneuver)
@@ -0,0 +1,79 @@
+"""
+A small state machine for deciding what a bot does each tick.
+
+The states are checked in priority order and the first one that applies gets to choose the controls. What the
+checks and actions need to know comes from a LazyInputs object, which computes each value the first time it's asked
+for and forgets it at the next tick, so a tick only pays for the inputs the states it actually looked at needed.
+A TickContext from util.tick_context makes good inputs.
+
+Every state lists the inputs it reads in needs. Create the StateMachine with check_needs=True while you work on the
+states, and a state that reads an input it didn't list raises an UndeclaredInputError, so the lists stay true.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Tuple
+
+from rlbot.agents.base_agent import SimpleControllerState
+
+from util.tick_context import LazyInputs
+
+
+@dataclass
+class State:
+    name: str
+    # Whether the state applies this tick. States that always apply leave it out.
+    when: Optional[Callable[[LazyInputs], bool]]
+    # The controls for this tick. Returning None hands the tick on to the next state that applies.
+    act: Callable[[LazyInputs], Optional[SimpleControllerState]]
+    # The lazy inputs when and act read, directly or through the functions they call. With check_needs, reading
+    # any other one raises an UndeclaredInputError. Inputs only computed from the listed ones don't count, and
+    # neither do plain attributes that are set every tick, like TickContext's car.
+    needs: Tuple[str, ...] = ()
+
+
+class UndeclaredInputError(Exception):
+    pass
+
+
+class DeclaredInputs:
+    """The inputs as one state sees them when needs are checked: reading an input it didn't declare raises."""
+
+    __slots__ = ['inputs', 'state']
+
+    def __init__(self, inputs: LazyInputs, state: State):
+        self.inputs = inputs
+        self.state = state
+
+    def __getattr__(self, name: str):
+        if name in self.inputs._lazy_names and name not in self.state.needs:
+            raise UndeclaredInputError(f"State '{self.state.name}' reads {name} but doesn't list it in its needs")
+        return getattr(self.inputs, name)
+
+
+class StateMachine:
+    """
+    Picks the first state, in the given order, that applies and lets it act. The last `history` changes of state
+    are kept as (game time, state name) so you can see afterwards why the bot did what it did. With check_needs,
+    every state gets DeclaredInputs instead of the inputs, which is slower but catches states with incomplete needs.
+    """
+
+    def __init__(self, states: List[State], history: int = 50, check_needs: bool = False):
+        self.states = states
+        self.state: Optional[State] = None
+        self.history: Deque[Tuple[float, str]] = deque(maxlen=history)
+        self.check_needs = check_needs
+
+    def tick(self, inputs: LazyInputs, game_time: float) -> SimpleControllerState:
+        for state in self.states:
+            state_inputs = DeclaredInputs(inputs, state) if self.check_needs else inputs
+            if state.when is not None and not state.when(state_inputs):
+                continue
+            controls = state.act(state_inputs)
+            if controls is None:
+                continue
+            if state is not self.state:
+                self.state = state
+                self.history.append((game_time, state.name))
+            return controls
+        raise ValueError('No state applies, give the state machine a last state that always does')
@@ -0,0 +1,164 @@
+"""
+A grid over the field that knows, for every cell, when each car could get there. From that follow questions
+about the opponents like "which parts of the field do we reach first" and "can they get to our goal before we do".
+
+Arrival times come from the same model as the intercept search: turn on the current turning circle, then drive
+straight, boosting while the boost lasts. Cars are on the ground, so the field is flat here.
+
+Every car's times are stored as the game time it would arrive, so they stay valid for a while as the game goes on.
+Only the cars whose times are older than refresh_interval are recomputed on an update, and at most
+max_refreshes_per_update of them, so the work is spread over ticks. With a coarser cell_size, a longer interval or
+fewer refreshes per update it costs less and is less accurate.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+from rlbot.utils.structures.game_data_struct import GameTickPacket, MAX_PLAYERS
+
+from util.ball_sim import STANDARD_ARENA, Arena
+from util.intercept import path_lengths, reachable_distances, turn_radius
+from util.orientation import OrientationCache
+from util.packet_snapshot import PacketSnapshot
+
+DEFAULT_CELL_SIZE = 256
+DEFAULT_REFRESH_INTERVAL = 0.1
+DEFAULT_MAX_REFRESHES = 2
+
+# Arrival times are looked up on this many seconds of driving, sampled this often. Beyond it the car keeps going at
+# the speed it had at the end.
+HORIZON = 6
+HORIZON_STEP = 1 / 20
+
+# The area in front of each goal that counts as the goal being exposed if an opponent gets there first.
+GOAL_ZONE_DEPTH = 1200
+# Reaching a cell less than this much earlier doesn't count as getting there first.
+DEFAULT_MARGIN = 0.1
+
+_DURATIONS = np.arange(0, HORIZON + HORIZON_STEP / 2, HORIZON_STEP)
+
+
+class ThreatMap:
+    """
+    Call update() once per frame, e.g. through the WorldModel. Grids are indexed [row, column], with rows along y
+    and columns along x, and cover the arena's rectangle including the corners outside the field.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE, refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 max_refreshes_per_update: int = DEFAULT_MAX_REFRESHES, arena: Arena = STANDARD_ARENA):
+        self.cell_size = cell_size
+        self.refresh_interval = refresh_interval
+        self.max_refreshes_per_update = max_refreshes_per_update
+        self.arena = arena
+
+        columns = int(np.ceil(2 * arena.half_width / cell_size))
+        rows = int(np.ceil(2 * arena.half_length / cell_size))
+        self.x = -arena.half_width + (np.arange(columns) + 0.5) * cell_size
+        self.y = -arena.half_length + (np.arange(rows) + 0.5) * cell_size
+        self.cell_x, self.cell_y = np.meshgrid(self.x, self.y)
+
+        # The goal zone of each team: blue defends the goal at negative y, orange the one at positive y.
+        in_goal_width = np.abs(self.cell_x) < arena.goal_half_width
+        self.goal_zones = np.stack((in_goal_width & (self.cell_y < -arena.half_length + GOAL_ZONE_DEPTH),
+                                    in_goal_width & (self.cell_y > arena.half_length - GOAL_ZONE_DEPTH)))
+
+        self.teams = np.empty(MAX_PLAYERS, dtype=np.int8)
+        self.arrival_times = np.empty((MAX_PLAYERS, rows, columns))  # Game time each car could get there
+        self.team_arrival_times = np.empty((2, rows, columns))  # The earliest car of each team
+        self.refresh_times = np.empty(MAX_PLAYERS)
+        self.refreshes = 0
+        self._snapshot = PacketSnapshot()
+        self.reset()
+
+    def reset(self):
+        """Forgets every car's arrival times, e.g. when a new match starts. They're all recomputed from scratch."""
+        self.game_time = 0.0
+        self.num_cars = 0
+        self.teams[:] = 0
+        self.arrival_times[:] = np.inf
+        self.team_arrival_times[:] = np.inf
+        self.refresh_times[:] = -np.inf
+
+    def cell(self, x: float, y: float) -> Tuple[int, int]:
+        """The [row, column] of the cell containing the point, clamped to the grid."""
+        rows, columns = self.cell_x.shape
+        column = min(max(int((x + self.arena.half_width) // self.cell_size), 0), columns - 1)
+        row = min(max(int((y + self.arena.half_length) // self.cell_size), 0), rows - 1)
+        return row, column
+
+    def update(self, packet: GameTickPacket, orientations: Optional[OrientationCache] = None,
+               snapshot: Optional[PacketSnapshot] = None):
+        """
+        Pass the WorldModel's OrientationCache and snapshot, already updated with the packet, to share them. Without
+        a snapshot the packet is copied into the map's own.
+        """
+        orientations = orientations or OrientationCache()
+        if snapshot is None:
+            snapshot = self._snapshot
+            snapshot.read(packet)
+        game_time = snapshot.game_time
+        if game_time < self.game_time:
+            # A new match, or the state was set back. The times are game times of the old timeline, so none is valid.
+            self.reset()
+        self.game_time = game_time
+        count = snapshot.num_cars
+        if count != self.num_cars:
+            self.num_cars = count
+            self.refresh_times[:] = -np.inf
+            self.arrival_times[count:] = np.inf
+        # The stalest cars first.
+        due = np.flatnonzero(self.refresh_times[:count] <= self.game_time - self.refresh_interval)
+        due = due[np.argsort(self.refresh_times[due], kind='stable')][:self.max_refreshes_per_update]
+        if len(due) == 0:
+            return
+        changed_teams = set()
+        for index in due:
+            self._refresh_car(snapshot, orientations, int(index))
+            changed_teams.add(int(self.teams[index]))
+        for team in changed_teams:
+            if team in (0, 1):
+                members = np.flatnonzero(self.teams[:count] == team)
+                np.min(self.arrival_times[members], axis=0, out=self.team_arrival_times[team])
+
+    def _refresh_car(self, snapshot: PacketSnapshot, orientations: OrientationCache, index: int):
+        car = snapshot.cars[index]
+        self.teams[index] = car['team']
+        self.refresh_times[index] = self.game_time
+        self.refreshes += 1
+        if car['is_demolished']:
+            self.arrival_times[index] = np.inf
+            return
+        orientation = orientations.get(snapshot, index)
+        location = snapshot.car_location(index)
+        speed = snapshot.car_velocity(index).dot(orientation.forward)
+        # Cells relative to the car, x forward and y to the side. The side doesn't matter for path_lengths.
+        cos, sin = np.cos(orientation.yaw), np.sin(orientation.yaw)
+        dx = self.cell_x - location.x
+        dy = self.cell_y - location.y
+        lengths = path_lengths(dx * cos + dy * sin, dy * cos - dx * sin, turn_radius(max(speed, 0)))
+        distances = reachable_distances(speed, int(car['boost']), _DURATIONS)
+        final_speed = max((distances[-1] - distances[-2]) / HORIZON_STEP, 1)
+        times = np.interp(lengths, distances, _DURATIONS)
+        beyond = lengths > distances[-1]
+        times[beyond] = HORIZON + (lengths[beyond] - distances[-1]) / final_speed
+        self.arrival_times[index] = self.game_time + times
+
+    def advantage(self, team: int) -> np.ndarray:
+        """How many seconds earlier than the other team the team can get to each cell. Negative if they're later."""
+        return self.team_arrival_times[1 - team] - self.team_arrival_times[team]
+
+    def advantage_at(self, x: float, y: float, team: int) -> float:
+        row, column = self.cell(x, y)
+        return float(self.team_arrival_times[1 - team, row, column] - self.team_arrival_times[team, row, column])
+
+    def reached_first(self, team: int, margin: float = DEFAULT_MARGIN) -> np.ndarray:
+        """The cells the team gets to at least `margin` seconds before the other team."""
+        return self.advantage(team) > margin
+
+    def control_share(self, team: int, margin: float = DEFAULT_MARGIN) -> float:
+        """The fraction of the grid the team gets to first."""
+        return float(self.reached_first(team, margin).mean())
+
+    def goal_exposed(self, team: int, margin: float = DEFAULT_MARGIN) -> bool:
+        """Whether the other team can get to some part of the area in front of the team's goal first."""
+        return bool(self.reached_first(1 - team, margin)[self.goal_zones[team]].any())
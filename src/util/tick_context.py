@@ -0,0 +1,195 @@
+"""
+Quantities derived from the packet that several parts of a bot need during a tick, like the distance to the ball.
+A TickContext computes each of them the first time it's asked for and hands out the same value for the rest of the
+frame, so nobody has to pass them around or compute them again. The car and the locations of car and ball, which
+nearly everything needs, are read right away from every new packet instead:
+
+    context.update(packet)
+    if context.ball_distance < 300 and context.goal_alignment > 0.95: ...
+
+Add your own quantities by subclassing it and declaring them with @lazy.
+"""
+
+import math
+from typing import Callable, List, Optional, Tuple
+
+from rlbot.utils.structures.game_data_struct import GameTickPacket, PlayerInfo
+
+from util.orientation import Orientation, OrientationCache, relative_location
+from util.packet_snapshot import PacketSnapshot
+from util.vec import Vec3
+
+ENEMY_GOALS = (Vec3(0, 5120, 0), Vec3(0, -5120, 0))  # The goal each team shoots at, blue (0) then orange (1)
+
+# Marks a value that wasn't computed since the last reset. Not None, since None is a fine value for an input.
+NOT_COMPUTED = object()
+
+
+class lazy:
+    """
+    Declares a value of a LazyInputs class, like functools.cached_property: the decorated function computes it the
+    first time it's read after a reset. The values live in one list per instance, so a reset is a single copy.
+    """
+
+    def __init__(self, compute: Callable):
+        self.compute = compute
+        self.name = compute.__name__
+        self.index = None  # Position in the values, given out when the class is created
+        self.__doc__ = compute.__doc__
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        values = instance._values
+        value = values[self.index]
+        if value is NOT_COMPUTED:
+            value = values[self.index] = self.compute(instance)
+        return value
+
+
+class LazyInputs:
+    """
+    Base class for values that are computed on demand and forgotten together. Declare every value with @lazy;
+    reset() forgets them all.
+    """
+
+    __slots__ = ['_values']
+    _lazy_names: Tuple[str, ...] = ()
+    _not_computed: Tuple[object, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Base class values come first, so they keep their index in every subclass.
+        names = []
+        for klass in reversed(cls.__mro__):
+            names.extend(name for name, value in vars(klass).items() if isinstance(value, lazy) and name not in names)
+        for index, name in enumerate(names):
+            getattr(cls, name).index = index
+        cls._lazy_names = tuple(names)
+        cls._not_computed = (NOT_COMPUTED,) * len(names)
+
+    def __init__(self):
+        self._values = list(self._not_computed)
+
+    def reset(self):
+        self._values[:] = self._not_computed
+
+    def computed(self) -> List[str]:
+        """The values that were computed since the last reset, in no particular order."""
+        return [name for name, value in zip(self._lazy_names, self._values) if value is not NOT_COMPUTED]
+
+
+class TickContext(LazyInputs):
+    """
+    The packet of the current frame as seen from one car, with everything derived from it computed lazily.
+    Pass the OrientationCache and PacketSnapshot of the WorldModel to share them with everything else that uses them.
+    """
+
+    __slots__ = ['index', 'team', 'orientations', 'snapshot', 'packet', '_frame',
+                 'car', 'car_location', 'ball_location']
+
+    def __init__(self, index: int, team: int, orientations: Optional[OrientationCache] = None,
+                 snapshot: Optional[PacketSnapshot] = None):
+        super().__init__()
+        self.index = index
+        self.team = team
+        self.orientations = orientations or OrientationCache()
+        self.snapshot = snapshot or PacketSnapshot()
+        self.packet: GameTickPacket = None
+        self._frame: Tuple[int, float] = None
+        self.car: PlayerInfo = None
+        self.car_location: Vec3 = None
+        self.ball_location: Vec3 = None
+
+    def update(self, packet: GameTickPacket) -> bool:
+        """
+        Call this with every packet. If the frame didn't change, everything computed so far is kept (returns False).
+        """
+        self.snapshot.update(packet)
+        frame = self.snapshot.frame
+        if frame == self._frame:
+            return False
+        self.reset()
+        self.packet = packet
+        self._frame = frame
+        # Nearly everything reads these, so plain attributes are cheaper than lazy values.
+        snapshot = self.snapshot
+        self.car = packet.game_cars[self.index]
+        self.car_location = snapshot.car_location(self.index)
+        self.ball_location = snapshot.ball_location()
+        return True
+
+    @property
+    def game_time(self) -> float:
+        return self.snapshot.game_time
+
+    @lazy
+    def car_velocity(self) -> Vec3:
+        return self.snapshot.car_velocity(self.index)
+
+    @lazy
+    def car_speed(self) -> float:
+        return self.car_velocity.length()
+
+    @lazy
+    def orientation(self) -> Orientation:
+        return self.orientations.get(self.snapshot, self.index)
+
+    @lazy
+    def ball_velocity(self) -> Vec3:
+        return self.snapshot.ball_velocity()
+
+    @lazy
+    def ball_speed(self) -> float:
+        return self.ball_velocity.length()
+
+    @lazy
+    def ball_distance(self) -> float:
+        return self.car_location.dist(self.ball_location)
+
+    @lazy
+    def ball_xy_distance(self) -> float:
+        """Distance to the ball on the ground, ignoring height."""
+        return self.car_location.flat().dist(self.ball_location.flat())
+
+    @lazy
+    def direction_to_ball(self) -> Vec3:
+        return (self.ball_location - self.car_location).normalized()
+
+    @lazy
+    def ball_relative_location(self) -> Vec3:
+        """The ball relative to the car: x forward, y right, z up."""
+        return relative_location(self.car_location, self.orientation, self.ball_location)
+
+    @lazy
+    def azimuth_to_ball(self) -> float:
+        """The horizontal angle from the car's nose to the ball in degrees. Positive means the ball is to the right."""
+        direction = self.direction_to_ball
+        # The car's forward direction on the ground. atan2 doesn't care about its length, so no need to normalize.
+        forward = self.orientation.forward.flat()
+        dot = forward.dot(direction)
+        cross = forward.x * direction.y - forward.y * direction.x
+        return math.degrees(math.atan2(cross, dot))
+
+    @lazy
+    def ball_side(self) -> str:
+        """'opponent side' or 'team side', the half of the field the ball is in."""
+        ball_y = self.ball_location.y
+        on_opponent_side = ball_y > 0 if self.team == 0 else ball_y < 0
+        return 'opponent side' if on_opponent_side else 'team side'
+
+    @property
+    def enemy_goal(self) -> Vec3:
+        return ENEMY_GOALS[self.team]
+
+    @lazy
+    def goal_alignment(self) -> float:
+        """
+        How well car, ball and the enemy goal line up, from -1 to 1. Close to 1 means that driving straight into
+        the ball should send it towards their goal.
+        """
+        direction_to_goal = (self.enemy_goal - self.ball_location).normalized()
+        return self.direction_to_ball.dot(direction_to_goal)
@@ -1,6 +1,8 @@
+import ctypes
 import math
 from typing import Union
 
+import numpy as np
 from rlbot.utils.structures.game_data_struct import Vector3
 
 
@@ -33,11 +35,16 @@ class Vec3:
 
         """
 
-        if hasattr(x, 'x'):
+        if isinstance(x, (float, int)):
+            # The common case, checked first because it's the cheapest
+            self.x = float(x)
+            self.y = float(y)
+            self.z = float(z)
+        elif hasattr(x, 'x'):
             # We have been given a vector. Copy it
             self.x = float(x.x)
-            self.y = float(x.y) if hasattr(x, 'y') else 0
-            self.z = float(x.z) if hasattr(x, 'z') else 0
+            self.y = float(getattr(x, 'y', 0))
+            self.z = float(getattr(x, 'z', 0))
         else:
             self.x = float(x)
             self.y = float(y)
@@ -107,3 +114,162 @@ class Vec3:
         """Returns the angle to the ideal vector. Angle will be between 0 and pi."""
         cos_ang = self.dot(ideal) / (self.length() * ideal.length())
         return math.acos(cos_ang)
+
+
+class Vec3Batch:
+    """
+    A batch of N vectors stored as one N×3 NumPy array, with the same methods as Vec3. Use it when you need to do
+    the same math for every car, boost pad or ball prediction slice: one call on the batch replaces a Python loop
+    that would create a new Vec3 for every entity.
+
+    Methods that return a number per vector (length, dot, dist, ang_to) return a NumPy array of shape (N,).
+    The other operand can be another Vec3Batch of the same size, a single Vec3 (applied to every vector),
+    or anything NumPy can broadcast against an N×3 array.
+
+    To read vectors straight out of the packet without copying, use from_ctypes:
+    `car_locations = Vec3Batch.from_ctypes(packet.game_cars, packet.num_cars, 'physics.location')`.
+    """
+    __slots__ = [
+        'data'
+    ]
+
+    def __init__(self, data):
+        """
+        Create a new Vec3Batch from an N×3 array-like, or from a list of Vec3 / flatbuffer vectors. Examples:
+
+        a = Vec3Batch([[1, 2, 3], [4, 5, 6]])
+
+        b = Vec3Batch([Vec3(1, 2, 3), car.physics.location])
+
+        """
+        if isinstance(data, Vec3Batch):
+            data = data.data
+        elif not isinstance(data, np.ndarray) and len(data) > 0 and hasattr(data[0], 'x'):
+            data = [(v.x, v.y, v.z) for v in data]
+        self.data = np.asarray(data, dtype=float).reshape(-1, 3)
+
+    @classmethod
+    def from_ctypes(cls, array, count: int, field: str = None) -> 'Vec3Batch':
+        """
+        Wraps the first `count` elements of a ctypes array without copying. `field` is a dotted path to a Vector3
+        inside each element, e.g. 'physics.location' for packet.game_cars. Leave it out for an array of Vector3.
+        The batch reads the packet memory directly, so it changes when the packet is overwritten.
+        """
+        element_type = array._type_
+        offset = 0
+        field_type = element_type
+        if field is not None:
+            for name in field.split('.'):
+                offset += getattr(field_type, name).offset
+                field_type = dict(field_type._fields_)[name]
+        raw = np.frombuffer(array, dtype=np.uint8)
+        view = np.ndarray((count, 3), dtype=np.float32, buffer=raw, offset=offset,
+                          strides=(ctypes.sizeof(element_type), 4))
+        batch = cls.__new__(cls)
+        batch.data = view
+        return batch
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.data[:, 1]
+
+    @property
+    def z(self) -> np.ndarray:
+        return self.data[:, 2]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, item) -> Union[Vec3, 'Vec3Batch']:
+        """An integer index returns a single Vec3, anything else (slices, masks, index arrays) returns a Vec3Batch."""
+        if isinstance(item, (int, np.integer)):
+            return Vec3(*self.data[item])
+        return Vec3Batch(self.data[item])
+
+    def __iter__(self):
+        return (Vec3(*row) for row in self.data)
+
+    def __add__(self, other) -> 'Vec3Batch':
+        return Vec3Batch(self.data + _as_array(other))
+
+    def __sub__(self, other) -> 'Vec3Batch':
+        return Vec3Batch(self.data - _as_array(other))
+
+    def __neg__(self):
+        return Vec3Batch(-self.data)
+
+    def __mul__(self, scale) -> 'Vec3Batch':
+        """Scale by a number, or by an array with one number per vector."""
+        return Vec3Batch(self.data * _as_scale(scale))
+
+    def __rmul__(self, scale):
+        return self * scale
+
+    def __truediv__(self, scale) -> 'Vec3Batch':
+        return Vec3Batch(self.data / _as_scale(scale))
+
+    def __str__(self):
+        return f"Vec3Batch({len(self)} vectors)"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def flat(self) -> 'Vec3Batch':
+        """Returns a new Vec3Batch with every vector projected onto the ground plane. I.e. where z=0."""
+        data = self.data.copy()
+        data[:, 2] = 0
+        return Vec3Batch(data)
+
+    def length(self) -> np.ndarray:
+        """Returns the length of each vector."""
+        return np.sqrt(np.einsum('ij,ij->i', self.data, self.data))
+
+    def dist(self, other) -> np.ndarray:
+        """Returns the distance between each vector and the other vector(s)."""
+        return (self - other).length()
+
+    def normalized(self) -> 'Vec3Batch':
+        """Returns vectors with the same directions but a length of one."""
+        return self / self.length()
+
+    def rescale(self, new_len) -> 'Vec3Batch':
+        """Returns vectors with the same directions but different lengths."""
+        return self.normalized() * new_len
+
+    def dot(self, other) -> np.ndarray:
+        """Returns the dot product of each vector with the other vector(s)."""
+        other = _as_array(other)
+        if other.ndim == 1:
+            return self.data @ other
+        return np.einsum('ij,ij->i', self.data, other)
+
+    def cross(self, other) -> 'Vec3Batch':
+        """Returns the cross product of each vector with the other vector(s)."""
+        return Vec3Batch(np.cross(self.data, _as_array(other)))
+
+    def ang_to(self, ideal) -> np.ndarray:
+        """Returns the angle from each vector to the ideal vector(s). Angles will be between 0 and pi."""
+        ideal_length = np.linalg.norm(_as_array(ideal), axis=-1)
+        cos_ang = self.dot(ideal) / (self.length() * ideal_length)
+        return np.arccos(np.clip(cos_ang, -1, 1))
+
+
+def _as_array(other) -> np.ndarray:
+    if isinstance(other, Vec3Batch):
+        return other.data
+    if isinstance(other, Vec3):
+        return np.array((other.x, other.y, other.z))
+    if hasattr(other, 'x'):
+        return np.array((other.x, other.y, other.z), dtype=float)
+    return np.asarray(other, dtype=float)
+
+
+def _as_scale(scale) -> Union[float, np.ndarray]:
+    # Per-vector scales need an extra axis to broadcast across x, y and z.
+    if isinstance(scale, np.ndarray) and scale.ndim == 1:
+        return scale[:, np.newaxis]
+    return scale
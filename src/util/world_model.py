@@ -0,0 +1,117 @@
+import threading
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from rlbot.utils.structures.ball_prediction_struct import BallPrediction
+from rlbot.utils.structures.game_data_struct import GameTickPacket, FieldInfoPacket
+
+from util.ball_prediction_analysis import PredictionArray
+from util.boost_pad_tracker import BoostPadTracker
+from util.goal_prediction import GoalPredictor
+from util.orientation import OrientationCache
+from util.packet_snapshot import PacketSnapshot
+from util.possession import PossessionTracker
+from util.threat_map import ThreatMap
+from util.vec import Vec3, Vec3Batch
+
+
+class WorldModel:
+    """
+    Everything about the game that doesn't depend on which bot is asking: boost pad state, the ball prediction and
+    the goal it predicts, car orientations, who has possession of the ball, which team gets where first (the threat
+    map) and the locations and velocities of every car and the ball.
+
+    When several bots run in the same process (e.g. a whole team hosted together, or the ReplayPlayer),
+    they can share one WorldModel from get_world_model(). Every bot calls update() with its packet, but only
+    the first call for a frame does the work; the others see that the frame is already done and return right away.
+
+    The model is updated in place, so the bots sharing it have to take turns on one thread, the way the ReplayPlayer
+    and the simulated training backend run them: a bot on another thread could see the next frame halfway through
+    its tick. update() raises a RuntimeError when it's called from a second thread; give bots on their own threads
+    their own model with get_world_model(key). Bots in separate processes, the framework's default, each have their
+    own model too. Nothing is shared between processes.
+    """
+
+    def __init__(self):
+        self.snapshot = PacketSnapshot()
+        self.boost_pad_tracker = BoostPadTracker()
+        self.ball_prediction = PredictionArray()
+        self.goal_predictor = GoalPredictor()
+        self.orientations = OrientationCache()
+        self.possession = PossessionTracker()
+        self.threat_map = ThreatMap()
+        self.car_locations = Vec3Batch(np.zeros((0, 3)))
+        self.car_velocities = Vec3Batch(np.zeros((0, 3)))
+        self.ball_location = Vec3()
+        self.ball_velocity = Vec3()
+        self.game_time = 0.0
+        self.updates_computed = 0
+        self._frame = None
+        self._thread: Optional[int] = None  # The thread that updates the model, see the class docstring
+
+    def initialize(self, field_info: FieldInfoPacket):
+        """
+        Call this from initialize_agent, and whenever a new match starts in the same process. It forgets everything
+        about the last match. Every bot sharing the model may call it, that's harmless at startup.
+        """
+        # Everything that keeps state from frame to frame starts over here.
+        self.boost_pad_tracker.initialize_boosts(field_info)
+        self.orientations.reset()
+        self.possession.reset()
+        self.threat_map.reset()
+        self.goal_predictor.reset()
+        self.car_locations = Vec3Batch(np.zeros((0, 3)))
+        self.car_velocities = Vec3Batch(np.zeros((0, 3)))
+        self.ball_location = Vec3()
+        self.ball_velocity = Vec3()
+        self.game_time = 0.0
+        self._frame = None
+        self.snapshot.frame = None
+
+    def update(self, packet: GameTickPacket, get_ball_prediction: Callable[[], BallPrediction]) -> bool:
+        """
+        Brings the model up to date with the packet. get_ball_prediction is only called if this is the first
+        update for the frame, so pass the bot's get_ball_prediction_struct method rather than its result.
+        Returns True if this call did the work.
+        """
+        thread = threading.get_ident()
+        if thread != self._thread:
+            if self._thread is not None:
+                raise RuntimeError('A WorldModel is updated in place and can only be used from one thread. '
+                                   'Give bots on other threads their own, e.g. with get_world_model(key)')
+            self._thread = thread
+        frame = (packet.game_info.frame_num, packet.game_info.seconds_elapsed)
+        if frame == self._frame:
+            return False
+        # A copy of the packet, because each bot's packet is overwritten by its own bot manager.
+        snapshot = self.snapshot
+        snapshot.update(packet)
+        self.game_time = snapshot.game_time
+        self.boost_pad_tracker.update_boost_status(packet, snapshot)
+        self.ball_prediction.update(get_ball_prediction())
+        self.goal_predictor.update(self.ball_prediction, self.game_time)
+        self.car_locations = Vec3Batch(snapshot.car_locations[:snapshot.num_cars])
+        self.car_velocities = Vec3Batch(snapshot.car_velocities[:snapshot.num_cars])
+        self.ball_location = snapshot.ball_location()
+        self.ball_velocity = snapshot.ball_velocity()
+        self.possession.update(packet, snapshot)
+        self.threat_map.update(packet, self.orientations, snapshot)
+        self.updates_computed += 1
+        self._frame = frame
+        return True
+
+
+_world_models: Dict[str, WorldModel] = {}
+_world_models_lock = threading.Lock()
+
+
+def get_world_model(key: str = 'default') -> WorldModel:
+    """
+    Returns the WorldModel shared by every bot in this process that asks for the same key. Use different keys
+    if one process runs several independent matches.
+    """
+    with _world_models_lock:
+        model = _world_models.get(key)
+        if model is None:
+            model = _world_models[key] = WorldModel()
+        return model
@@ -0,0 +1,258 @@
+"""
+Graders for running many exercise instances side by side, e.g. hundreds of seeded variations in the simulated
+backend. The state of every instance is gathered into a BatchState once per tick, and every condition is an array
+predicate over all instances (and all cars) at once:
+
+    grader = BatchGrader(pass_when=[CarNearBall(200)], fail_when=[Timeout(4)])
+    grades = grader.grade(state)    # One entry per instance, None while it's still running
+
+A BatchGrader can also stand in for an ordinary Grader through VectorizedGrader, so the same conditions work in the
+game with a batch of one.
+"""
+
+import ctypes
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+from rlbot.training.training import Grade, Pass, Fail
+from rlbot.utils.structures.game_data_struct import GameTickPacket, PlayerInfo, TeamInfo, MAX_PLAYERS
+from rlbottraining.grading.grader import Grader
+from rlbottraining.grading.training_tick_packet import TrainingTickPacket
+
+SRC = Path(__file__).absolute().parent.parent / 'src'
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from util.ball_prediction_analysis import GOAL_THRESHOLD
+from util.packet_snapshot import struct_dtype
+
+
+_CAR_DTYPE = struct_dtype(PlayerInfo, {'location': ('physics.location', ('<f4', 3))})
+_TEAM_DTYPE = struct_dtype(TeamInfo, {'score': ('score', '<i4')})
+_PACKET_DTYPE = struct_dtype(GameTickPacket, {
+    'cars': ('game_cars', (_CAR_DTYPE, MAX_PLAYERS)),
+    'num_cars': ('num_cars', '<i4'),
+    'seconds_elapsed': ('game_info.seconds_elapsed', '<f4'),
+    'ball_location': ('game_ball.physics.location', ('<f4', 3)),
+    'ball_velocity': ('game_ball.physics.velocity', ('<f4', 3)),
+    'teams': ('teams', (_TEAM_DTYPE, 2)),
+})
+
+
+class BatchState:
+    """
+    The parts of the packets of N exercise instances that conditions look at, as arrays with one row per instance.
+    Car locations are (N, cars, 3), with as many car slots as the biggest instance has. Slots without a car are NaN,
+    so no comparison on them is ever true.
+
+    Reading from a list of packets touches every packet in Python. If the instances write their packets into one
+    array from packet_array() instead, update() reads all of them with a handful of strided NumPy copies.
+    """
+
+    def __init__(self, count: int):
+        self.count = count
+        self.elapsed = np.zeros(count)  # Seconds since the instance started
+        self.car_locations = np.zeros((count, 0, 3))
+        self.ball_location = np.zeros((count, 3))
+        self.ball_velocity = np.zeros((count, 3))
+        self.scores = np.zeros((count, 2), dtype=int)  # Goals per team since the instance started
+        self._start_times = np.full(count, np.nan)
+        self._start_scores = np.zeros((count, 2), dtype=int)
+        self._records = np.zeros(count, dtype=[(name, _PACKET_DTYPE.fields[name][0]) for name in _PACKET_DTYPE.names])
+
+    @staticmethod
+    def packet_array(count: int) -> ctypes.Array:
+        """Room for the packets of count instances, next to each other in memory. Index it to get each packet."""
+        return (GameTickPacket * count)()
+
+    def update(self, packets: Union[ctypes.Array, Sequence[GameTickPacket]]):
+        """
+        Reads the latest packet of every instance. The first update after a (re)start marks the start of an instance,
+        for timeouts and for counting goals.
+        """
+        if isinstance(packets, ctypes.Array):
+            records = np.frombuffer(packets, dtype=_PACKET_DTYPE)
+        else:
+            records = self._records
+            for i, packet in enumerate(packets):
+                record = np.frombuffer(packet, dtype=_PACKET_DTYPE, count=1)[0]
+                for name in _PACKET_DTYPE.names:
+                    records[name][i] = record[name]
+
+        seconds = records['seconds_elapsed'].astype(float)
+        num_cars = records['num_cars']
+        # Only copy as many car slots as the biggest match uses.
+        car_slots = int(num_cars.max(initial=0))
+        has_car = np.arange(car_slots) < num_cars[:, np.newaxis]
+        self.car_locations = np.where(has_car[..., np.newaxis], records['cars']['location'][:, :car_slots], np.nan)
+        self.ball_location = records['ball_location'].astype(float)
+        self.ball_velocity = records['ball_velocity'].astype(float)
+        # The game lists the teams in order, blue then orange.
+        scores = records['teams']['score']
+
+        starting = np.isnan(self._start_times)
+        self._start_times[starting] = seconds[starting]
+        self._start_scores[starting] = scores[starting]
+        self.elapsed = seconds - self._start_times
+        self.scores = scores - self._start_scores
+
+    def restart(self, instances: Optional[np.ndarray] = None):
+        """The given instances, or all of them, start over at the next update."""
+        self._start_times[slice(None) if instances is None else instances] = np.nan
+
+
+class Condition:
+    """A predicate on a BatchState, true for the instances where it holds."""
+
+    def evaluate(self, state: BatchState) -> np.ndarray:
+        raise NotImplementedError()
+
+
+@dataclass
+class CarNearBall(Condition):
+    """A car is within max_distance of the ball. car_index None means any car. Like PassOnNearBall,
+    the distance ignores height unless horizontal is False."""
+    max_distance: float = 200
+    car_index: Optional[int] = 0
+    horizontal: bool = True
+
+    def evaluate(self, state: BatchState) -> np.ndarray:
+        cars = state.car_locations
+        if self.car_index is not None:
+            cars = cars[:, self.car_index:self.car_index + 1]
+        offsets = cars - state.ball_location[:, np.newaxis]
+        if self.horizontal:
+            offsets = offsets[..., :2]
+        # Comparing squared distances saves the square root, and NaN slots compare False.
+        near = (offsets ** 2).sum(axis=-1) <= self.max_distance ** 2
+        return near.any(axis=1)
+
+
+@dataclass
+class Timeout(Condition):
+    seconds: float
+
+    def evaluate(self, state: BatchState) -> np.ndarray:
+        return state.elapsed > self.seconds
+
+
+@dataclass
+class BallInGoal(Condition):
+    """The ball is inside the goal that team defends: blue (0) defends negative y, orange (1) positive y."""
+    team: int
+    goal_threshold: float = GOAL_THRESHOLD
+
+    def evaluate(self, state: BatchState) -> np.ndarray:
+        y = state.ball_location[:, 1]
+        return y <= -self.goal_threshold if self.team == 0 else y >= self.goal_threshold
+
+
+@dataclass
+class GoalScored(Condition):
+    """team scored since the instance started."""
+    team: int
+
+    def evaluate(self, state: BatchState) -> np.ndarray:
+        return state.scores[:, self.team] > 0
+
+
+@dataclass
+class BallHeight(Condition):
+    """The ball's center is between min_height and max_height. Leave either out for no limit on that side."""
+    min_height: Optional[float] = None
+    max_height: Optional[float] = None
+
+    def evaluate(self, state: BatchState) -> np.ndarray:
+        z = state.ball_location[:, 2]
+        result = np.ones(state.count, dtype=bool)
+        if self.min_height is not None:
+            result &= z >= self.min_height
+        if self.max_height is not None:
+            result &= z <= self.max_height
+        return result
+
+
+class ConditionPass(Pass):
+    def __init__(self, condition: Condition):
+        self.condition = condition
+
+    def __repr__(self):
+        return f'{super().__repr__()}: {self.condition}'
+
+
+class ConditionFail(Fail):
+    def __init__(self, condition: Condition):
+        self.condition = condition
+
+    def __repr__(self):
+        return f'{super().__repr__()}: {self.condition}'
+
+
+class BatchGrader:
+    """
+    Grades N instances at once. An instance fails as soon as any fail_when condition holds, otherwise it passes as soon
+    as any pass_when condition holds; like CompoundGrader, a Fail wins over a Pass on the same tick, and earlier
+    conditions win over later ones. Once an instance has a grade it keeps it.
+    """
+
+    def __init__(self, pass_when: List[Condition] = (), fail_when: List[Condition] = ()):
+        self.conditions: List[Condition] = list(fail_when) + list(pass_when)
+        self.num_fail_conditions = len(fail_when)
+        # Index into conditions of the condition that decided each instance, -1 while it's running.
+        self.decided_by: Optional[np.ndarray] = None
+
+    def reset(self, count: int):
+        self.decided_by = np.full(count, -1)
+
+    @property
+    def finished(self) -> np.ndarray:
+        return self.decided_by >= 0
+
+    def evaluate(self, state: BatchState) -> np.ndarray:
+        """Updates the grades with the state and returns the indices of the instances that finished on this tick."""
+        if self.decided_by is None or len(self.decided_by) != state.count:
+            self.reset(state.count)
+        if not self.conditions:
+            return np.zeros(0, dtype=int)
+        # (conditions, instances). The first true condition of an instance decides it; fail conditions come first.
+        holds = np.stack([condition.evaluate(state) for condition in self.conditions])
+        decided = holds.any(axis=0) & (self.decided_by < 0)
+        newly_finished = np.flatnonzero(decided)
+        self.decided_by[newly_finished] = holds[:, newly_finished].argmax(axis=0)
+        return newly_finished
+
+    def grade_of(self, instance: int) -> Optional[Grade]:
+        decided_by = self.decided_by[instance]
+        if decided_by < 0:
+            return None
+        condition = self.conditions[decided_by]
+        return ConditionFail(condition) if decided_by < self.num_fail_conditions else ConditionPass(condition)
+
+    def grade(self, state: BatchState) -> List[Optional[Grade]]:
+        """Updates the grades with the state and returns the grade of every instance, None while it's running."""
+        self.evaluate(state)
+        return [self.grade_of(i) for i in range(state.count)]
+
+
+class VectorizedGrader(Grader):
+    """Runs a BatchGrader as an ordinary rlbottraining Grader, for a single exercise in the game."""
+
+    def __init__(self, batch_grader: BatchGrader):
+        self.batch_grader = batch_grader
+        self.state = BatchState(1)
+
+    def on_tick(self, tick: TrainingTickPacket) -> Optional[Grade]:
+        self.state.update([tick.game_tick_packet])
+        self.batch_grader.evaluate(self.state)
+        return self.batch_grader.grade_of(0)
+
+
+def make_drive_to_ball_grader(timeout_seconds=4.0, min_dist_to_pass=200) -> BatchGrader:
+    """
+    The same checks as drive_to_ball_grader.DriveToBallGrader, for grading many exercise instances at once, e.g. with
+    SimulatedBackend.run_batch.
+    """
+    return BatchGrader(pass_when=[CarNearBall(min_dist_to_pass)], fail_when=[Timeout(timeout_seconds)])
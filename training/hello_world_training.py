@@ -45,6 +45,9 @@ class StrikerPatience(StrikerExercise):
     """
 
     car_start_x: float = 0
+    # Whether the ball lands on the car's hood or in front of it decides this exercise. The simulated backend's car
+    # model is too rough to tell, so only the game can grade it.
+    needs_game = True
 
     def make_game_state(self, rng: SeededRandomNumberGenerator) -> GameState:
         return GameState(
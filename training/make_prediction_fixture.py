@@ -0,0 +1,107 @@
+"""
+Writes training/ball_prediction.npz, the ball predictions util_unit_tests.py checks the ball simulator against.
+
+The fixture holds half a second windows of ball prediction in which the ball flies clear of the floor, walls and
+ceiling, the only place the simulator should be as good as the game's own physics. To take them from the game,
+record a replay with record_replay_file while the ball flies around and pass it here:
+
+    python training/make_prediction_fixture.py my_recording.rlbr
+
+Without a recording it writes reference windows from a fine grained integration of gravity and drag instead, which
+only checks the simulator's stepping, not its constants. The committed fixture is of that kind until someone records
+one from the game.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from random import Random
+from typing import Iterator, Tuple
+
+import numpy as np
+
+SRC = Path(__file__).absolute().parent.parent / 'src'
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from util.ball_prediction_analysis import PredictionArray
+from util.ball_sim import DRAG, GRAVITY, SLICE_DT
+from util.replay import Replay
+
+FIXTURE = Path(__file__).absolute().parent / 'ball_prediction.npz'
+WINDOW_SLICES = 31
+# Only compare a recorded prediction every half second, so the windows don't overlap.
+WINDOW_SPACING = 30
+
+Window = Tuple[float, np.ndarray, np.ndarray]
+
+
+def is_clear(location: np.ndarray) -> bool:
+    """Whether the ball stays well away from the floor, walls and ceiling at every one of the locations."""
+    return (location[:, 2].min() >= 300 and location[:, 2].max() <= 1700
+            and np.abs(location[:, 0]).max() <= 3500 and np.abs(location[:, 1]).max() <= 4500)
+
+
+def recorded_windows(path: Path) -> Iterator[Window]:
+    """The start time, locations and velocities of every clear window in the ball predictions of a recording."""
+    for _, ball_prediction in Replay.load(path).ticks[::WINDOW_SPACING]:
+        if ball_prediction.num_slices < WINDOW_SLICES:
+            continue
+        prediction = PredictionArray(ball_prediction)
+        location = prediction.location[:WINDOW_SLICES]
+        if is_clear(location):
+            yield float(prediction.game_seconds[0]), location.copy(), prediction.velocity[:WINDOW_SLICES].copy()
+
+
+def reference_windows(count: int, seed: int = 0) -> Iterator[Window]:
+    """Clear windows integrated with 100 RK4 steps per slice from random start states."""
+    rng = Random(seed)
+    gravity = np.array([0, 0, GRAVITY])
+
+    def acceleration(velocity: np.ndarray) -> np.ndarray:
+        return gravity - DRAG * velocity
+
+    dt = SLICE_DT / 100
+    found = 0
+    while found < count:
+        location = np.array([rng.uniform(-2500, 2500), rng.uniform(-3500, 3500), rng.uniform(600, 1400)])
+        velocity = np.array([rng.uniform(-1500, 1500), rng.uniform(-1500, 1500), rng.uniform(-600, 900)])
+        locations, velocities = [location], [velocity]
+        for step in range(1, (WINDOW_SLICES - 1) * 100 + 1):
+            k1x, k1v = velocity, acceleration(velocity)
+            k2x, k2v = velocity + dt / 2 * k1v, acceleration(velocity + dt / 2 * k1v)
+            k3x, k3v = velocity + dt / 2 * k2v, acceleration(velocity + dt / 2 * k2v)
+            k4x, k4v = velocity + dt * k3v, acceleration(velocity + dt * k3v)
+            location = location + dt / 6 * (k1x + 2 * k2x + 2 * k3x + k4x)
+            velocity = velocity + dt / 6 * (k1v + 2 * k2v + 2 * k3v + k4v)
+            if step % 100 == 0:
+                locations.append(location)
+                velocities.append(velocity)
+        locations, velocities = np.array(locations), np.array(velocities)
+        if is_clear(locations):
+            found += 1
+            yield 100 + found * WINDOW_SPACING * SLICE_DT, locations, velocities
+
+
+def save(windows: Iterator[Window], path: Path = FIXTURE) -> int:
+    """Saves the windows as a compressed npz file and returns how many there were."""
+    windows = list(windows)
+    if not windows:
+        raise ValueError('None of the predictions stay clear of the floor, walls and ceiling for half a second')
+    start_times, locations, velocities = zip(*windows)
+    np.savez_compressed(path, start_time=np.array(start_times), location=np.array(locations, dtype=np.float32),
+                        velocity=np.array(velocities, dtype=np.float32))
+    return len(windows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording', nargs='?', type=Path, help='a replay recorded with record_replay_file')
+    parser.add_argument('--output', type=Path, default=FIXTURE)
+    args = parser.parse_args()
+    windows = recorded_windows(args.recording) if args.recording else reference_windows(8)
+    print(f'Saved {save(windows, args.output)} windows to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Runs the exercises of a playlist in several worker processes at once and collects their grades and timings.
+
+Every worker gets its own environment from an ExerciseBackend, runs its share of the exercises, and sends the
+results back. Each exercise is seeded from the playlist seed and its position in the playlist, never from which
+worker ran it, so a playlist gives the same grades however it is sharded:
+
+    python training/parallel_runner.py training/hello_world_training.py --workers 4
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from random import Random
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from rlbot.training.training import Grade, Pass, Fail, FailDueToExerciseException
+from rlbottraining.exercise_runner import run_playlist, load_default_playlist, RenderPolicy
+from rlbottraining.history.exercise_result import ExerciseResult, ReproductionInfo
+from rlbottraining.rng import SeededRandomNumberGenerator
+from rlbottraining.training_exercise import TrainingExercise, Playlist
+
+
+class NotGraded(Fail):
+    """
+    The backend can't grade the exercise, e.g. because it doesn't model what the exercise is about. It's a Fail,
+    since every grade has to be a Pass or a Fail, but the PlaylistReport doesn't count it as one.
+    """
+
+
+class ExerciseBackend:
+    """
+    An environment that exercises can run in. Every worker process enters its own backend once and runs all of its
+    exercises in it, one after another.
+    """
+
+    # How many copies of the environment can exist at once. None means no limit.
+    max_workers: Optional[int] = None
+
+    def __enter__(self) -> 'ExerciseBackend':
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def run_exercise(self, exercise: TrainingExercise, seed: int) -> Grade:
+        raise NotImplementedError()
+
+
+class GameBackend(ExerciseBackend):
+    """Runs exercises in Rocket League, like rlbottraining's run_playlist. There's only one game per machine."""
+
+    max_workers = 1
+
+    def __init__(self, render_policy: RenderPolicy = RenderPolicy.DEFAULT):
+        self.render_policy = render_policy
+        self._context = None
+        self.setup_manager = None
+
+    def __enter__(self) -> 'GameBackend':
+        from rlbot.setup_manager import setup_manager_context
+        self._context = setup_manager_context()
+        self.setup_manager = self._context.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._context.__exit__(*exc_info)
+
+    def run_exercise(self, exercise: TrainingExercise, seed: int) -> Grade:
+        result, = run_playlist([exercise], seed, self.setup_manager, self.render_policy)
+        return result.grade
+
+
+@dataclass
+class TimedResult:
+    result: ExerciseResult
+    seconds: float  # Wall time it took to run the exercise
+    worker: int  # Which worker ran it, 0 to workers - 1
+
+
+@dataclass
+class PlaylistReport:
+    results: List[TimedResult]  # In playlist order
+    wall_seconds: float
+    workers: int
+
+    @property
+    def passed(self) -> List[TimedResult]:
+        return [r for r in self.results if isinstance(r.result.grade, Pass)]
+
+    @property
+    def failed(self) -> List[TimedResult]:
+        return [r for r in self.results if not isinstance(r.result.grade, (Pass, NotGraded))]
+
+    @property
+    def ungraded(self) -> List[TimedResult]:
+        return [r for r in self.results if isinstance(r.result.grade, NotGraded)]
+
+    def format(self) -> str:
+        lines = [f'{r.result.exercise.name:<40} {r.seconds:>7.2f}s  worker {r.worker}  '
+                 f'{_grade_summary(r.result.grade)}' for r in self.results]
+        seconds = [r.seconds for r in self.results]
+        total = sum(seconds)
+        ungraded = f', {len(self.ungraded)} not graded' if self.ungraded else ''
+        lines.append(f'{len(self.passed)} passed, {len(self.failed)} failed{ungraded} in {self.wall_seconds:.2f}s '
+                     f'with {self.workers} worker(s)')
+        if seconds:
+            lines.append(f'exercise time: total {total:.2f}s, mean {statistics.mean(seconds):.2f}s, '
+                         f'median {statistics.median(seconds):.2f}s, max {max(seconds):.2f}s, '
+                         f'speedup {total / max(self.wall_seconds, 1e-9):.1f}x')
+        return '\n'.join(lines)
+
+
+def _grade_summary(grade: Grade) -> str:
+    # Exception grades carry a whole traceback, keep the table to one line per exercise.
+    if isinstance(grade, FailDueToExerciseException):
+        return f'FAIL: {grade.exception!r}'
+    return repr(grade).splitlines()[0]
+
+
+def exercise_seeds(seed: int, count: int) -> List[int]:
+    """The seed of every exercise in a playlist. It only depends on the playlist seed and the exercise's position."""
+    rng = SeededRandomNumberGenerator(Random(seed))
+    return [rng.getrandbits(32) for _ in range(count)]
+
+
+# (playlist index, exercise, seed)
+_Job = Tuple[int, TrainingExercise, int]
+
+
+def shard_jobs(exercises: Sequence[TrainingExercise], seeds: Sequence[int], workers: int) -> List[List[_Job]]:
+    """
+    Splits the exercises round robin across the workers, so exercises of the same kind, which tend to be next to
+    each other, are spread across workers.
+    """
+    return [[(i, exercises[i], seeds[i]) for i in range(w, len(exercises), workers)] for w in range(workers)]
+
+
+def _run_shard(backend_factory: Callable[[], ExerciseBackend], jobs: List[_Job], worker: int) -> List[TimedResult]:
+    results = []
+    with backend_factory() as backend:
+        for index, exercise, seed in jobs:
+            start = time.perf_counter()
+            try:
+                grade = backend.run_exercise(exercise, seed)
+            except Exception as e:
+                grade = FailDueToExerciseException(e, traceback.format_exc())
+            seconds = time.perf_counter() - start
+            result = ExerciseResult(grade=grade, exercise=exercise,
+                                    reproduction_info=ReproductionInfo(seed=seed, playlist_index=index))
+            results.append(TimedResult(result, seconds, worker))
+    return results
+
+
+def _init_worker(path: List[str]):
+    # Workers need to import the modules that define the exercises, wherever the parent found them.
+    sys.path[:] = path
+
+
+def run_playlist_parallel(playlist: Playlist, backend_factory: Callable[[], ExerciseBackend] = GameBackend,
+                          workers: int = 4, seed: int = 4, extra_paths: Sequence[str] = ()) -> PlaylistReport:
+    """
+    Runs every exercise once and returns the results in playlist order.
+
+    backend_factory is called once in every worker to create its environment, so it has to be picklable,
+    e.g. a class or a functools.partial. The number of workers is capped by the backend's max_workers.
+    With a single worker everything runs in this process.
+    Rerun a single result with: run_playlist([exercise], result.reproduction_info.seed)
+    """
+    exercises = list(playlist)
+    seeds = exercise_seeds(seed, len(exercises))
+    max_workers = getattr(backend_factory, 'max_workers', None)
+    workers = max(1, min(workers, len(exercises), max_workers or workers))
+    shards = shard_jobs(exercises, seeds, workers)
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = _run_shard(backend_factory, shards[0], 0) if exercises else []
+    else:
+        path = list(extra_paths) + sys.path
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(path,)) as executor:
+            futures = [executor.submit(_run_shard, backend_factory, shard, w) for w, shard in enumerate(shards)]
+            results = [result for future in futures for result in future.result()]
+    wall_seconds = time.perf_counter() - start
+
+    results.sort(key=lambda r: r.result.reproduction_info.playlist_index)
+    return PlaylistReport(results, wall_seconds, workers)
+
+
+if __name__ == '__main__':
+    # Run as a script, this module is __main__, but the backends import it as parallel_runner. Report with that copy,
+    # so its grade classes are the ones the backends use.
+    from parallel_runner import run_playlist_parallel
+    from simulated_backend import SimulatedBackend
+    BACKENDS = {
+        'game': GameBackend,
+        'simulated': SimulatedBackend,
+    }
+
+    parser = argparse.ArgumentParser(description='Run a playlist across several worker processes.')
+    parser.add_argument('playlist', help='Python file with a make_default_playlist() function')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=4)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='game')
+    args = parser.parse_args()
+
+    playlist_file = Path(args.playlist).absolute()
+    report = run_playlist_parallel(load_default_playlist(playlist_file)(), BACKENDS[args.backend],
+                                   workers=args.workers, seed=args.seed, extra_paths=[str(playlist_file.parent)])
+    print(report.format())
+    sys.exit(1 if report.failed else 0)
@@ -0,0 +1,481 @@
+"""
+A stand-in for Rocket League that runs training exercises without the game, much faster than real time.
+
+The exercise's make_game_state() sets up a SimulatedMatch, which steps a simplified car and ball model and writes
+the result into an ordinary GameTickPacket. The bots and the exercise's grader receive those packets exactly as
+they would from the game:
+
+    python training/parallel_runner.py training/hello_world_training.py --backend simulated --workers 8
+
+The car model only drives on the floor: throttle, boost, braking and turning at speed dependent curvature.
+Jumping, flipping and aerials aren't modelled, and the car hits the ball like a sphere. Grades from this backend
+are good for catching regressions quickly, not for judging how the bot will do in the real game. Exercises whose
+outcome hinges on what isn't modelled set needs_game = True, and this backend gives them a NotSimulated grade
+instead of a wrong one.
+"""
+
+import math
+import sys
+from pathlib import Path
+from random import Random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rlbot.agents.base_agent import BaseAgent, SimpleControllerState
+from rlbot.training.training import Grade, Fail
+from rlbot.utils.game_state_util import GameState
+from rlbot.utils.structures.ball_prediction_struct import BallPrediction, MAX_SLICES
+from rlbot.utils.structures.game_data_struct import GameTickPacket, FieldInfoPacket
+from rlbottraining.training_exercise import TrainingExercise
+from rlbottraining.training_exercise_adapter import TrainingExerciseAdapter
+
+from batch_grading import BatchGrader, BatchState
+from parallel_runner import ExerciseBackend, NotGraded
+
+SRC = Path(__file__).absolute().parent.parent / 'src'
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from util.ball_sim import Arena, BallSimulator, BallStates, BALL_RADIUS, MAX_SPEED as MAX_BALL_SPEED, STANDARD_ARENA
+from util.intercept import (BOOST_ACCELERATION, BOOST_PER_SECOND, CURVATURE_SPEEDS, CURVATURES, MAX_CAR_SPEED,
+                            throttle_acceleration)
+from util.replay import create_headless_agent
+from util.world_model import WorldModel
+
+TICK_RATE = 120
+TICK_DT = 1 / TICK_RATE
+START_TIME = 100  # seconds_elapsed of the first packet. Some code treats 0 as "no data yet".
+
+CAR_HEIGHT = 17  # Height of the center of a car resting on the floor
+BRAKE_ACCELERATION = 3500
+COAST_DECELERATION = 525
+# For hitting the ball, the car is a sphere of this radius around a point a little above its center.
+CAR_HIT_RADIUS = 70
+CAR_HIT_HEIGHT = 40
+# How much of the car's speed towards the ball ends up in the ball, on top of reflecting it.
+HIT_RESTITUTION = 0.5
+
+FULL_BOOST_AMOUNT = 100
+SMALL_BOOST_AMOUNT = 12
+FULL_BOOST_PICKUP_RADIUS = 208
+SMALL_BOOST_PICKUP_RADIUS = 144
+FULL_BOOST_RESPAWN_TIME = 10
+SMALL_BOOST_RESPAWN_TIME = 4
+
+# The ball is simulated this far ahead, so the ball prediction can be read from it for a while. It is simulated
+# at the prediction's 60 steps per second, and the ticks in between are interpolated.
+TRAJECTORY_SECONDS = 8
+TRAJECTORY_DT = 1 / 60
+# The framework's prediction is 6 seconds long, at 60 slices per second.
+PREDICTION_SLICES = MAX_SLICES
+_TICKS_PER_SLICE = round(TRAJECTORY_DT * TICK_RATE)
+
+# Where the standard soccar boost pads are, in the order the game lists them.
+FULL_BOOST_LOCATIONS = [(3584, 0), (-3584, 0), (3072, 4096), (-3072, 4096), (3072, -4096), (-3072, -4096)]
+SMALL_BOOST_LOCATIONS = [
+    (0, -4240), (-1792, -4184), (1792, -4184), (-940, -3308), (940, -3308), (0, -2816), (-3584, -2484),
+    (3584, -2484), (-1788, -2300), (1788, -2300), (-2048, -1036), (0, -1024), (2048, -1036), (-1024, 0), (1024, 0),
+    (-2048, 1036), (0, 1024), (2048, 1036), (-1788, 2300), (1788, 2300), (-3584, 2484), (3584, 2484), (0, 2816),
+    (-940, 3310), (940, 3308), (-1792, 4184), (1792, 4184), (0, 4240),
+]
+BOOST_PAD_LOCATIONS = sorted([(x, y, True) for x, y in FULL_BOOST_LOCATIONS] +
+                             [(x, y, False) for x, y in SMALL_BOOST_LOCATIONS], key=lambda pad: (pad[1], pad[0]))
+
+
+class SimulationTimeout(Fail):
+    def __init__(self, max_seconds: float):
+        self.max_seconds = max_seconds
+
+    def __repr__(self):
+        return f'{super().__repr__()}: The grader gave no grade within {self.max_seconds} simulated seconds.'
+
+
+class NotSimulated(NotGraded):
+    """The exercise needs the real game to be graded."""
+
+    def __repr__(self):
+        return 'NOT GRADED: The exercise needs the real game, the simulation can\'t grade it.'
+
+
+def needs_game(exercise: TrainingExercise) -> bool:
+    """Whether the exercise says its outcome hinges on physics the simulation doesn't model."""
+    return getattr(exercise, 'needs_game', False)
+
+
+class _Car:
+    __slots__ = ['x', 'y', 'yaw', 'speed', 'boost', 'team', 'name']
+
+    def __init__(self, team: int, name: str):
+        self.x = 0.0
+        self.y = -4608.0 if team == 0 else 4608.0
+        self.yaw = math.pi / 2 if team == 0 else -math.pi / 2
+        self.speed = 0.0
+        self.boost = 33.0
+        self.team = team
+        self.name = name
+
+
+def _value(value, default: float) -> float:
+    """GameState leaves out the values that shouldn't be changed."""
+    return default if value is None else float(value)
+
+
+class SimulatedMatch:
+    """
+    A match played out in a simplified physics model instead of the game. Call reset() with the state an exercise
+    wants, then step() with the controls of every car. packet always holds the current state of the match.
+    """
+
+    def __init__(self, arena: Arena = STANDARD_ARENA, packet: GameTickPacket = None):
+        """Pass a packet to have the match write into it, e.g. one element of BatchState.packet_array()."""
+        self.arena = arena
+        # The bots in this match share this WorldModel instead of the process wide one, so matches that run side by
+        # side in one process don't mix their trackers.
+        self.world = WorldModel()
+        self.ball_simulator = BallSimulator(arena, TRAJECTORY_DT)
+        self.packet = GameTickPacket() if packet is None else packet
+        self.field_info = FieldInfoPacket()
+        self.field_info.num_boosts = len(BOOST_PAD_LOCATIONS)
+        for i, (x, y, is_full_boost) in enumerate(BOOST_PAD_LOCATIONS):
+            pad = self.field_info.boost_pads[i]
+            pad.location.x, pad.location.y, pad.location.z = x, y, 73
+            pad.is_full_boost = is_full_boost
+        self._pad_locations = np.array([(x, y) for x, y, _ in BOOST_PAD_LOCATIONS], dtype=float)
+        self._pad_is_full = np.array([full for _, _, full in BOOST_PAD_LOCATIONS])
+        self._pad_radius_sq = np.where(self._pad_is_full, FULL_BOOST_PICKUP_RADIUS, SMALL_BOOST_PICKUP_RADIUS) ** 2
+        self._pad_respawn_times = np.zeros(len(BOOST_PAD_LOCATIONS))
+        self.cars: List[_Car] = []
+        self.time = START_TIME
+        self.tick = 0
+        self.frame_num = 0
+        self.scores = [0, 0]
+        self._ball_scored = 0
+        self._trajectory: Optional[np.ndarray] = None  # (slices, 7): location, velocity, scored
+        self._trajectory_start = 0  # The tick of the first slice
+        self._ball_prediction = BallPrediction()
+        self._prediction_tick = None
+
+    def reset(self, game_state: GameState, teams: List[int], names: List[str] = None):
+        """Starts over from the game state, with one car per entry in teams."""
+        self.time = START_TIME
+        self.tick = 0
+        self.scores = [0, 0]
+        self._ball_scored = 0
+        self.packet.game_ball.latest_touch = type(self.packet.game_ball.latest_touch)()
+        names = names or [f'car{i}' for i in range(len(teams))]
+        self.cars = [_Car(team, name) for team, name in zip(teams, names)]
+        for index, car_state in (game_state.cars or {}).items():
+            if index < len(self.cars):
+                self._set_car(self.cars[index], car_state)
+        self._pad_respawn_times[:] = 0
+        for index, boost_state in (game_state.boosts or {}).items():
+            self._pad_respawn_times[index] = self.time + _value(boost_state.respawn_time, 0)
+
+        location, velocity, angular_velocity = [0, 0, BALL_RADIUS], [0, 0, 0], [0, 0, 0]
+        physics = game_state.ball.physics if game_state.ball is not None else None
+        if physics is not None:
+            location = _vector(physics.location, location)
+            velocity = _vector(physics.velocity, velocity)
+            angular_velocity = _vector(physics.angular_velocity, angular_velocity)
+        self._simulate_ball(BallStates(location, velocity, angular_velocity))
+        self._write_packet()
+
+    @staticmethod
+    def _set_car(car: _Car, car_state):
+        physics = car_state.physics
+        if physics is not None:
+            if physics.location is not None:
+                car.x = _value(physics.location.x, car.x)
+                car.y = _value(physics.location.y, car.y)
+            if physics.rotation is not None:
+                car.yaw = _value(physics.rotation.yaw, car.yaw)
+            if physics.velocity is not None:
+                vx = _value(physics.velocity.x, 0)
+                vy = _value(physics.velocity.y, 0)
+                car.speed = vx * math.cos(car.yaw) + vy * math.sin(car.yaw)
+        car.boost = _value(car_state.boost_amount, car.boost)
+
+    def step(self, controls: Dict[int, Optional[SimpleControllerState]]):
+        """Moves the match forward by one tick. controls maps car indices to what those cars do."""
+        for index, car in enumerate(self.cars):
+            car_controls = controls.get(index)
+            if car_controls is not None:
+                self._drive(car, car_controls)
+        self.tick += 1
+        self.time = START_TIME + self.tick * TICK_DT
+        self._pick_up_boosts()
+        self._hit_ball()
+        self._write_packet()
+
+    def _drive(self, car: _Car, controls: SimpleControllerState):
+        throttle = max(-1.0, min(1.0, controls.throttle))
+        steer = max(-1.0, min(1.0, controls.steer))
+        speed = car.speed
+        if controls.boost and car.boost > 0:
+            acceleration = BOOST_ACCELERATION + throttle_acceleration(abs(speed))
+            car.boost = max(car.boost - BOOST_PER_SECOND * TICK_DT, 0)
+        elif throttle == 0:
+            acceleration = -math.copysign(min(COAST_DECELERATION, abs(speed) * TICK_RATE), speed)
+        elif speed * throttle < 0:
+            acceleration = math.copysign(BRAKE_ACCELERATION, throttle)
+        else:
+            acceleration = throttle * throttle_acceleration(abs(speed))
+        speed = max(-MAX_CAR_SPEED, min(MAX_CAR_SPEED, speed + acceleration * TICK_DT))
+        curvature = float(np.interp(abs(speed), CURVATURE_SPEEDS, CURVATURES))
+        car.yaw = (car.yaw + steer * curvature * speed * TICK_DT + math.pi) % (2 * math.pi) - math.pi
+        car.x += math.cos(car.yaw) * speed * TICK_DT
+        car.y += math.sin(car.yaw) * speed * TICK_DT
+        car.speed = speed
+        self._keep_in_arena(car)
+
+    def _keep_in_arena(self, car: _Car):
+        arena = self.arena
+        max_x = arena.half_width - CAR_HIT_RADIUS
+        max_y = arena.half_length - CAR_HIT_RADIUS
+        if abs(car.x) < arena.goal_half_width - CAR_HIT_RADIUS:
+            max_y += arena.goal_depth
+        if abs(car.x) > max_x or abs(car.y) > max_y:
+            car.x = max(-max_x, min(max_x, car.x))
+            car.y = max(-max_y, min(max_y, car.y))
+            car.speed = 0.0
+
+    def _pick_up_boosts(self):
+        if not self.cars:
+            return
+        car_locations = np.array([(car.x, car.y) for car in self.cars])
+        distance_sq = ((car_locations[:, np.newaxis] - self._pad_locations) ** 2).sum(axis=2)
+        active = self._pad_respawn_times <= self.time
+        touching = (distance_sq < self._pad_radius_sq) & active
+        if not touching.any():
+            return
+        for car_index, pad_index in zip(*np.nonzero(touching)):
+            car = self.cars[car_index]
+            if self._pad_respawn_times[pad_index] > self.time or car.boost >= 100:
+                continue
+            is_full = self._pad_is_full[pad_index]
+            car.boost = min(car.boost + (FULL_BOOST_AMOUNT if is_full else SMALL_BOOST_AMOUNT), 100)
+            respawn_time = FULL_BOOST_RESPAWN_TIME if is_full else SMALL_BOOST_RESPAWN_TIME
+            self._pad_respawn_times[pad_index] = self.time + respawn_time
+
+    def _ball_state(self) -> np.ndarray:
+        """Location, velocity and scored of the ball at the current tick."""
+        index, remainder = divmod(self.tick - self._trajectory_start, _TICKS_PER_SLICE)
+        if index + 1 >= len(self._trajectory) - PREDICTION_SLICES:
+            # Running out of trajectory for a full prediction, simulate some more.
+            state = self._trajectory[index]
+            balls = BallStates(state[0:3], state[3:6])
+            balls.scored[0] = state[6]
+            self._simulate_ball(balls, self.tick - remainder)
+            index = 0
+        state = self._trajectory[index]
+        if remainder == 0:
+            return state
+        blend = remainder / _TICKS_PER_SLICE
+        interpolated = state + (self._trajectory[index + 1] - state) * blend
+        interpolated[6] = state[6]
+        return interpolated
+
+    def _simulate_ball(self, balls: BallStates, start_tick: int = None):
+        """Simulates the ball ahead from start_tick, the current tick by default. Until something hits it,
+        that's where it will go."""
+        slices = int(TRAJECTORY_SECONDS / TRAJECTORY_DT)
+        trajectory = np.empty((slices, 7))
+        for i in range(slices):
+            trajectory[i, 0:3] = balls.location[0]
+            trajectory[i, 3:6] = balls.velocity[0]
+            trajectory[i, 6] = balls.scored[0]
+            self.ball_simulator.step(balls)
+        self._trajectory = trajectory
+        self._trajectory_start = self.tick if start_tick is None else start_tick
+        self._prediction_tick = None
+
+    def _hit_ball(self):
+        state = self._ball_state()
+        if state[6] != 0:
+            return
+        ball_location = state[0:3]
+        for index, car in enumerate(self.cars):
+            offset = ball_location - (car.x, car.y, CAR_HEIGHT + CAR_HIT_HEIGHT)
+            distance = np.linalg.norm(offset)
+            if distance > BALL_RADIUS + CAR_HIT_RADIUS or distance == 0:
+                continue
+            normal = offset / distance
+            car_velocity = np.array((math.cos(car.yaw) * car.speed, math.sin(car.yaw) * car.speed, 0))
+            approach_speed = np.dot(car_velocity - state[3:6], normal)
+            if approach_speed <= 0:
+                continue
+            velocity = state[3:6] + normal * approach_speed * (1 + HIT_RESTITUTION)
+            speed = np.linalg.norm(velocity)
+            if speed > MAX_BALL_SPEED:
+                velocity *= MAX_BALL_SPEED / speed
+            self._simulate_ball(BallStates(ball_location, velocity))
+            touch = self.packet.game_ball.latest_touch
+            touch.player_name = car.name
+            touch.time_seconds = self.time
+            touch.hit_location.x, touch.hit_location.y, touch.hit_location.z = ball_location - normal * BALL_RADIUS
+            touch.hit_normal.x, touch.hit_normal.y, touch.hit_normal.z = normal
+            touch.team = car.team
+            touch.player_index = index
+            return
+
+    def _write_packet(self):
+        packet = self.packet
+        self.frame_num += 1
+        info = packet.game_info
+        info.seconds_elapsed = self.time
+        info.game_time_remaining = 300
+        info.is_unlimited_time = True
+        info.is_round_active = True
+        info.is_kickoff_pause = False
+        info.world_gravity_z = -650
+        info.game_speed = 1
+        info.frame_num = self.frame_num
+
+        packet.num_cars = len(self.cars)
+        for i, car in enumerate(self.cars):
+            player = packet.game_cars[i]
+            physics = player.physics
+            physics.location.x, physics.location.y, physics.location.z = car.x, car.y, CAR_HEIGHT
+            physics.rotation.pitch, physics.rotation.yaw, physics.rotation.roll = 0, car.yaw, 0
+            physics.velocity.x = math.cos(car.yaw) * car.speed
+            physics.velocity.y = math.sin(car.yaw) * car.speed
+            physics.velocity.z = 0
+            player.has_wheel_contact = True
+            player.is_super_sonic = abs(car.speed) >= 2200
+            player.is_bot = True
+            player.name = car.name
+            player.team = car.team
+            player.boost = int(car.boost)
+
+        state = self._ball_state()
+        ball = packet.game_ball.physics
+        ball.location.x, ball.location.y, ball.location.z = state[0:3]
+        ball.velocity.x, ball.velocity.y, ball.velocity.z = state[3:6]
+        scored = int(state[6])
+        if scored != self._ball_scored:
+            # The ball just went in. A ball in the orange goal (positive y) is a goal for blue.
+            self.scores[0 if scored > 0 else 1] += 1
+            self._ball_scored = scored
+
+        packet.num_boost = len(BOOST_PAD_LOCATIONS)
+        for i, respawn_time in enumerate(self._pad_respawn_times):
+            pad = packet.game_boosts[i]
+            pad.is_active = respawn_time <= self.time
+            duration = FULL_BOOST_RESPAWN_TIME if self._pad_is_full[i] else SMALL_BOOST_RESPAWN_TIME
+            pad.timer = 0 if pad.is_active else max(duration - (respawn_time - self.time), 0)
+
+        packet.num_teams = 2
+        for team in range(2):
+            packet.teams[team].team_index = team
+            packet.teams[team].score = self.scores[team]
+
+    def get_ball_prediction(self) -> BallPrediction:
+        """The next 6 seconds of the ball, read straight from the simulated trajectory."""
+        if self._prediction_tick != self.tick:
+            self._ball_state()  # Make sure there's enough trajectory left.
+            start = (self.tick - self._trajectory_start) // _TICKS_PER_SLICE
+            states = self._trajectory[start:start + PREDICTION_SLICES]
+            start_time = START_TIME + (self._trajectory_start + start * _TICKS_PER_SLICE) * TICK_DT
+            slices = np.frombuffer(self._ball_prediction.slices, dtype=np.float32).reshape(MAX_SLICES, -1)
+            slices[:] = 0
+            slices[:len(states), 0:3] = states[:, 0:3]
+            slices[:len(states), 6:9] = states[:, 3:6]
+            slices[:len(states), 12] = start_time + np.arange(len(states)) * TRAJECTORY_DT
+            self._ball_prediction.num_slices = len(states)
+            self._prediction_tick = self.tick
+        return self._ball_prediction
+
+
+def _vector(vector, default: List[float]) -> List[float]:
+    if vector is None:
+        return default
+    return [_value(vector.x, default[0]), _value(vector.y, default[1]), _value(vector.z, default[2])]
+
+
+class SimulatedBackend(ExerciseBackend):
+    """
+    Runs exercises in a SimulatedMatch. Every player in the exercise's match config is played by agent_class,
+    MyBot by default, with the Bot Parameters from the player's config file. There's no limit on workers.
+    """
+
+    def __init__(self, agent_class=None, max_seconds: float = 60):
+        self.agent_class = agent_class
+        self.max_seconds = max_seconds
+        self.match = SimulatedMatch()
+
+    def __enter__(self) -> 'SimulatedBackend':
+        if self.agent_class is None:
+            from bot import MyBot
+            self.agent_class = MyBot
+        return self
+
+    def _start(self, match: SimulatedMatch, exercise: TrainingExercise,
+               seed: int) -> Tuple[TrainingExerciseAdapter, List[BaseAgent], Optional[Grade]]:
+        """
+        Sets up the match for the exercise and creates its bots. Returns a grade if the exercise can't be simulated
+        or the briefing already gave one.
+        """
+        adapter = TrainingExerciseAdapter(exercise)
+        if needs_game(exercise):
+            return adapter, [], NotSimulated()
+        early_grade = adapter.on_briefing()
+        if early_grade is not None:
+            return adapter, [], early_grade
+
+        # Seeded the same way as rlbot's run_exercises, so the game state matches what the game would get.
+        game_state = adapter.setup(Random(seed))
+        player_configs = exercise.match_config.player_configs
+        names = [config.name or f'bot{i}' for i, config in enumerate(player_configs)]
+        match.reset(game_state, [int(config.team) for config in player_configs], names)
+        agents = [
+            create_headless_agent(self.agent_class, names[i], int(config.team), i, lambda: match.field_info,
+                                  match.get_ball_prediction, config.config_path, match.world)
+            for i, config in enumerate(player_configs)
+        ]
+        return adapter, agents, None
+
+    def run_exercise(self, exercise: TrainingExercise, seed: int) -> Grade:
+        adapter, agents, grade = self._start(self.match, exercise, seed)
+        try:
+            while grade is None and self.match.time - START_TIME <= self.max_seconds:
+                grade = adapter.on_tick(self.match.packet)
+                if grade is None:
+                    self.match.step({agent.index: agent.get_output(self.match.packet) for agent in agents})
+            return grade or SimulationTimeout(self.max_seconds)
+        finally:
+            for agent in agents:
+                agent.retire()
+
+    def run_batch(self, exercises: Sequence[TrainingExercise], seeds: Sequence[int],
+                  grader: BatchGrader) -> List[Grade]:
+        """
+        Runs all the exercises side by side, each in its own SimulatedMatch, and grades them all at once every tick
+        with the BatchGrader instead of their own graders. Returns the grade of every exercise.
+        """
+        # All the packets live in one array, so the BatchState can read them without a Python loop.
+        packets = BatchState.packet_array(len(exercises))
+        matches = [SimulatedMatch(self.match.arena, packets[i]) for i in range(len(exercises))]
+        starts = [self._start(match, exercise, seed) for match, exercise, seed in zip(matches, exercises, seeds)]
+        agents = [instance_agents for _, instance_agents, _ in starts]
+        # Exercises that can't be simulated or were graded at the briefing aren't played at all.
+        early_grades = [early_grade for _, _, early_grade in starts]
+        state = BatchState(len(exercises))
+        grader.reset(len(exercises))
+        running = [i for i in range(len(exercises)) if early_grades[i] is None]
+        try:
+            while running and matches[running[0]].time - START_TIME <= self.max_seconds:
+                state.update(packets)
+                for i in grader.evaluate(state):
+                    for agent in agents[i]:
+                        agent.retire()
+                    agents[i] = []
+                running = [i for i in running if not grader.finished[i]]
+                for i in running:
+                    match = matches[i]
+                    match.step({agent.index: agent.get_output(match.packet) for agent in agents[i]})
+            return [early_grades[i] or grader.grade_of(i) or SimulationTimeout(self.max_seconds)
+                    for i in range(len(exercises))]
+        finally:
+            for instance_agents in agents:
+                for agent in instance_agents:
+                    agent.retire()
@@ -0,0 +1,1438 @@
+"""
+Unit tests for the numeric helpers in src/util. Unlike unit_tests.py they don't need the game, so they run anywhere:
+
+    cd training
+    python util_unit_tests.py
+
+The ball simulator is checked against the predictions in training/ball_prediction.npz. To check it against the
+game's own ball prediction, record a replay and turn it into that file with make_prediction_fixture.py.
+"""
+
+import math
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from random import Random
+from typing import Callable
+from unittest import mock
+
+import numpy as np
+from rlbot.agents.base_agent import SimpleControllerState
+from rlbot.training.training import Grade, Pass
+from rlbot.utils.game_state_util import BallState, BoostState, CarState, GameState, Physics, Vector3
+from rlbot.utils.structures.ball_prediction_struct import BallPrediction
+from rlbot.utils.structures.game_data_struct import (FieldInfoPacket, GameTickPacket, Rotator, MAX_BOOSTS,
+                                                     MAX_PLAYERS)
+
+SRC = Path(__file__).absolute().parent.parent / 'src'
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from batch_grading import (BallHeight, BallInGoal, BatchGrader, BatchState, CarNearBall, ConditionFail, ConditionPass,
+                           GoalScored, Timeout, make_drive_to_ball_grader)
+from hello_world_training import StrikerPatience
+from parallel_runner import ExerciseBackend, NotGraded, exercise_seeds, run_playlist_parallel, shard_jobs
+from simulated_backend import (BOOST_PAD_LOCATIONS, FULL_BOOST_RESPAWN_TIME as SIMULATED_FULL_BOOST_RESPAWN_TIME,
+                               START_TIME, TICK_RATE, NotSimulated, SimulatedBackend, SimulatedMatch)
+from util.ball_prediction_analysis import (GOAL_THRESHOLD, PredictionArray, find_first, find_matching_slice,
+                                          predict_future_goal)
+from util.ball_sim import BALL_RADIUS, DRAG, GRAVITY, SLICE_DT, STANDARD_ARENA, BallSimulator, BallStates
+from util.boost_pad_index import BoostPadIndex
+from util.boost_pad_tracker import FULL_BOOST_RESPAWN_TIME, SMALL_BOOST_RESPAWN_TIME, BoostPadTracker
+from util.goal_prediction import GoalPredictor
+from util.intercept import (CONTACT_DISTANCE, MAX_CAR_SPEED, find_intercept, path_lengths, reachable_distances,
+                            turn_radius)
+from util.kickoff import MIRRORED_SPAWNS, SPAWN_TOLERANCE, SPAWN_YAWS, SPAWNS, KickoffPlaybook, identify_spawn
+from util.orientation import Orientation, OrientationCache, relative_location, rotation_matrices
+from util.packet_snapshot import PacketSnapshot
+from util.path_planner import SAMPLE_SPACING, plan_path
+from util.planner_worker import PlannerWorker
+from util.possession import PossessionTracker
+from util.profiler import TickProfiler
+from util.render_queue import NullRenderer, RenderQueue
+from util.replay import Replay, ReplayPlayer, ReplayRecorder, recording_path
+from util.sequence import ControlStep, Maneuver, ManeuverPlayer
+from util.state_machine import State, StateMachine, UndeclaredInputError
+from util.threat_map import ThreatMap
+from util.tick_context import LazyInputs, lazy
+from util.vec import Vec3, Vec3Batch
+from util.world_model import WorldModel, get_world_model
+
+PREDICTION_FIXTURE = Path(__file__).absolute().parent / 'ball_prediction.npz'
+
+
+def _distance_sq(a: Vec3, b: Vec3) -> float:
+    return (a - b).dot(a - b)
+
+
+def _prediction(locations: np.ndarray, velocities: np.ndarray, game_time: float = 100) -> PredictionArray:
+    """A ball prediction with the given locations and velocities, one slice per row."""
+    prediction = BallPrediction()
+    prediction.num_slices = len(locations)
+    for i, (location, velocity) in enumerate(zip(locations.tolist(), velocities.tolist())):
+        ball_slice = prediction.slices[i]
+        ball_slice.game_seconds = game_time + i * SLICE_DT
+        ball_slice.physics.location.x, ball_slice.physics.location.y, ball_slice.physics.location.z = location
+        ball_slice.physics.velocity.x, ball_slice.physics.velocity.y, ball_slice.physics.velocity.z = velocity
+    return PredictionArray(prediction)
+
+
+class Vec3BatchTest(unittest.TestCase):
+    """Every method has to give what the same Vec3 method gives for each vector."""
+
+    def setUp(self):
+        rng = Random(3)
+        self.a = [Vec3(rng.uniform(-5000, 5000), rng.uniform(-5000, 5000), rng.uniform(-2000, 2000)) for _ in range(50)]
+        self.b = [Vec3(rng.uniform(-5000, 5000), rng.uniform(-5000, 5000), rng.uniform(-2000, 2000)) for _ in range(50)]
+        self.batch_a, self.batch_b = Vec3Batch(self.a), Vec3Batch(self.b)
+
+    def test_numbers(self):
+        for method in ('dist', 'dot', 'ang_to'):
+            expected = [getattr(a, method)(b) for a, b in zip(self.a, self.b)]
+            np.testing.assert_allclose(getattr(self.batch_a, method)(self.batch_b), expected, rtol=1e-9, err_msg=method)
+            # A single Vec3 goes with every vector of the batch.
+            expected = [getattr(a, method)(self.b[0]) for a in self.a]
+            np.testing.assert_allclose(getattr(self.batch_a, method)(self.b[0]), expected, rtol=1e-9, err_msg=method)
+        np.testing.assert_allclose(self.batch_a.length(), [a.length() for a in self.a])
+
+    def test_vectors(self):
+        cross = self.batch_a.cross(self.batch_b)
+        self.assertIsInstance(cross, Vec3Batch)
+        for a, b, c in zip(self.a, self.b, cross):
+            expected = a.cross(b)
+            np.testing.assert_allclose([c.x, c.y, c.z], [expected.x, expected.y, expected.z], rtol=1e-9)
+        sums = (self.batch_a + self.b[0]).flat()
+        for a, c in zip(self.a, sums):
+            expected = (a + self.b[0]).flat()
+            self.assertEqual((c.x, c.y, c.z), (expected.x, expected.y, expected.z))
+        np.testing.assert_allclose(self.batch_a.normalized().length(), 1)
+
+    def test_from_ctypes(self):
+        packet = GameTickPacket()
+        packet.num_cars = 3
+        for i, car in enumerate(packet.game_cars[:3]):
+            car.physics.location.x, car.physics.location.y, car.physics.location.z = i, 10 * i, 100 * i
+        locations = Vec3Batch.from_ctypes(packet.game_cars, packet.num_cars, 'physics.location')
+        self.assertEqual(locations.data.tolist(), [[0, 0, 0], [1, 10, 100], [2, 20, 200]])
+        expected = [Vec3(car.physics.location).dist(Vec3(0, 5, 0)) for car in packet.game_cars[:3]]
+        np.testing.assert_allclose(locations.dist(Vec3(0, 5, 0)), expected, rtol=1e-6)
+        # It reads the packet's memory, so it follows the packet.
+        packet.game_cars[1].physics.location.z = 50
+        self.assertEqual(locations[1].z, 50)
+
+
+class OrientationTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = Random(4)
+        self.rotations = [Rotator(rng.uniform(-math.pi / 2, math.pi / 2), rng.uniform(-math.pi, math.pi),
+                                  rng.uniform(-math.pi, math.pi)) for _ in range(20)]
+        self.center = Vec3(100, -2000, 17)
+        self.targets = Vec3Batch([[rng.uniform(-4000, 4000), rng.uniform(-5000, 5000), rng.uniform(0, 2000)]
+                                  for _ in range(30)])
+
+    def test_to_local_matches_relative_location(self):
+        for rotation in self.rotations:
+            orientation = Orientation(rotation)
+            local = orientation.to_local(self.center, self.targets)
+            for target, batch_local in zip(self.targets, local):
+                expected = relative_location(self.center, orientation, target)
+                np.testing.assert_allclose([batch_local.x, batch_local.y, batch_local.z],
+                                           [expected.x, expected.y, expected.z], atol=1e-6)
+
+    def test_rotation_matrices(self):
+        pitch, yaw, roll = (np.array([getattr(r, name) for r in self.rotations]) for name in ('pitch', 'yaw', 'roll'))
+        matrices = rotation_matrices(pitch, yaw, roll)
+        self.assertEqual(matrices.shape, (20, 3, 3))
+        for rotation, matrix in zip(self.rotations, matrices):
+            orientation = Orientation(rotation)
+            np.testing.assert_allclose(matrix, orientation.matrix, atol=1e-12)
+            offset = self.targets[0] - self.center
+            expected = relative_location(self.center, orientation, self.targets[0])
+            np.testing.assert_allclose(matrix @ [offset.x, offset.y, offset.z], [expected.x, expected.y, expected.z],
+                                       atol=1e-6)
+
+    def test_cache_is_keyed_by_frame(self):
+        packet = _packet([0, 1], 10)
+        packet.game_info.frame_num = 100
+        cache = OrientationCache()
+        first = cache.get(packet, 0)
+        self.assertIs(cache.get(packet, 0), first)
+        self.assertIsNot(cache.get(packet, 1), first)
+        # A new frame, even with the same frame number but another game time as in a new match, starts over.
+        packet.game_cars[0].physics.rotation.yaw = 1
+        packet.game_info.seconds_elapsed = 3
+        second = cache.get(packet, 0)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.yaw, 1)
+        packet.game_info.frame_num = 101
+        self.assertIsNot(cache.get(packet, 0), second)
+        third = cache.get(packet, 0)
+        cache.reset()
+        self.assertIsNot(cache.get(packet, 0), third)
+
+
+ROTATOR_NAMES = ('pitch', 'yaw', 'roll')
+
+
+def _xyz(vector: Vec3) -> list:
+    return [vector.x, vector.y, vector.z]
+
+
+class PacketSnapshotTest(unittest.TestCase):
+    """Every field of the snapshot has to read what ctypes reads from the same packet."""
+
+    def setUp(self):
+        # Quarters are exact in float32, so the values compare equal.
+        rng = Random(6)
+        self.value = lambda: rng.randint(-20000, 20000) / 4
+        self.packet = GameTickPacket()
+
+    def fill_vector(self, vector, names=('x', 'y', 'z')) -> list:
+        values = [self.value() for _ in names]
+        for name, value in zip(names, values):
+            setattr(vector, name, value)
+        return values
+
+    def test_cars(self):
+        self.packet.num_cars = MAX_PLAYERS
+        expected = []
+        for car in self.packet.game_cars:
+            physics = car.physics
+            expected.append((self.fill_vector(physics.location), self.fill_vector(physics.rotation, ROTATOR_NAMES),
+                             self.fill_vector(physics.velocity), self.fill_vector(physics.angular_velocity)))
+        last = self.packet.game_cars[MAX_PLAYERS - 1]
+        last.is_demolished = last.has_wheel_contact = last.is_super_sonic = last.jumped = last.double_jumped = True
+        last.team, last.boost = 1, 57
+        snapshot = PacketSnapshot()
+        snapshot.read(self.packet)
+        self.assertEqual(snapshot.num_cars, MAX_PLAYERS)
+        for i, (location, rotation, velocity, angular_velocity) in enumerate(expected):
+            self.assertEqual(_xyz(snapshot.car_location(i)), location)
+            self.assertEqual(list(snapshot.car_rotation(i)), rotation)
+            self.assertEqual(_xyz(snapshot.car_velocity(i)), velocity)
+            self.assertEqual(snapshot.cars[i]['angular_velocity'].tolist(), angular_velocity)
+        flags = ('is_demolished', 'has_wheel_contact', 'is_super_sonic', 'jumped', 'double_jumped')
+        self.assertEqual([bool(snapshot.cars[MAX_PLAYERS - 1][flag]) for flag in flags], [True] * 5)
+        self.assertEqual([bool(snapshot.cars[0][flag]) for flag in flags], [False] * 5)
+        self.assertEqual(snapshot.cars['team'].tolist(), [0] * (MAX_PLAYERS - 1) + [1])
+        self.assertEqual(snapshot.cars['boost'].tolist(), [0] * (MAX_PLAYERS - 1) + [57])
+
+    def test_ball_boosts_and_game_info(self):
+        packet = self.packet
+        physics = packet.game_ball.physics
+        ball = [self.fill_vector(physics.location), self.fill_vector(physics.rotation, ROTATOR_NAMES),
+                self.fill_vector(physics.velocity), self.fill_vector(physics.angular_velocity)]
+        touch = packet.game_ball.latest_touch
+        touch.time_seconds, touch.player_index, touch.team = 12.5, 3, 1
+        packet.num_boost = MAX_BOOSTS
+        timers = [self.value() for _ in range(MAX_BOOSTS)]
+        for i, timer in enumerate(timers):
+            packet.game_boosts[i].is_active = i % 3 == 0
+            packet.game_boosts[i].timer = timer
+        info = packet.game_info
+        info.seconds_elapsed, info.game_time_remaining, info.world_gravity_z, info.game_speed = 321.25, 60.5, -650, 1.5
+        info.is_overtime = info.is_round_active = info.is_kickoff_pause = info.is_match_ended = True
+        info.frame_num = 4321
+        packet.teams[0].score, packet.teams[1].score = 2, 5
+
+        snapshot = PacketSnapshot()
+        snapshot.read(packet)
+        names = ('ball_location', 'ball_rotation', 'ball_velocity', 'ball_angular_velocity')
+        self.assertEqual([snapshot.record[name].tolist() for name in names], ball)
+        self.assertEqual((snapshot['touch_time'], snapshot['touch_index'], snapshot['touch_team']), (12.5, 3, 1))
+        self.assertEqual(snapshot.num_boost, MAX_BOOSTS)
+        self.assertEqual(snapshot.boosts['is_active'].tolist(), [i % 3 == 0 for i in range(MAX_BOOSTS)])
+        self.assertEqual(snapshot.boosts['timer'].tolist(), timers)
+        self.assertEqual((snapshot.game_time, snapshot['game_time_remaining'], snapshot['world_gravity_z'],
+                          snapshot['game_speed']), (321.25, 60.5, -650, 1.5))
+        for flag in ('is_overtime', 'is_round_active', 'is_kickoff_pause', 'is_match_ended'):
+            self.assertIs(snapshot[flag], True)
+        self.assertEqual(snapshot.frame, (4321, 321.25))
+        self.assertEqual(snapshot.scores.tolist(), [2, 5])
+
+    def test_update_only_copies_new_frames(self):
+        snapshot = PacketSnapshot()
+        self.packet.game_info.seconds_elapsed = 10
+        self.assertTrue(snapshot.update(self.packet))
+        self.packet.game_ball.physics.location.x = 100
+        self.assertFalse(snapshot.update(self.packet))
+        self.assertEqual(snapshot.ball_location().x, 0)
+        self.packet.game_info.frame_num = 1
+        self.assertTrue(snapshot.update(self.packet))
+        self.assertEqual(snapshot.ball_location().x, 100)
+
+    def test_orientations_from_a_snapshot(self):
+        self.packet.num_cars = 2
+        self.fill_vector(self.packet.game_cars[1].physics.rotation, ROTATOR_NAMES)
+        snapshot = PacketSnapshot()
+        snapshot.read(self.packet)
+        from_snapshot = OrientationCache().get(snapshot, 1)
+        from_packet = OrientationCache().get(self.packet, 1)
+        self.assertEqual(_xyz(from_snapshot.forward), _xyz(from_packet.forward))
+        self.assertEqual(_xyz(from_snapshot.up), _xyz(from_packet.up))
+
+
+class PredictionArrayTest(unittest.TestCase):
+
+    def setUp(self):
+        # A ball bouncing towards the orange goal, so it goes below any height a few times.
+        t = np.arange(360) * SLICE_DT
+        self.z = BALL_RADIUS + 400 * np.abs(np.sin(3 * t))
+        self.locations = np.stack((np.zeros(360), 1000 * t, self.z), axis=1)
+        self.prediction = _prediction(self.locations, np.zeros((360, 3)), game_time=10)
+
+    def test_columns_match_the_slices(self):
+        prediction = self.prediction
+        self.assertEqual(len(prediction), 360)
+        for index in (0, 1, 179, 359):
+            ball_slice = prediction.slice(index)
+            self.assertEqual(prediction.game_seconds[index], ball_slice.game_seconds)
+            self.assertEqual(prediction.physics.location.y[index], ball_slice.physics.location.y)
+            self.assertEqual(prediction.location[index].tolist(), [ball_slice.physics.location.x,
+                                                                   ball_slice.physics.location.y,
+                                                                   ball_slice.physics.location.z])
+        self.assertEqual(prediction.index_at_time(12), 120)
+        self.assertIsNone(prediction.index_at_time(9))
+
+    def test_copy_and_view(self):
+        ball_prediction = self.prediction.ball_prediction
+        copy = self.prediction.copy()
+        view = PredictionArray.view(ball_prediction)
+        np.testing.assert_array_equal(view.location, self.prediction.location)
+        ball_prediction.slices[5].physics.location.z = -1
+        # The copies keep the old value, the view sees the struct change.
+        self.assertNotEqual(self.prediction.location[5, 2], -1)
+        self.assertNotEqual(copy.location[5, 2], -1)
+        self.assertEqual(view.location[5, 2], -1)
+        with self.assertRaises(ValueError):
+            view.location[0, 0] = 1
+
+    def assertSlice(self, ball_slice, index):
+        if index is None:
+            self.assertIsNone(ball_slice)
+        else:
+            self.assertAlmostEqual(ball_slice.game_seconds, self.prediction.game_seconds[index])
+
+    def test_find_matching_slice(self):
+        # The ball only moves forward, so skipping ahead can't jump over the first slice past a line.
+        y = self.locations[:, 1]
+        for line in (0.5, 1000, 1234, 5999, 10000):
+            for start_index in (0, 7, 100):
+                expected = next((i for i in range(start_index, 360) if y[i] >= line), None)
+                for increment in (1, 5, 20):
+                    ball_slice = find_matching_slice(self.prediction, start_index,
+                                                     lambda s: s.physics.location.y >= line, increment)
+                    self.assertSlice(ball_slice, expected)
+
+    def test_find_first(self):
+        # The bounces are shorter than a coarse step, so they need every slice checked.
+        for height in (BALL_RADIUS + 1, 200, 350, 1000, 0):
+            for start_index in (0, 7, 100):
+                expected = next((i for i in range(start_index, 360) if self.z[i] < height), None)
+                self.assertSlice(find_first(self.prediction, lambda p: p.physics.location.z < height, start_index),
+                                 expected)
+                self.assertSlice(find_matching_slice(self.prediction, start_index,
+                                                     lambda s: s.physics.location.z < height), expected)
+
+    def test_backtrack_includes_the_coarse_slice(self):
+        # Only slice 20 matches, and it's the coarse slice itself.
+        predicate = lambda s: abs(s.game_seconds - 10 - 20 * SLICE_DT) < SLICE_DT / 2
+        self.assertSlice(find_matching_slice(self.prediction, 0, predicate, search_increment=20), 20)
+
+    def test_predicate_only_sees_slices(self):
+        seen = set()
+        find_matching_slice(self.prediction.ball_prediction, 0, lambda s: seen.add(type(s).__name__))
+        find_matching_slice(self.prediction, 0, lambda s: seen.add(type(s).__name__))
+        self.assertEqual(seen, {'Slice'})
+        with self.assertRaises(ValueError):
+            find_first(self.prediction, lambda p: p.physics.location.z[:10] < 100)
+
+    def test_predict_future_goal(self):
+        # The ball crosses the goal line about 5.2 seconds in, the first slice past GOAL_THRESHOLD is the goal.
+        expected = int(np.argmax(self.locations[:, 1] >= GOAL_THRESHOLD))
+        self.assertSlice(predict_future_goal(self.prediction), expected)
+        self.assertSlice(predict_future_goal(self.prediction.ball_prediction), expected)
+        slow = _prediction(self.locations * [1, 0.5, 1], np.zeros((360, 3)))
+        self.assertIsNone(predict_future_goal(slow))
+
+
+class GoalPredictorTest(unittest.TestCase):
+
+    def test_agrees_with_predict_future_goal(self):
+        # A ball rolling towards the orange goal that gets touched twice: first it nearly stops, then it heads for
+        # the blue goal, which only comes into the prediction after a while. The predictions start one or two slices
+        # apart, so the predictor has to shift its reference, and search the whole prediction again after the
+        # touches and once the reference is mostly in the past.
+        rng = Random(4)
+        predictor = GoalPredictor()
+        location, velocity = np.array([300, 2500, BALL_RADIUS]), np.array([0, 1500, 0])
+        game_time = 100
+        goals = set()
+        for update in range(150):
+            if update == 30:
+                velocity = np.array([0, -100, 0])
+            elif update == 60:
+                velocity = np.array([0, -2500, 0])
+            t = np.arange(120)[:, np.newaxis] * SLICE_DT
+            prediction = _prediction(location + velocity * t, np.tile(velocity, (120, 1)), game_time)
+            threat = predictor.update(prediction)
+            expected = predict_future_goal(prediction)
+            if expected is None:
+                self.assertIsNone(threat, update)
+            else:
+                self.assertIsNotNone(threat, update)
+                self.assertEqual(threat.game_time, expected.game_seconds, update)
+                self.assertEqual(threat.team, int(expected.physics.location.y > 0), update)
+                self.assertEqual(_xyz(threat.location), _xyz(expected.physics.location), update)
+                goals.add(threat.team)
+            slices = rng.choice((1, 2))
+            location = location + velocity * slices * SLICE_DT
+            game_time += slices * SLICE_DT
+        self.assertEqual(goals, {0, 1})
+        self.assertGreater(predictor.full_searches, 3)
+        self.assertLess(predictor.full_searches, 10)
+
+
+class KickoffSpawnTest(unittest.TestCase):
+
+    def test_every_spawn_of_both_teams(self):
+        rng = Random(2)
+        for name, (x, y) in SPAWNS.items():
+            for _ in range(50):
+                dx, dy = rng.uniform(-SPAWN_TOLERANCE, SPAWN_TOLERANCE), rng.uniform(-SPAWN_TOLERANCE, SPAWN_TOLERANCE)
+                self.assertEqual(identify_spawn(Vec3(x + dx, y + dy), 0), name)
+                # Orange's spawns are blue's rotated half a turn.
+                self.assertEqual(identify_spawn(Vec3(-x - dx, -y - dy), 1), name)
+            # The other team's spawn at the same place isn't one.
+            self.assertIsNone(identify_spawn(Vec3(x, y), 1))
+            self.assertIsNone(identify_spawn(Vec3(-x, -y), 0))
+
+    def test_mirrored_spawns(self):
+        for name, mirrored in MIRRORED_SPAWNS.items():
+            x, y = SPAWNS[name]
+            self.assertEqual(SPAWNS[mirrored], (-x, y))
+            self.assertAlmostEqual(SPAWN_YAWS[mirrored], math.pi - SPAWN_YAWS[name])
+            self.assertEqual(identify_spawn(Vec3(-x, y), 0), mirrored)
+            self.assertEqual(identify_spawn(Vec3(x, -y), 1), mirrored)
+
+    def test_away_from_the_spawns(self):
+        self.assertIsNone(identify_spawn(Vec3(0, 0), 0))
+        self.assertIsNone(identify_spawn(Vec3(1000, -2560), 0))
+        x, y = SPAWNS['center']
+        # The grid is coarse, but no further off than one cell beyond the tolerance.
+        self.assertIsNone(identify_spawn(Vec3(x + SPAWN_TOLERANCE + 100, y), 0))
+        self.assertIsNone(identify_spawn(Vec3(x, y - SPAWN_TOLERANCE - 100), 0))
+
+    def test_routine_for(self):
+        routine = Maneuver('left', [(0.5, SimpleControllerState(throttle=1))])
+        playbook = KickoffPlaybook({'left': routine})
+        self.assertIs(playbook.routine_for(Vec3(-2048, 2560), 1), routine)
+        self.assertIsNone(playbook.routine_for(Vec3(2048, 2560), 1))
+        self.assertIsNone(playbook.routine_for(Vec3(0, 0), 0))
+
+
+class BoostPadIndexTest(unittest.TestCase):
+    """The k-d tree has to give the same answers as looking at every pad."""
+
+    def setUp(self):
+        self.rng = Random(0)
+        self.pads = [Vec3(x, y, 73) for x, y, _ in BOOST_PAD_LOCATIONS]
+        self.is_full = [full for _, _, full in BOOST_PAD_LOCATIONS]
+        self.index = BoostPadIndex(self.pads, self.is_full)
+
+    def random_point(self) -> Vec3:
+        return Vec3(self.rng.uniform(-4500, 4500), self.rng.uniform(-5500, 5500), self.rng.uniform(0, 300))
+
+    def random_mask(self) -> int:
+        return self.rng.getrandbits(len(self.pads))
+
+    def brute_force(self, point: Vec3, mask: int):
+        """Indices of the pads in the mask, closest first."""
+        wanted = [i for i in range(len(self.pads)) if mask >> i & 1]
+        return sorted(wanted, key=lambda i: _distance_sq(self.pads[i], point))
+
+    def test_has_every_pad(self):
+        self.assertEqual(len(self.index), 34)
+        self.assertEqual(self.index.all_mask, (1 << 34) - 1)
+        self.assertEqual(bin(self.index.full_boost_mask).count('1'), 6)
+
+    def test_nearest(self):
+        for _ in range(500):
+            point = self.random_point()
+            self.assertEqual(self.index.nearest(point), self.brute_force(point, self.index.all_mask)[0])
+
+    def test_nearest_in_mask(self):
+        for _ in range(500):
+            point, mask = self.random_point(), self.random_mask()
+            expected = self.brute_force(point, mask)
+            self.assertEqual(self.index.nearest(point, mask), expected[0] if expected else None)
+
+    def test_nearest_full_boost(self):
+        for _ in range(200):
+            point, mask = self.random_point(), self.random_mask()
+            expected = self.brute_force(point, mask & self.index.full_boost_mask)
+            nearest = self.index.nearest_full_boost(point, mask)
+            self.assertEqual(nearest, expected[0] if expected else None)
+            if nearest is not None:
+                self.assertTrue(self.is_full[nearest])
+
+    def test_k_nearest(self):
+        for k in (0, 1, 3, 10, 40):
+            for _ in range(100):
+                point, mask = self.random_point(), self.random_mask()
+                self.assertEqual(self.index.k_nearest(point, k, mask), self.brute_force(point, mask)[:k])
+
+    def test_empty_mask(self):
+        self.assertIsNone(self.index.nearest(Vec3(), 0))
+        self.assertEqual(self.index.k_nearest(Vec3(), 5, 0), [])
+        self.assertEqual(self.index.within_distance_of_segment(Vec3(-4000, 0, 0), Vec3(4000, 0, 0), 500, 0), [])
+
+    def test_within_distance_of_segment(self):
+        for _ in range(300):
+            start, end, mask = self.random_point(), self.random_point(), self.random_mask()
+            distance = self.rng.uniform(0, 1500)
+            direction = end - start
+            expected = []
+            for i, pad in enumerate(self.pads):
+                t = max(0.0, min(1.0, (pad - start).dot(direction) / direction.dot(direction)))
+                if mask >> i & 1 and _distance_sq(pad, start + direction * t) <= distance ** 2:
+                    expected.append(i)
+            found = self.index.within_distance_of_segment(start, end, distance, mask)
+            self.assertEqual(sorted(found), expected)
+
+    def test_point_segment(self):
+        # A segment of length zero is the distance to a point.
+        pad = self.pads[5]
+        self.assertIn(5, self.index.within_distance_of_segment(pad, pad, 1))
+
+
+class BoostPadTrackerTest(unittest.TestCase):
+
+    def setUp(self):
+        field_info = FieldInfoPacket()
+        field_info.num_boosts = len(BOOST_PAD_LOCATIONS)
+        for pad, (x, y, full) in zip(field_info.boost_pads, BOOST_PAD_LOCATIONS):
+            pad.location.x, pad.location.y, pad.location.z = x, y, 73
+            pad.is_full_boost = full
+        self.tracker = BoostPadTracker()
+        self.tracker.initialize_boosts(field_info)
+        self.full = next(i for i, (_, _, full) in enumerate(BOOST_PAD_LOCATIONS) if full)
+        self.small = next(i for i, (_, _, full) in enumerate(BOOST_PAD_LOCATIONS) if not full)
+        self.packet = GameTickPacket()
+        self.packet.num_boost = len(BOOST_PAD_LOCATIONS)
+        for pad in self.packet.game_boosts[:self.packet.num_boost]:
+            pad.is_active = True
+        self.events = []
+        self.tracker.subscribe(self.events.append)
+
+    def tick(self, game_time: float):
+        self.packet.game_info.seconds_elapsed = game_time
+        self.tracker.update_boost_status(self.packet)
+
+    def test_no_events_on_the_first_packet(self):
+        self.packet.game_boosts[self.full].is_active = False
+        self.packet.game_boosts[self.full].timer = 3
+        self.tick(10)
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.tracker.events, [])
+        # The state is still read: the pad is inactive, and the packet says it has been for 3 seconds.
+        pad = self.tracker.boost_pads[self.full]
+        self.assertFalse(pad.is_active)
+        self.assertEqual(self.tracker.active_mask, self.tracker.index.all_mask & ~(1 << self.full))
+        self.assertAlmostEqual(pad.timer, 3)
+        self.assertAlmostEqual(self.tracker.time_until_respawn(self.full, 10), FULL_BOOST_RESPAWN_TIME - 3)
+
+    def test_pickups_and_respawns(self):
+        self.tick(10)
+        self.packet.game_boosts[self.small].is_active = False
+        self.tick(11)
+        self.assertEqual([(e.index, e.picked_up, e.game_time) for e in self.events], [(self.small, True, 11)])
+        self.assertIs(self.events[0].pad, self.tracker.boost_pads[self.small])
+        self.assertFalse(self.tracker.active_mask >> self.small & 1)
+        self.tick(12)
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual(self.tracker.events, [])
+        # The timer keeps counting without the pad being updated.
+        self.assertAlmostEqual(self.tracker.boost_pads[self.small].timer, 1)
+        self.assertAlmostEqual(self.tracker.time_until_respawn(self.small, 12), SMALL_BOOST_RESPAWN_TIME - 1)
+        self.assertEqual(self.tracker.time_until_respawn(self.small, 20), 0)
+        self.assertEqual(self.tracker.time_until_respawn(self.full, 12), 0)
+
+        self.packet.game_boosts[self.small].is_active = True
+        self.tick(15)
+        self.assertEqual([(e.index, e.picked_up) for e in self.events[1:]], [(self.small, False)])
+        self.assertEqual(self.tracker.boost_pads[self.small].timer, 0)
+
+    def test_unsubscribe(self):
+        self.tick(10)
+        self.tracker.unsubscribe(self.events.append)
+        self.packet.game_boosts[self.small].is_active = False
+        self.tick(11)
+        self.assertEqual(self.events, [])
+        self.assertEqual(len(self.tracker.events), 1)
+
+
+class _Clock:
+    """Stands in for time.perf_counter, so the profiler measures whatever the test says."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Renderer:
+    """Remembers what was drawn."""
+
+    def __init__(self):
+        self.strings = []
+        self.frames = 0
+
+    def begin_rendering(self, group_id: str = 'default'):
+        self.frames += 1
+
+    def end_rendering(self):
+        pass
+
+    def draw_string_2d(self, x, y, scale_x, scale_y, text, color):
+        self.strings.append((x, y, text))
+
+    def white(self):
+        return None
+
+
+class TickProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch('util.profiler.time.perf_counter', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tick(self, profiler: TickProfiler, seconds: float, steering: float = 0):
+        profiler.begin_tick()
+        if steering:
+            with profiler.section('steering'):
+                self.clock.now += steering
+        self.clock.now += seconds - steering
+        profiler.end_tick()
+
+    def test_percentiles_of_the_latest_ticks(self):
+        profiler = TickProfiler(budget=0.005, history=100)
+        durations = [i / 10000 for i in range(1, 251)]
+        for duration in durations:
+            self.tick(profiler, duration, steering=duration / 2)
+        # Only the last 100 ticks are kept.
+        report = profiler.report()
+        latest = np.array(durations[-100:]) * 1000
+        self.assertAlmostEqual(report['tick']['p50'], np.percentile(latest, 50), places=6)
+        self.assertAlmostEqual(report['tick']['p99'], np.percentile(latest, 99), places=6)
+        self.assertAlmostEqual(report['steering']['p50'], np.percentile(latest / 2, 50), places=6)
+        # Ticks of more than 5 ms went over the budget, counted over all ticks, not just the kept ones.
+        self.assertEqual(profiler.missed_deadlines, sum(duration > 0.005 for duration in durations))
+        self.assertEqual(profiler.tick_count, 250)
+
+    def test_a_section_gives_one_sample_per_tick(self):
+        profiler = TickProfiler()
+        profiler.begin_tick()
+        for _ in range(3):
+            with profiler.section('steering'):
+                with profiler.section('steering'):
+                    self.clock.now += 0.001
+        profiler.end_tick()
+        self.assertEqual(profiler.section('steering').buffer.count, 1)
+        self.assertAlmostEqual(profiler.report()['steering']['p50'], 3)
+
+    def test_reports_once_per_interval(self):
+        renderer = _Renderer()
+        with tempfile.TemporaryDirectory() as directory:
+            report_file = Path(directory) / 'report.txt'
+            profiler = TickProfiler(renderer=renderer, report_file=str(report_file), render_position=(50, 300))
+            for _ in range(250):
+                self.tick(profiler, 1 / 120)
+            # The first tick reports right away, then one every full second: 3 reports in 2.08 seconds.
+            self.assertEqual(len(report_file.read_text().splitlines()), 3)
+        # The report is drawn every tick, at the given position, a line per section plus the missed deadlines.
+        self.assertEqual(len(renderer.strings), 250 * 2)
+        self.assertEqual([(x, y) for x, y, _ in renderer.strings[-2:]], [(50, 300), (50, 320)])
+
+
+class RenderQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch('util.render_queue.time.perf_counter', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.renderer = _Renderer()
+
+    def frame(self, queue: RenderQueue, *format_args, seconds: float = 1 / 120):
+        self.clock.now += seconds
+        queue.draw_string_2d(20, 20, 1, 1, 'Boost: {}', queue.white(), *format_args)
+        queue.flush()
+
+    def test_unchanged_frames_are_skipped(self):
+        queue = RenderQueue(self.renderer, max_rate=0)
+        for boost in (10, 10, 10, 20, 20):
+            self.frame(queue, boost)
+        self.assertEqual(queue.frames_sent, 2)
+        self.assertEqual(self.renderer.frames, 2)
+        self.assertEqual([text for _, _, text in self.renderer.strings], ['Boost: 10', 'Boost: 20'])
+
+    def test_rate_cap(self):
+        queue = RenderQueue(self.renderer, max_rate=30)
+        # A changed frame every tick for one second, but only 30 of them go out.
+        for tick in range(120):
+            self.frame(queue, tick)
+        self.assertEqual(queue.frames_sent, 30)
+        # A frame that comes too soon is dropped, not sent later.
+        self.assertEqual(self.renderer.strings[1][2], 'Boost: 4')
+
+    def test_disabled(self):
+        for queue in (RenderQueue(self.renderer, enabled=False), RenderQueue(NullRenderer())):
+            self.frame(queue, 1)
+            self.assertEqual(queue.frames_sent, 0)
+            self.assertEqual(queue._commands, [])
+        self.assertEqual(self.renderer.frames, 0)
+
+    def test_null_renderer_has_the_renderer_methods(self):
+        from rlbot.utils.rendering.rendering_manager import RenderingManager
+        plumbing = {'get_rendering_manager', 'send_group', 'set_bot_index_and_team', 'setup_function_types'}
+        for name in dir(RenderingManager):
+            if not name.startswith('_') and name not in plumbing:
+                self.assertTrue(callable(getattr(NullRenderer(), name)), name)
+        with self.assertRaises(AttributeError):
+            NullRenderer().draw_string2d(0, 0, 1, 1, 'typo', None)
+
+
+class WorldModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.world = WorldModel()
+        self.world.initialize(FieldInfoPacket())
+        self.predictions = 0
+
+    def get_ball_prediction(self) -> BallPrediction:
+        self.predictions += 1
+        return BallPrediction()
+
+    def test_one_update_per_frame(self):
+        packet = _packet([0, 1], 10)
+        packet.game_info.frame_num = 1200
+        # Two bots with their own packet objects for the same frame.
+        other_packet = GameTickPacket.from_buffer_copy(packet)
+        self.assertTrue(self.world.update(packet, self.get_ball_prediction))
+        self.assertFalse(self.world.update(other_packet, self.get_ball_prediction))
+        self.assertEqual((self.world.updates_computed, self.predictions), (1, 1))
+        self.assertEqual(self.world.car_locations[1].x, 1000)
+        self.assertEqual(self.world.game_time, 10)
+
+        packet.game_info.frame_num += 1
+        packet.game_info.seconds_elapsed += 1 / 120
+        packet.game_cars[1].physics.location.x = 2000
+        self.assertTrue(self.world.update(packet, self.get_ball_prediction))
+        self.assertEqual(self.world.car_locations[1].x, 2000)
+        self.assertEqual(self.world.possession.possessing_car, 0)
+
+    def test_initialize_starts_over(self):
+        packet = _packet([0, 1], 10)
+        self.world.update(packet, self.get_ball_prediction)
+        self.world.initialize(FieldInfoPacket())
+        self.assertIsNone(self.world.possession.possessing_car)
+        self.assertEqual(self.world.game_time, 0)
+        # The same frame again, as the first packet of a new match, is read again.
+        packet.game_cars[1].physics.location.x = 3000
+        self.assertTrue(self.world.update(packet, self.get_ball_prediction))
+        self.assertEqual(self.world.car_locations[1].x, 3000)
+
+    def test_one_thread_only(self):
+        packet = _packet([0, 1], 10)
+        self.world.update(packet, self.get_ball_prediction)
+        errors = []
+
+        def update():
+            try:
+                self.world.update(packet, self.get_ball_prediction)
+            except RuntimeError as error:
+                errors.append(error)
+        thread = threading.Thread(target=update)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(errors), 1)
+
+    def test_shared_by_key(self):
+        self.assertIs(get_world_model('test a'), get_world_model('test a'))
+        self.assertIsNot(get_world_model('test a'), get_world_model('test b'))
+
+
+class ReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.path = self.directory / 'match_0.rlbr'
+        recorder = ReplayRecorder(self.path)
+        recorder.record_field_info(FieldInfoPacket())
+        for tick in range(3):
+            recorder.record_tick(_packet([0, 1], 10 + tick / 120))
+        recorder.close()
+
+    def test_recording_path(self):
+        self.assertEqual(recording_path('replays/match.rlbr', 2), Path('replays/match_2.rlbr'))
+
+    def test_round_trip(self):
+        replay = Replay.load(self.path)
+        self.assertEqual(len(replay), 3)
+        self.assertEqual(replay.team_of(1), 1)
+        self.assertAlmostEqual(replay.ticks[2][0].game_info.seconds_elapsed, 10 + 2 / 120, places=5)
+
+    def test_replayed_bots_dont_record(self):
+        # A config that records to the file being played, hosting two bots like run_replay.py --bots 2.
+        from bot import MyBot
+        config = self.directory / 'bot.cfg'
+        recording = self.directory / 'match.rlbr'
+        config.write_text((SRC / 'bot.cfg').read_text().replace('record_replay_file =',
+                                                                  f'record_replay_file = {recording}'))
+        before = self.path.read_bytes()
+        player = ReplayPlayer(Replay.load(self.path))
+        agents = [player.create_agent(MyBot, index=i, config_path=config) for i in range(2)]
+        player.play_all(agents)
+        for agent in agents:
+            self.assertIsNone(agent.recorder)
+            agent.retire()
+        self.assertEqual(self.path.read_bytes(), before)
+        self.assertEqual(sorted(path.name for path in self.directory.iterdir()), ['bot.cfg', 'match_0.rlbr'])
+
+
+def _wait_until(condition: Callable[[], bool], seconds: float = 5):
+    """For other threads to catch up."""
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class PlannerWorkerTest(unittest.TestCase):
+
+    def test_stale_plans(self):
+        worker = PlannerWorker(lambda snapshot: snapshot * 2, threaded=False)
+        self.assertIsNone(worker.latest(10, max_age=0.1))
+        worker.submit(10, 4)
+        self.assertEqual(worker.latest(10.05, max_age=0.1).plan, 8)
+        self.assertIsNone(worker.latest(10.2, max_age=0.1))
+        # A plan from after game_time, e.g. from before the clock was reset, is stale too.
+        self.assertIsNone(worker.latest(5, max_age=0.1))
+        self.assertEqual(worker.stale_reads, 3)
+
+    def test_only_the_newest_snapshot_is_made_and_planned(self):
+        made = []
+
+        def make_snapshot(value):
+            made.append(value)
+            return value
+
+        worker = PlannerWorker(lambda snapshot: snapshot, threaded=False)
+        for game_time in (1, 2, 3):
+            worker.offer(game_time, lambda value=game_time: make_snapshot(value))
+        self.assertEqual(made, [])
+        self.assertEqual(worker.latest(3, max_age=0.1).plan, 3)
+        self.assertEqual(made, [3])
+        self.assertEqual((worker.plans_made, worker.snapshots_dropped), (1, 2))
+        # Nothing new was offered, so there's nothing to plan again.
+        worker.latest(3, max_age=0.1)
+        self.assertEqual(worker.plans_made, 1)
+
+    def test_thread_skips_offers_while_busy(self):
+        started, release = threading.Event(), threading.Event()
+
+        def make_plan(snapshot):
+            started.set()
+            release.wait(5)
+            return snapshot
+
+        worker = PlannerWorker(make_plan)
+        try:
+            self.assertTrue(worker.offer(1, lambda: 1))
+            self.assertTrue(started.wait(5))
+            made = []
+            self.assertFalse(worker.offer(2, lambda: made.append(2)))
+            self.assertEqual((made, worker.offers_skipped), ([], 1))
+            # submit always queues, replacing the snapshot that's waiting.
+            worker.submit(3, 3)
+            worker.submit(4, 4)
+            self.assertEqual(worker.snapshots_dropped, 1)
+            release.set()
+            _wait_until(lambda: worker.plans_made == 2)
+            self.assertEqual(worker.latest(4, max_age=0.1).plan, 4)
+        finally:
+            release.set()
+            worker.stop()
+
+    def test_thread_survives_errors(self):
+        def make_plan(snapshot):
+            if snapshot is None:
+                raise ValueError('no snapshot')
+            return snapshot
+
+        worker = PlannerWorker(make_plan)
+        try:
+            with mock.patch('util.planner_worker.traceback.print_exc'):
+                worker.submit(1, None)
+                _wait_until(lambda: worker.error is not None)
+            self.assertIsInstance(worker.error, ValueError)
+            worker.submit(2, 'plan')
+            _wait_until(lambda: worker.plans_made == 1)
+            self.assertEqual(worker.latest(2, max_age=0.1).plan, 'plan')
+        finally:
+            worker.stop()
+
+
+class BallSimulatorTest(unittest.TestCase):
+
+    def test_free_flight(self):
+        # In the air the ball only feels gravity and drag, dv/dt = g - DRAG * v, which has an exact solution.
+        t = np.arange(150)[:, np.newaxis] * SLICE_DT
+        terminal_velocity = np.array([0, 0, GRAVITY]) / DRAG
+        start_velocity = np.array([500, 300, 800])
+        decay = np.exp(-DRAG * t)
+        velocities = terminal_velocity + (start_velocity - terminal_velocity) * decay
+        locations = (np.array([0, 0, 1000]) + terminal_velocity * t
+                     + (start_velocity - terminal_velocity) * (1 - decay) / DRAG)
+        errors = BallSimulator().validate(_prediction(locations, velocities))
+        self.assertEqual(len(errors), 149)
+        self.assertLess(errors[:60].max(), 5)
+        self.assertLess(errors.max(), 10)
+
+    def test_floor_bounce(self):
+        simulator = BallSimulator()
+        balls = BallStates([0, 0, 500], [0, 0, 0])
+        while balls.velocity[0, 2] <= 0:
+            simulator.step(balls)
+        # The ball keeps RESTITUTION of its speed, so it comes back up to 0.6² of the height it fell.
+        highest = simulator.simulate(balls, 1)[:, 0, 2].max()
+        self.assertAlmostEqual(highest, BALL_RADIUS + 0.36 * (500 - BALL_RADIUS), delta=10)
+
+    def test_goals(self):
+        simulator = BallSimulator()
+        y = STANDARD_ARENA.half_length - 200
+        # Into the orange goal, wide of the blue goal, and into the blue goal.
+        balls = BallStates([[0, y, BALL_RADIUS], [2000, -y, 300], [300, -y, 300]],
+                           [[0, 1000, 0], [0, -1000, 0], [0, -1500, 0]])
+        trajectory = simulator.simulate(balls, 1.5)
+        self.assertEqual(balls.scored.tolist(), [1, 0, -1])
+        # The scored balls stay in the goal, the other one bounced off the back wall.
+        self.assertGreater(trajectory[-1, 0, 1], STANDARD_ARENA.half_length)
+        self.assertLess(trajectory[-1, 2, 1], -STANDARD_ARENA.half_length)
+        self.assertGreater(balls.velocity[1, 1], 0)
+        self.assertGreaterEqual(trajectory[:, 1, 1].min(), -STANDARD_ARENA.half_length + BALL_RADIUS - 20)
+
+    def test_fixture_predictions(self):
+        # Half a second windows where the ball stays clear of the floor, walls and ceiling, since the simulator
+        # doesn't model the ramps. There it should be as good as the game's own physics.
+        simulator = BallSimulator()
+        fixture = np.load(PREDICTION_FIXTURE)
+        self.assertGreater(len(fixture['start_time']), 0)
+        for start_time, locations, velocities in zip(fixture['start_time'], fixture['location'], fixture['velocity']):
+            errors = simulator.validate(_prediction(locations, velocities, start_time))
+            self.assertLess(errors.max(), 20, f'at game time {start_time:.2f}')
+
+
+class InterceptTest(unittest.TestCase):
+
+    def test_path_lengths(self):
+        # Walk along the turning circle until the target is straight ahead, then drive to it.
+        rng = Random(1)
+        radius = 500
+        for _ in range(100):
+            angle = rng.uniform(-np.pi, np.pi)
+            distance = rng.uniform(2.5 * radius, 5000)
+            x, y = distance * np.cos(angle), distance * np.sin(angle)
+            turns = np.linspace(0, 2 * np.pi, 50001)
+            # Left turns for targets on the left, mirrored for targets on the right.
+            side = 1 if y >= 0 else -1
+            car_x, car_y = radius * np.sin(turns), side * radius * (1 - np.cos(turns))
+            to_x, to_y = x - car_x, y - car_y
+            sideways = -np.sin(turns) * side * to_x + np.cos(turns) * to_y
+            ahead = np.cos(turns) * to_x + np.sin(turns) * side * to_y
+            first = np.flatnonzero((np.abs(sideways) < 3) & (ahead > 0))[0]
+            expected = turns[first] * radius + np.hypot(to_x[first], to_y[first])
+            self.assertAlmostEqual(float(path_lengths(np.array([x]), np.array([y]), radius)[0]), expected, delta=5)
+
+    def test_path_lengths_straight_ahead(self):
+        lengths = path_lengths(np.array([1000.0, 0.0]), np.array([0.0, 0.0]), 500)
+        self.assertAlmostEqual(lengths[0], 1000)
+        self.assertAlmostEqual(lengths[1], 0)
+
+    def test_turn_radius(self):
+        # Faster cars turn wider.
+        radii = [turn_radius(speed) for speed in (0, 500, 1000, 1500, 2300)]
+        self.assertEqual(radii, sorted(radii))
+        self.assertEqual(turn_radius(-1000), turn_radius(1000))
+
+    def test_reachable_distances(self):
+        durations = np.linspace(0, 6, 61)
+        with_boost = reachable_distances(0, 100, durations)
+        without_boost = reachable_distances(0, 0, durations)
+        self.assertEqual(with_boost[0], 0)
+        self.assertTrue((np.diff(with_boost) > 0).all())
+        self.assertTrue((with_boost >= without_boost).all())
+        self.assertTrue((np.diff(with_boost) <= MAX_CAR_SPEED * 0.1 + 1e-6).all())
+        # Already at top speed, the car just keeps going.
+        np.testing.assert_allclose(reachable_distances(MAX_CAR_SPEED, 0, durations), MAX_CAR_SPEED * durations)
+
+    def test_find_intercept(self):
+        packet = GameTickPacket()
+        car = packet.game_cars[0]
+        car.boost = 50
+        car.physics.rotation.yaw = np.pi / 2
+        orientation = Orientation(car.physics.rotation)
+        # A ball rolling across in front of the car.
+        t = np.arange(360)[:, np.newaxis] * SLICE_DT
+        locations = np.array([-2000, 2000, BALL_RADIUS]) + np.array([500, 0, 0]) * t
+        velocities = np.tile([500.0, 0, 0], (360, 1))
+        prediction = _prediction(locations, velocities, game_time=10)
+
+        intercept = find_intercept(prediction, car, orientation, 10)
+        self.assertIsNotNone(intercept)
+        times = prediction.game_seconds - 10
+        reach = reachable_distances(0, 50, times)
+        local = orientation.to_local(car.physics.location, prediction.location)
+        lengths = path_lengths(local.x, local.y, turn_radius(0)) - CONTACT_DISTANCE
+        # The earliest slice the car can get to, and none before it.
+        self.assertLessEqual(lengths[intercept.index], reach[intercept.index])
+        self.assertTrue((lengths[:intercept.index] > reach[:intercept.index]).all())
+        self.assertAlmostEqual(intercept.game_time, prediction.game_seconds[intercept.index], places=4)
+
+        # Out of reach when it's up in the air, and unreachable in time when it's far away and fast.
+        self.assertIsNone(find_intercept(_prediction(locations + [0, 0, 500], velocities), car, orientation, 100))
+        fast = np.array([-4000, 5000, BALL_RADIUS]) + np.array([-3000, 0, 0]) * t
+        self.assertIsNone(find_intercept(_prediction(fast, velocities, game_time=10), car, orientation, 10))
+
+
+class BatchGradingTest(unittest.TestCase):
+
+    def packets(self, packets):
+        """Three instances: a car next to the ball, a car far away, and two cars where the second is close."""
+        for packet, cars in zip(packets, [[(0, 100)], [(3000, 0)], [(3000, 0), (150, 0)]]):
+            packet.num_cars = len(cars)
+            for car, (x, y) in zip(packet.game_cars, cars):
+                car.physics.location.x, car.physics.location.y = x, y
+            packet.game_info.seconds_elapsed = 10
+        return packets
+
+    def test_packet_array_matches_list(self):
+        from_list, from_array = BatchState(3), BatchState(3)
+        from_list.update(self.packets([GameTickPacket() for _ in range(3)]))
+        from_array.update(self.packets(BatchState.packet_array(3)))
+        np.testing.assert_array_equal(from_list.car_locations, from_array.car_locations)
+        self.assertEqual(from_list.car_locations.shape, (3, 2, 3))
+        # The missing second car of the first two instances is NaN.
+        self.assertTrue(np.isnan(from_list.car_locations[:2, 1]).all())
+
+    def test_conditions(self):
+        packets = self.packets(BatchState.packet_array(3))
+        state = BatchState(3)
+        state.update(packets)
+        self.assertEqual(CarNearBall(200).evaluate(state).tolist(), [True, False, False])
+        self.assertEqual(CarNearBall(200, car_index=None).evaluate(state).tolist(), [True, False, True])
+        packets[0].game_ball.physics.location.z = 1000
+        state.update(packets)
+        self.assertEqual(CarNearBall(200).evaluate(state).tolist(), [True, False, False])
+        self.assertEqual(CarNearBall(200, horizontal=False).evaluate(state).tolist(), [False, False, False])
+        self.assertEqual(BallHeight(min_height=500).evaluate(state).tolist(), [True, False, False])
+        packets[1].game_ball.physics.location.y = 5300
+        packets[2].game_ball.physics.location.y = -5300
+        state.update(packets)
+        self.assertEqual(BallInGoal(1).evaluate(state).tolist(), [False, True, False])
+        self.assertEqual(BallInGoal(0).evaluate(state).tolist(), [False, False, True])
+
+    def test_timeout_and_goals_count_from_the_start(self):
+        packets = self.packets(BatchState.packet_array(3))
+        packets[1].teams[0].score = 2
+        state = BatchState(3)
+        state.update(packets)
+        for packet in packets:
+            packet.game_info.seconds_elapsed = 13
+        packets[1].teams[0].score = 3
+        state.update(packets)
+        self.assertEqual(Timeout(2).evaluate(state).tolist(), [True, True, True])
+        self.assertEqual(GoalScored(0).evaluate(state).tolist(), [False, True, False])
+        state.restart(np.array([1]))
+        state.update(packets)
+        self.assertEqual(state.elapsed.tolist(), [3, 0, 3])
+        self.assertEqual(GoalScored(0).evaluate(state).tolist(), [False, False, False])
+
+    def test_grader(self):
+        packets = self.packets(BatchState.packet_array(3))
+        state = BatchState(3)
+        state.update(packets)
+        near = CarNearBall(200, car_index=None)
+        grader = BatchGrader(pass_when=[near], fail_when=[Timeout(2)])
+        self.assertEqual(grader.evaluate(state).tolist(), [0, 2])
+        grades = grader.grade(state)
+        self.assertIsInstance(grades[0], ConditionPass)
+        self.assertIs(grades[0].condition, near)
+        self.assertIsNone(grades[1])
+
+        # A fail wins over a pass on the same tick, but an instance keeps the grade it already has.
+        for packet in packets:
+            packet.game_info.seconds_elapsed = 20
+        packets[1].game_cars[0].physics.location.x = 0
+        state.update(packets)
+        self.assertEqual(grader.evaluate(state).tolist(), [1])
+        grades = grader.grade(state)
+        self.assertIsInstance(grades[0], ConditionPass)
+        self.assertIsInstance(grades[1], ConditionFail)
+        self.assertTrue(grader.finished.all())
+
+    def test_drive_to_ball_grader(self):
+        packets = self.packets(BatchState.packet_array(3))
+        state = BatchState(3)
+        state.update(packets)
+        grader = make_drive_to_ball_grader(timeout_seconds=2, min_dist_to_pass=200)
+        self.assertEqual([type(grade) for grade in grader.grade(state)], [ConditionPass, type(None), type(None)])
+        for packet in packets:
+            packet.game_info.seconds_elapsed = 13
+        state.update(packets)
+        self.assertEqual([type(grade) for grade in grader.grade(state)], [ConditionPass, ConditionFail, ConditionFail])
+
+
+class ManeuverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.steps = [(0.05, SimpleControllerState(jump=True)), (0.05, SimpleControllerState()),
+                      (0.2, SimpleControllerState(jump=True, pitch=-1)), (0.8, SimpleControllerState(throttle=1))]
+        self.flip = Maneuver('flip', self.steps)
+
+    def test_controls_at(self):
+        # Like a ControlStep, a step still runs at exactly its end time.
+        end_times = np.cumsum([duration for duration, _ in self.steps])
+        for elapsed in np.concatenate([np.linspace(0, 1.2, 241), end_times, end_times + 1e-9]):
+            expected = next((controls for end, (_, controls) in zip(end_times, self.steps) if elapsed <= end), None)
+            self.assertIs(self.flip.controls_at(elapsed), expected, f'at {elapsed}')
+
+    def test_steps_round_trip(self):
+        self.assertAlmostEqual(self.flip.duration, 1.1)
+        for (duration, controls), (expected_duration, expected_controls) in zip(self.flip.steps(), self.steps):
+            self.assertAlmostEqual(duration, expected_duration)
+            self.assertIs(controls, expected_controls)
+        from_steps = Maneuver.from_steps('flip', [ControlStep(duration, controls) for duration, controls in self.steps])
+        self.assertEqual(from_steps.end_times, self.flip.end_times)
+
+    def test_player_chains_without_drift(self):
+        wait = Maneuver('wait', [(0.5, SimpleControllerState(throttle=0.5))])
+        player = ManeuverPlayer()
+        player.start(self.flip, 10)
+        player.chain(wait)
+        # Ticking late doesn't delay the chained maneuver, it starts where the first one ended.
+        self.assertIs(player.tick(11.15), wait.controls[0])
+        self.assertAlmostEqual(player.start_time, 11.1)
+        self.assertIs(player.tick(11.6), wait.controls[0])
+        self.assertIsNone(player.tick(11.61))
+        self.assertFalse(player.active)
+
+    def test_player_priority(self):
+        player = ManeuverPlayer()
+        self.assertTrue(player.start(self.flip, 0, priority=1))
+        self.assertFalse(player.start(Maneuver('other', self.steps[:1]), 0.1))
+        self.assertIs(player.maneuver, self.flip)
+        self.assertIsNone(player.tick(2))
+        # Once it's over, anything can start again.
+        self.assertTrue(player.start(Maneuver('other', self.steps[:1]), 2))
+        with self.assertRaises(ValueError):
+            ManeuverPlayer().chain(self.flip)
+
+
+def _turn(x: float, y: float, heading: float, turn: int, radius: float, angle: float):
+    """Where a car ends up, and facing where, after turning the given angle around its turning circle."""
+    # The circle's center is to the car's left for turn +1 (yaw increasing) and to its right for -1.
+    cx, cy = x - turn * radius * math.sin(heading), y + turn * radius * math.cos(heading)
+    heading += turn * angle
+    return cx + turn * radius * math.sin(heading), cy - turn * radius * math.cos(heading), heading
+
+
+class PlanPathTest(unittest.TestCase):
+
+    def assertSameHeading(self, a: float, b: float):
+        self.assertAlmostEqual(math.remainder(a - b, 2 * math.pi), 0, places=6)
+
+    def test_drives_to_the_end(self):
+        rng = Random(2)
+        for _ in range(300):
+            start = (rng.uniform(-3000, 3000), rng.uniform(-4000, 4000), rng.uniform(-math.pi, math.pi))
+            end = (rng.uniform(-3000, 3000), rng.uniform(-4000, 4000), rng.uniform(-math.pi, math.pi))
+            radius = rng.uniform(150, 1200)
+            path = plan_path(start, end, radius)
+
+            # Drive the path's arcs and straight line and see where the car ends up.
+            x, y, heading = _turn(*start, path.turns[0], radius, path.arcs[0])
+            x, y = x + path.straight * math.cos(heading), y + path.straight * math.sin(heading)
+            x, y, heading = _turn(x, y, heading, path.turns[1], radius, path.arcs[1])
+            self.assertAlmostEqual(x, end[0], delta=1e-6 * radius + 1e-6)
+            self.assertAlmostEqual(y, end[1], delta=1e-6 * radius + 1e-6)
+            self.assertSameHeading(heading, end[2])
+
+            # The sampled points follow the path from start to end.
+            points = path.points
+            np.testing.assert_allclose(points[-1], end[:2], atol=1e-6)
+            steps = np.linalg.norm(np.diff(np.vstack((start[:2], points)), axis=0), axis=1)
+            self.assertLessEqual(steps.max(), SAMPLE_SPACING + 1e-6)
+            self.assertAlmostEqual(path.length, (path.arcs[0] + path.arcs[1]) * radius + path.straight)
+            self.assertGreaterEqual(path.length, math.dist(start[:2], end[:2]) - 1e-6)
+
+    def test_straight_ahead(self):
+        path = plan_path((0, 0, 0), (1000, 0, 0), 500)
+        self.assertEqual(path.arcs, (0, 0))
+        self.assertAlmostEqual(path.length, 1000)
+
+    def test_turns_towards_the_target(self):
+        # A target behind and to the side, facing back the way we came: one U-turn, yaw increasing towards +y.
+        path = plan_path((0, 0, 0), (0, 1000, math.pi), 500)
+        self.assertEqual(path.turns[0], 1)
+        self.assertAlmostEqual(path.length, math.pi * 500)
+        path = plan_path((0, 0, 0), (0, -1000, math.pi), 500)
+        self.assertEqual(path.turns[0], -1)
+        self.assertAlmostEqual(path.length, math.pi * 500)
+
+
+def _packet(teams, game_time: float) -> GameTickPacket:
+    """Cars 1000 apart along x, the first one right under the ball."""
+    packet = GameTickPacket()
+    packet.num_cars = len(teams)
+    packet.game_info.seconds_elapsed = game_time
+    for i, team in enumerate(teams):
+        packet.game_cars[i].team = team
+        packet.game_cars[i].physics.location.x = 1000 * i
+    packet.game_ball.physics.location.z = BALL_RADIUS
+    return packet
+
+
+class PossessionTrackerTest(unittest.TestCase):
+    def test_teams_are_read_every_tick(self):
+        possession = PossessionTracker()
+        packet = _packet([0, 1], 10)
+        possession.update(packet)
+        self.assertEqual(possession.possessing_car, 0)
+        self.assertEqual(possession.possessing_team, 0)
+        # The same packet object with the same number of cars, but the teams swapped, as in a new match.
+        packet.game_cars[0].team, packet.game_cars[1].team = 1, 0
+        possession.update(packet)
+        self.assertEqual(possession.possessing_team, 1)
+
+    def test_reset_forgets_the_match(self):
+        possession = PossessionTracker()
+        packet = _packet([0, 1], 10)
+        packet.game_ball.latest_touch.time_seconds = 9
+        packet.game_ball.latest_touch.team = 0
+        for tick in range(10):
+            packet.game_info.seconds_elapsed = 10 + tick / 120
+            possession.update(packet)
+        self.assertGreater(possession.possession_share(0), 0.99)
+        possession.reset()
+        self.assertIsNone(possession.possessing_car)
+        self.assertIsNone(possession.last_touch)
+        self.assertEqual(possession.possession_share(0), 0)
+        self.assertEqual(possession.time_since_touch(team=0), np.inf)
+
+    def test_touches_keep_their_team(self):
+        possession = PossessionTracker()
+        packet = _packet([0, 1], 10)
+        touch = packet.game_ball.latest_touch
+        for time, index, team in [(9, 0, 0), (9.5, 1, 1), (9.75, 0, 0)]:
+            touch.time_seconds, touch.player_index, touch.team = time, index, team
+            possession.update(packet)
+        # A new match in the same packet object, with the cars on the other teams.
+        packet.game_cars[0].team, packet.game_cars[1].team = 1, 0
+        possession.update(packet)
+        touches = possession.recent_touches()
+        self.assertEqual([(t.time, t.index, t.team) for t in touches], [(9, 0, 0), (9.5, 1, 1), (9.75, 0, 0)])
+        self.assertEqual(possession.last_touch.team, 0)
+
+
+class ThreatMapTest(unittest.TestCase):
+    def test_refreshes_after_game_time_goes_back(self):
+        threat_map = ThreatMap()
+        packet = _packet([0, 1], 100)
+        for car in packet.game_cars[:2]:
+            car.physics.rotation.yaw = math.pi / 2
+        threat_map.update(packet)
+        self.assertEqual(threat_map.refreshes, 2)
+        self.assertLess(threat_map.team_arrival_times.max(), np.inf)
+        # The next match starts at an earlier game time. Its cars are recomputed right away, not after 100 seconds.
+        packet.game_info.seconds_elapsed = 10
+        threat_map.update(packet)
+        self.assertEqual(threat_map.refreshes, 4)
+        self.assertLess(threat_map.team_arrival_times.max(), 10 + 100)
+
+
+class _Inputs(LazyInputs):
+    @lazy
+    def distance(self) -> float:
+        return 2 * self.half_distance
+
+    @lazy
+    def half_distance(self) -> float:
+        return 100.0
+
+    @lazy
+    def speed(self) -> float:
+        return 1000.0
+
+
+class StateMachineTest(unittest.TestCase):
+    def machine(self, needs) -> StateMachine:
+        return StateMachine([
+            State('close', when=lambda i: i.distance < 50, act=lambda i: SimpleControllerState(), needs=('distance',)),
+            State('drive', when=None, act=lambda i: SimpleControllerState(throttle=i.speed / 1000), needs=needs),
+        ], check_needs=True)
+
+    def test_declared_inputs(self):
+        inputs = _Inputs()
+        controls = self.machine(('speed',)).tick(inputs, 0)
+        self.assertEqual(controls.throttle, 1)
+        # Inputs computed from the declared ones don't have to be declared themselves.
+        self.assertEqual(set(inputs.computed()), {'distance', 'half_distance', 'speed'})
+
+    def test_undeclared_input_raises(self):
+        with self.assertRaises(UndeclaredInputError):
+            self.machine(('distance',)).tick(_Inputs(), 0)
+
+    def test_unchecked_machine_allows_anything(self):
+        machine = self.machine(())
+        machine.check_needs = False
+        self.assertEqual(machine.tick(_Inputs(), 0).throttle, 1)
+
+
+class _PassingBackend(ExerciseBackend):
+    """Passes every exercise straight away. At module level, so worker processes can unpickle it."""
+
+    def run_exercise(self, exercise, seed: int) -> Grade:
+        return Pass()
+
+
+class ParallelRunnerTest(unittest.TestCase):
+
+    def test_exercise_seeds(self):
+        seeds = exercise_seeds(4, 20)
+        self.assertEqual(seeds, exercise_seeds(4, 20))
+        # A seed only depends on the exercise's position, not on how long the playlist is.
+        self.assertEqual(seeds[:5], exercise_seeds(4, 5))
+        self.assertNotEqual(seeds, exercise_seeds(5, 20))
+        self.assertEqual(len(set(seeds)), 20)
+
+    def test_shards_cover_the_playlist(self):
+        exercises = [f'exercise {i}' for i in range(11)]
+        seeds = exercise_seeds(4, len(exercises))
+        for workers in range(1, 13):
+            shards = shard_jobs(exercises, seeds, workers)
+            self.assertEqual(shards, shard_jobs(exercises, seeds, workers))
+            self.assertEqual(len(shards), workers)
+            jobs = sorted(job for shard in shards for job in shard)
+            self.assertEqual(jobs, list(zip(range(len(exercises)), exercises, seeds)))
+            # Round robin, so no worker gets more than one exercise more than another.
+            sizes = [len(shard) for shard in shards]
+            self.assertLessEqual(max(sizes) - min(sizes), 1)
+
+    def test_workers_dont_change_the_results(self):
+        exercises = [f'exercise {i}' for i in range(7)]
+        single = run_playlist_parallel(exercises, _PassingBackend, workers=1, seed=9)
+        parallel = run_playlist_parallel(exercises, _PassingBackend, workers=3, seed=9)
+        self.assertEqual(parallel.workers, 3)
+        for report in (single, parallel):
+            self.assertEqual([r.result.exercise for r in report.results], exercises)
+            self.assertEqual([r.result.reproduction_info.seed for r in report.results], exercise_seeds(9, 7))
+            self.assertEqual(len(report.passed), 7)
+        self.assertEqual({r.worker for r in parallel.results}, {0, 1, 2})
+
+
+def _game_state(ball_location, ball_velocity=(0, 0, 0), car_location=(0, 0), car_yaw=math.pi / 2,
+                boost=0) -> GameState:
+    return GameState(
+        ball=BallState(physics=Physics(location=Vector3(*ball_location), velocity=Vector3(*ball_velocity))),
+        cars={0: CarState(physics=Physics(location=Vector3(*car_location, 17), rotation=Rotator(0, car_yaw, 0),
+                                          velocity=Vector3(0, 0, 0)), boost_amount=boost)})
+
+
+class SimulatedMatchTest(unittest.TestCase):
+
+    def drive(self, match: SimulatedMatch, seconds: float, controls: SimpleControllerState):
+        for _ in range(round(seconds * TICK_RATE)):
+            match.step({0: controls})
+
+    def test_reset(self):
+        match = SimulatedMatch()
+        match.reset(_game_state((100, 200, 300), car_location=(-500, 1000), car_yaw=1, boost=40), [1])
+        packet = match.packet
+        self.assertEqual(packet.game_info.seconds_elapsed, START_TIME)
+        self.assertEqual(packet.num_cars, 1)
+        car = packet.game_cars[0]
+        self.assertEqual((car.physics.location.x, car.physics.location.y), (-500, 1000))
+        self.assertAlmostEqual(car.physics.rotation.yaw, 1)
+        self.assertEqual((car.team, car.boost), (1, 40))
+        ball = packet.game_ball.physics.location
+        self.assertEqual((ball.x, ball.y, ball.z), (100, 200, 300))
+
+    def test_driving(self):
+        match = SimulatedMatch()
+        match.reset(_game_state((0, 0, BALL_RADIUS), car_location=(-3500, -3000), car_yaw=0, boost=50), [0])
+        self.drive(match, 1, SimpleControllerState(throttle=1))
+        car = match.packet.game_cars[0]
+        # Straight ahead along +x, gaining speed but never beyond the limit.
+        self.assertAlmostEqual(car.physics.location.y, -3000, delta=1e-3)
+        self.assertGreater(car.physics.location.x, -3000)
+        speed = car.physics.velocity.x
+        self.assertTrue(0 < speed <= MAX_CAR_SPEED)
+        self.drive(match, 0.5, SimpleControllerState(throttle=1, boost=True))
+        self.assertLess(car.boost, 50)
+        self.assertGreater(car.physics.velocity.x, speed)
+
+    def test_prediction_follows_the_ball(self):
+        match = SimulatedMatch()
+        match.reset(_game_state((0, 0, 1000), (800, -300, 500), car_location=(3000, -4000)), [0])
+        prediction = PredictionArray(match.get_ball_prediction())
+        for _ in range(120):
+            match.step({})
+        ball = match.packet.game_ball.physics.location
+        index = prediction.index_at_time(match.packet.game_info.seconds_elapsed)
+        np.testing.assert_allclose(prediction.location[index], (ball.x, ball.y, ball.z), atol=1e-2)
+
+    def test_hitting_the_ball(self):
+        match = SimulatedMatch()
+        match.reset(_game_state((0, 0, BALL_RADIUS), car_location=(0, -1000)), [1], ['hitter'])
+        self.drive(match, 2, SimpleControllerState(throttle=1))
+        self.assertGreater(match.packet.game_ball.physics.velocity.y, 500)
+        touch = match.packet.game_ball.latest_touch
+        self.assertEqual((touch.player_name, touch.player_index, touch.team), ('hitter', 0, 1))
+
+    def test_goal(self):
+        match = SimulatedMatch()
+        match.reset(_game_state((0, STANDARD_ARENA.half_length - 500, BALL_RADIUS), (0, 1500, 0)), [0, 1])
+        self.drive(match, 1.5, SimpleControllerState())
+        self.assertEqual(match.scores, [1, 0])
+        self.assertEqual([team.score for team in match.packet.teams[:2]], [1, 0])
+
+    def test_boost_pads(self):
+        pad = BOOST_PAD_LOCATIONS.index((3584, 0, True))
+        match = SimulatedMatch()
+        match.reset(_game_state((0, 0, BALL_RADIUS), car_location=(3584, 0)), [0])
+        match.step({})
+        self.assertEqual(match.packet.game_cars[0].boost, 100)
+        self.assertFalse(match.packet.game_boosts[pad].is_active)
+        self.drive(match, SIMULATED_FULL_BOOST_RESPAWN_TIME - 0.1, SimpleControllerState())
+        self.assertFalse(match.packet.game_boosts[pad].is_active)
+        self.drive(match, 0.2, SimpleControllerState())
+        self.assertTrue(match.packet.game_boosts[pad].is_active)
+
+    def test_exercises_that_need_the_game(self):
+        grade = SimulatedBackend(max_seconds=1).run_exercise(StrikerPatience('patience'), 0)
+        self.assertIsInstance(grade, NotSimulated)
+        self.assertIsInstance(grade, NotGraded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Tunes the kickoff routines in src/kickoffs.json, which the bot plays from the first tick of a kickoff:
+#   python tune_kickoffs.py
+# Every routine is boost and steer for a while, drive straight, then a flip. For every spawn, all combinations of
+# steering, flip timing and flip kind on a grid are played in a simple model of the car, and the one that gets the
+# car to the ball first, facing it, is saved. Rerun it after changing the model or the maneuvers in util/maneuvers.py.
+
+SRC = Path(__file__).absolute().parent / 'src'
+sys.path.insert(0, str(SRC))
+
+from rlbot.agents.base_agent import SimpleControllerState
+
+from util.intercept import (BOOST_ACCELERATION, BOOST_PER_SECOND, CONTACT_DISTANCE, CURVATURE_SPEEDS, CURVATURES,
+                            MAX_CAR_SPEED, throttle_acceleration)
+from util.kickoff import (DEFAULT_PLAYBOOK, MIRRORED_SPAWNS, SPAWNS, SPAWN_YAWS, KickoffPlaybook,
+                          controls_to_dict)
+from util.maneuvers import FRONT_FLIP, SPEEDFLIP_LEFT, SPEEDFLIP_RIGHT, mirrored_controls
+from util.sequence import Maneuver
+
+DT = 1 / 120
+KICKOFF_BOOST = 33.3
+MAX_SECONDS = 4
+
+# The car model in the air. A dodge adds DODGE_IMPULSE towards the direction of the stick. The car is back on its
+# wheels this long after jumping without a dodge, or after the dodge, depending on whether the flip was cancelled.
+DODGE_IMPULSE = 500
+JUMP_LANDING = 0.55
+DODGE_LANDING = 0.65
+CANCELLED_DODGE_LANDING = 0.45
+MAX_DODGE_DELAY = 1.25
+
+# Reaching the ball while it's more than this far off the nose, in radians, counts as a miss and costs MISS_PENALTY.
+MAX_CONTACT_ANGLE = 0.35
+MISS_PENALTY = 1.0
+
+STEER_TIMES = [i * 0.05 for i in range(11)]
+STEERS = [-1, -0.5, 0.5, 1]
+FLIP_TIMES = [0.1 + i * 0.05 for i in range(23)]
+
+
+def _boosted(controls: SimpleControllerState) -> SimpleControllerState:
+    return SimpleControllerState(**{**controls_to_dict(controls), 'throttle': 1, 'boost': True})
+
+
+# The flips a routine can end with. The speedflips' own steering at the start is left out, that's tuned separately.
+FLIPS: Dict[str, List[Tuple[float, SimpleControllerState]]] = {
+    'none': [],
+    'front flip': [(duration, _boosted(controls)) for duration, controls in FRONT_FLIP.steps()],
+    'speedflip left': SPEEDFLIP_LEFT.steps()[1:],
+    'speedflip right': SPEEDFLIP_RIGHT.steps()[1:],
+}
+
+
+def _wrap(angle: float) -> float:
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+class _KickoffCar:
+    """A car on a flat field with the ball at the origin: the simulated backend's driving, plus jumps and dodges."""
+
+    def __init__(self, x: float, y: float, yaw: float):
+        self.x, self.y, self.yaw = x, y, yaw
+        self.vx = self.vy = 0.0
+        self.boost = KICKOFF_BOOST
+        self.air_time: Optional[float] = None  # None while on the ground
+        self.dodge_time: Optional[float] = None
+        self.dodge_pitch = 0.0
+        self.cancelled = False
+        self.jump_held = False
+
+    def step(self, controls: SimpleControllerState):
+        jump_pressed = controls.jump and not self.jump_held
+        self.jump_held = controls.jump
+        boosting = controls.boost and self.boost > 0
+        if boosting:
+            self.boost = max(self.boost - BOOST_PER_SECOND * DT, 0)
+        if self.air_time is None:
+            if jump_pressed:
+                self.air_time = 0.0
+                self.dodge_time = None
+                self.cancelled = False
+            else:
+                self._drive(controls, boosting)
+        if self.air_time is not None:
+            self._fly(controls, boosting, jump_pressed)
+
+        speed = math.hypot(self.vx, self.vy)
+        if speed > MAX_CAR_SPEED:
+            self.vx *= MAX_CAR_SPEED / speed
+            self.vy *= MAX_CAR_SPEED / speed
+        self.x += self.vx * DT
+        self.y += self.vy * DT
+
+    def _drive(self, controls: SimpleControllerState, boosting: bool):
+        cos, sin = math.cos(self.yaw), math.sin(self.yaw)
+        speed = self.vx * cos + self.vy * sin
+        acceleration = controls.throttle * throttle_acceleration(abs(speed))
+        if boosting:
+            acceleration += BOOST_ACCELERATION
+        speed = min(speed + acceleration * DT, MAX_CAR_SPEED)
+        curvature = _curvature(abs(speed))
+        self.yaw = _wrap(self.yaw + controls.steer * curvature * speed * DT)
+        self.vx, self.vy = math.cos(self.yaw) * speed, math.sin(self.yaw) * speed
+
+    def _fly(self, controls: SimpleControllerState, boosting: bool, jump_pressed: bool):
+        self.air_time += DT
+        stick_forward, stick_side = -controls.pitch, controls.yaw
+        if (jump_pressed and self.dodge_time is None and self.air_time < MAX_DODGE_DELAY
+                and (stick_forward or stick_side)):
+            direction = self.yaw + math.atan2(stick_side, stick_forward)
+            self.vx += math.cos(direction) * DODGE_IMPULSE
+            self.vy += math.sin(direction) * DODGE_IMPULSE
+            self.dodge_time = self.air_time
+            self.dodge_pitch = controls.pitch
+        elif self.dodge_time is not None and controls.pitch * self.dodge_pitch < 0:
+            # Pulling the stick the other way stops the flip halfway, so the car lands sooner.
+            self.cancelled = True
+        if boosting:
+            self.vx += math.cos(self.yaw) * BOOST_ACCELERATION * DT
+            self.vy += math.sin(self.yaw) * BOOST_ACCELERATION * DT
+
+        if self.dodge_time is None:
+            landing = JUMP_LANDING
+        else:
+            landing = self.dodge_time + (CANCELLED_DODGE_LANDING if self.cancelled else DODGE_LANDING)
+        if self.air_time >= landing:
+            # The car lands facing where it's going.
+            self.air_time = None
+            self.yaw = math.atan2(self.vy, self.vx)
+
+
+def _curvature(speed: float) -> float:
+    # np.interp on a single number is slow, and this runs a few million times.
+    for i in range(1, len(CURVATURE_SPEEDS)):
+        if speed <= CURVATURE_SPEEDS[i]:
+            t = (speed - CURVATURE_SPEEDS[i - 1]) / (CURVATURE_SPEEDS[i] - CURVATURE_SPEEDS[i - 1])
+            return CURVATURES[i - 1] + t * (CURVATURES[i] - CURVATURES[i - 1])
+    return CURVATURES[-1]
+
+
+def make_routine(name: str, steer: float, steer_time: float, flip_time: float, flip: str) -> Maneuver:
+    steps = []
+    if steer_time > 0:
+        steps.append((steer_time, SimpleControllerState(throttle=1, boost=True, steer=steer)))
+    if flip_time > steer_time:
+        steps.append((flip_time - steer_time, SimpleControllerState(throttle=1, boost=True)))
+    return Maneuver(f'kickoff {name}', steps + FLIPS[flip])
+
+
+def evaluate(routine: Maneuver, spawn: str) -> float:
+    """
+    Seconds until the car reaches the ball when it plays the routine and then drives straight at the ball with
+    boost, plus MISS_PENALTY if it gets there at an angle.
+    """
+    x, y = SPAWNS[spawn]
+    car = _KickoffCar(x, y, SPAWN_YAWS[spawn])
+    chase = SimpleControllerState(throttle=1, boost=True)
+    for tick in range(int(MAX_SECONDS / DT)):
+        elapsed = tick * DT
+        angle_to_ball = _wrap(math.atan2(-car.y, -car.x) - car.yaw)
+        if math.hypot(car.x, car.y) <= CONTACT_DISTANCE:
+            return elapsed + (MISS_PENALTY if abs(angle_to_ball) > MAX_CONTACT_ANGLE else 0)
+        controls = routine.controls_at(elapsed)
+        if controls is None:
+            chase.steer = max(-1.0, min(1.0, angle_to_ball * 5))
+            controls = chase
+        car.step(controls)
+    return MAX_SECONDS + MISS_PENALTY
+
+
+def tune(spawn: str) -> Tuple[Maneuver, str]:
+    """The best routine for the spawn, and a description of it."""
+    best: Tuple[float, Maneuver, str] = (float('inf'), None, '')
+    candidates = {(0, 0.0, flip_time, flip) for flip_time in FLIP_TIMES for flip in FLIPS}
+    candidates |= {(steer, steer_time, flip_time, flip) for steer in STEERS for steer_time in STEER_TIMES[1:]
+                   for flip_time in FLIP_TIMES if flip_time >= steer_time for flip in FLIPS}
+    # Without a flip the flip time doesn't matter.
+    candidates = {(steer, steer_time, 0.0 if flip == 'none' else flip_time, flip)
+                  for steer, steer_time, flip_time, flip in candidates}
+    for steer, steer_time, flip_time, flip in sorted(candidates, key=str):
+        routine = make_routine(spawn, steer, steer_time, flip_time, flip)
+        seconds = evaluate(routine, spawn)
+        if seconds < best[0]:
+            best = (seconds, routine, f'steer {steer} for {steer_time:.2f}s, {flip} at {flip_time:.2f}s')
+    return best[1], best[2]
+
+
+def mirrored(name: str, routine: Maneuver) -> Maneuver:
+    return Maneuver(f'kickoff {name}', [(duration, mirrored_controls(c)) for duration, c in routine.steps()])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tune the kickoff routine of every spawn and save them.')
+    parser.add_argument('--output', default=str(DEFAULT_PLAYBOOK), help='Where to save the routines')
+    args = parser.parse_args()
+
+    routines = {}
+    descriptions = {}
+    seconds = {}
+    start = time.perf_counter()
+    for spawn in SPAWNS:
+        if MIRRORED_SPAWNS.get(spawn) in routines:
+            # The field is symmetrical, so these are the mirror image of a spawn we already tuned.
+            routines[spawn] = mirrored(spawn, routines[MIRRORED_SPAWNS[spawn]])
+            descriptions[spawn] = f'mirrored {MIRRORED_SPAWNS[spawn]}'
+        else:
+            routines[spawn], descriptions[spawn] = tune(spawn)
+        seconds[spawn] = round(evaluate(routines[spawn], spawn), 4)
+        print(f'{spawn:<12} reaches the ball after {seconds[spawn]:.3f}s: {descriptions[spawn]}')
+
+    KickoffPlaybook(routines).save(args.output, tuned_by='tune_kickoffs.py', predicted_seconds=seconds)
+    print(f'Saved to {args.output} in {time.perf_counter() - start:.1f}s')